@@ -5,23 +5,50 @@ from .constants import ConfluencePageFieldEnum
 from .constants import GET_PAGE_DESCENDANTS_MAX_DEPTH
 from .constants import DescendantTypeEnum
 from .constants import BreadCrumbTypeEnum
+from .constants import CrawlModeEnum
+from .constants import SnapshotCodecEnum
 from .type_hint import T_ID_PATH
 from .type_hint import HasRawData
 from .type_hint import CacheLike
 from .utils import safe_write
+from .cache import CacheLock
+from .cache import cached_fetch
+from .cache import TTLCache
+from .cache import MemoryCache
+from .cache import load_decoded
+from .throttle import TokenBucket
+from .throttle import AdaptiveConcurrency
+from .throttle import Throttle
+from .throttle import ThrottledTransport
+from .throttle import parse_retry_after
+from .throttle import install_throttle
+from .client import make_limits
+from .client import make_client
+from .client import warm_up_client
+from .client import awarm_up_client
+from .client import LoopLocalAsyncTransport
 from .selector import MatchMode
 from .selector import parse_pattern
 from .selector import is_match
 from .selector import Selector
 from .shortcuts import get_space_by_id
 from .shortcuts import get_space_by_key
+from .shortcuts import SPACES_FILTER_BATCH_SIZE
+from .shortcuts import iter_spaces_by_ids_and_keys
+from .shortcuts import get_spaces_by_ids_and_keys
 from .shortcuts import get_pages_by_ids
+from .shortcuts import iter_pages_by_ids
 from .shortcuts import get_pages_in_space
+from .shortcuts import get_folder_by_id
+from .shortcuts import search_content_by_cql
+from .shortcuts import get_ancestors
 from .shortcuts import get_descendants_of_page
 from .shortcuts import get_descendants_of_folder
 from .shortcuts import serialize_many
 from .shortcuts import deserialize_many
 from .shortcuts import get_pages_in_space_with_cache
+from .shortcuts import get_pages_by_ids_with_cache
+from .shortcuts import get_spaces_by_ids_and_keys_with_cache
 from .shortcuts import get_descendants_of_page_with_cache
 from .shortcuts import get_descendants_of_folder_with_cache
 from .shortcuts import delete_pages_and_folders_in_space
@@ -29,14 +56,39 @@ from .shortcuts import T_REQUEST
 from .shortcuts import T_RESPONSE_TYPE
 from .shortcuts import execute_with_retry
 from .shortcuts import create_pages_and_folders
+from .async_shortcuts import arequest
+from .async_shortcuts import apaginate
+from .async_shortcuts import aget_space_by_id
+from .async_shortcuts import aget_space_by_key
+from .async_shortcuts import aiter_pages_by_ids
+from .async_shortcuts import aget_pages_by_ids
+from .async_shortcuts import aget_pages_in_space
+from .async_shortcuts import aget_descendants_of_page
+from .async_shortcuts import aget_descendants_of_folder
+from .crawl_stats import RequestStats
+from .crawl_stats import IterationStats
+from .crawl_stats import CrawlStats
 from .crawler import Entity
+from .crawler import EntityTree
+from .crawler import ClusterStrategy
+from .crawler import ParentClusterStrategy
+from .crawler import CostModelClusterStrategy
+from .crawler import CrawlCheckpoint
 from .crawler import crawl_descendants
+from .crawler import iter_descendants
+from .crawler import crawl_entity_tree
 from .crawler import serialize_entities
 from .crawler import deserialize_entities
+from .crawler import SnapshotView
 from .crawler import crawl_descendants_with_cache
+from .crawler import crawl_descendants_with_subtree_cache
 from .crawler import filter_entities
+from .crawler import iter_filter_entities
 from .crawler import select_entities
 from .page import Page
+from .exporter import render_page_to_xml
+from .exporter import render_pages_to_xml
+from .exporter import write_xml_files
 from .exporter import export_pages_to_xml_files
 from .exporter import merge_files
 from .pack import SpaceExportConfig
@@ -0,0 +1,419 @@
+# -*- coding: utf-8 -*-
+
+"""
+Asyncio counterparts of the read shortcuts in :mod:`docpack_confluence.shortcuts`.
+
+The SDK request classes only send requests with the blocking
+``client.sync_client``. The functions here build the same requests and send
+them with ``client.async_client`` (an ``httpx.AsyncClient``) instead, so they
+can be awaited from an asyncio service without pushing every call onto a
+thread. Paginated endpoints are exposed as async generators.
+
+================================  ==========================================
+sync                              async
+================================  ==========================================
+``get_space_by_id``               :func:`aget_space_by_id`
+``get_space_by_key``              :func:`aget_space_by_key`
+``iter_pages_by_ids``             :func:`aiter_pages_by_ids`
+``get_pages_by_ids``              :func:`aget_pages_by_ids`
+``get_pages_in_space``            :func:`aget_pages_in_space`
+``get_descendants_of_page``       :func:`aget_descendants_of_page`
+``get_descendants_of_folder``     :func:`aget_descendants_of_folder`
+================================  ==========================================
+
+The async client is configured with ``client.async_client_kwargs``, e.g. by
+:func:`~docpack_confluence.client.make_client`. A
+:class:`~docpack_confluence.throttle.Throttle` installed with
+:func:`~docpack_confluence.throttle.install_throttle` covers it too, and its
+limits are shared with the sync client.
+
+**Example**::
+
+    async def main():
+        async for result in aget_descendants_of_page(client, homepage_id):
+            print(result.title)
+"""
+
+import typing as T
+import time
+import asyncio
+import collections
+import dataclasses
+
+# fmt: off
+from sanhe_confluence_sdk.api import Confluence
+from sanhe_confluence_sdk.methods.model import T_RESPONSE
+from sanhe_confluence_sdk.methods.space.get_space import GetSpaceRequest
+from sanhe_confluence_sdk.methods.space.get_space import GetSpaceRequestPathParams
+from sanhe_confluence_sdk.methods.space.get_space import GetSpaceResponse
+from sanhe_confluence_sdk.methods.space.get_spaces import GetSpacesRequest
+from sanhe_confluence_sdk.methods.space.get_spaces import GetSpacesRequestQueryParams
+from sanhe_confluence_sdk.methods.space.get_spaces import GetSpacesResponse
+from sanhe_confluence_sdk.methods.space.get_spaces import GetSpacesResponseResult
+from sanhe_confluence_sdk.methods.page.get_pages import GetPagesRequest
+from sanhe_confluence_sdk.methods.page.get_pages import GetPagesRequestQueryParams
+from sanhe_confluence_sdk.methods.page.get_pages import GetPagesResponse
+from sanhe_confluence_sdk.methods.page.get_pages import GetPagesResponseResult
+from sanhe_confluence_sdk.methods.page.get_pages_in_space import GetPagesInSpaceRequest
+from sanhe_confluence_sdk.methods.page.get_pages_in_space import GetPagesInSpaceRequestPathParams
+from sanhe_confluence_sdk.methods.page.get_pages_in_space import GetPagesInSpaceRequestQueryParams
+from sanhe_confluence_sdk.methods.page.get_pages_in_space import GetPagesInSpaceResponse
+from sanhe_confluence_sdk.methods.page.get_pages_in_space import GetPagesInSpaceResponseResult
+from sanhe_confluence_sdk.methods.descendant.get_page_descendants import GetPageDescendantsRequest
+from sanhe_confluence_sdk.methods.descendant.get_page_descendants import GetPageDescendantsRequestPathParams
+from sanhe_confluence_sdk.methods.descendant.get_page_descendants import GetPageDescendantsRequestQueryParams
+from sanhe_confluence_sdk.methods.descendant.get_page_descendants import GetPageDescendantsResponse
+from sanhe_confluence_sdk.methods.descendant.get_page_descendants import GetPageDescendantsResponseResult
+from sanhe_confluence_sdk.methods.descendant.get_folder_descendants import GetFolderDescendantsRequest
+from sanhe_confluence_sdk.methods.descendant.get_folder_descendants import GetFolderDescendantsRequestPathParams
+from sanhe_confluence_sdk.methods.descendant.get_folder_descendants import GetFolderDescendantsRequestQueryParams
+from sanhe_confluence_sdk.methods.descendant.get_folder_descendants import GetFolderDescendantsResponse
+from sanhe_confluence_sdk.methods.descendant.get_folder_descendants import GetFolderDescendantsResponseResult
+# fmt: on
+
+from .vendor.more_itertools import batched
+
+from .constants import GET_PAGE_DESCENDANTS_MAX_DEPTH
+
+
+async def arequest(
+    client: Confluence,
+    request: T.Any,
+    response_type: type[T_RESPONSE],
+    method: str = "GET",
+) -> T_RESPONSE:
+    """
+    Send an SDK request object with ``client.async_client``.
+
+    Async equivalent of ``request.sync(client)``.
+
+    :param client: Authenticated Confluence API client
+    :param request: SDK request object, e.g. ``GetSpaceRequest(...)``
+    :param response_type: Response class of the request
+    :param method: HTTP method
+
+    :raises httpx.HTTPStatusError: If the response is not a success
+    """
+    http_res = await client.async_client.request(
+        method=method,
+        url=f"{client._root_url}{request._path}",
+        params=request._params,
+        json=request._body,
+    )
+    return response_type.from_success_http_response(http_res)
+
+
+async def apaginate(
+    client: Confluence,
+    request: T.Any,
+    response_type: type[T_RESPONSE],
+    page_size: int,
+    max_items: int,
+    max_pages: int = 100,
+    limit_field: str = "limit",
+    results_field: str = "results",
+) -> T.AsyncIterator[T_RESPONSE]:
+    """
+    Async generator version of the SDK's ``paginate``, follows
+    ``_links.next`` and yields one response per page of results.
+
+    :param client: Authenticated Confluence API client
+    :param request: Initial request object (must have query_params)
+    :param response_type: Response class of the request
+    :param page_size: Number of items per page (the API's limit parameter)
+    :param max_items: Stop fetching when total items >= this value
+    :param max_pages: Maximum number of pages to fetch
+    :param limit_field: Name of the limit query parameter
+    :param results_field: Name of the results field in the response
+    """
+    if page_size < 1:  # pragma: no cover
+        raise ValueError("page_size must be >= 1")
+    if max_pages < 1:  # pragma: no cover
+        raise ValueError("max_pages must be >= 1")
+    max_items = max(max_items, page_size)
+
+    request = dataclasses.replace(
+        request,
+        query_params=dataclasses.replace(
+            request.query_params,
+            **{limit_field: page_size},
+        ),
+    )
+    response = await arequest(client, request, response_type)
+    yield response
+
+    n_fetched_items = 0
+    for _ in range(max_pages - 1):
+        n_fetched_items += len(response.raw_data.get(results_field, []))
+        if n_fetched_items >= max_items:
+            break
+        # links.next is either NA (no more pages) or a str (next page URL)
+        next_url = response.links.next
+        if not isinstance(next_url, str):
+            break
+        http_res = await client.async_client.get(url=client.url + next_url)
+        response = response_type.from_success_http_response(http_res)
+        yield response
+
+
+async def _aiter_results(
+    paginator: T.AsyncIterator[T_RESPONSE],
+    on_response: T.Callable[[T_RESPONSE, float], T.Any] | None = None,
+) -> T.AsyncIterator[T.Any]:
+    """
+    Flatten the results of an async paginator, timing each page if
+    ``on_response`` is given, see ``shortcuts._iter_results``.
+    """
+    start = time.perf_counter()
+    async for response in paginator:
+        if on_response is not None:
+            on_response(response, time.perf_counter() - start)
+        for result in response.results:
+            yield result
+        start = time.perf_counter()
+
+
+async def aget_space_by_id(
+    client: Confluence,
+    space_id: int,
+) -> GetSpaceResponse:
+    """
+    Fetches a Confluence space by its ID.
+
+    :param client: Authenticated Confluence API client
+    :param space_id: ID of the Confluence space to fetch
+    """
+    path_params = GetSpaceRequestPathParams(id=space_id)
+    request = GetSpaceRequest(path_params=path_params)
+    return await arequest(client, request, GetSpaceResponse)
+
+
+async def aget_space_by_key(
+    client: Confluence,
+    space_key: str,
+) -> GetSpacesResponseResult:
+    """
+    Fetches a Confluence space by its key.
+
+    :param client: Authenticated Confluence API client
+    :param space_key: Key of the Confluence space to fetch
+    """
+    query_params = GetSpacesRequestQueryParams(keys=[space_key])
+    request = GetSpacesRequest(query_params=query_params)
+    response = await arequest(client, request, GetSpacesResponse)
+    return response.results[0]
+
+
+async def _aget_pages_batch(
+    client: Confluence,
+    ids: list[int],
+    body_format: str | None,
+) -> dict[int, GetPagesResponseResult]:
+    """
+    Fetch up to 250 pages in one request, keyed by integer page ID.
+    """
+    kwargs = {} if body_format is None else {"body_format": body_format}
+    query_params = GetPagesRequestQueryParams(
+        id=ids,
+        limit=250,
+        **kwargs,
+    )
+    request = GetPagesRequest(query_params=query_params)
+    response = await arequest(client, request, GetPagesResponse)
+    return {int(result.id): result for result in response.results}
+
+
+async def aiter_pages_by_ids(
+    client: Confluence,
+    ids: T.Iterable[int],
+    body_format: str | None = "atlas_doc_format",
+    max_workers: int = 1,
+    on_missing: T.Callable[[int], T.Any] | None = None,
+) -> T.AsyncIterator[GetPagesResponseResult]:
+    """
+    Async generator version of
+    :func:`~docpack_confluence.shortcuts.iter_pages_by_ids`.
+
+    Up to ``max_workers`` batches of 250 IDs are requested concurrently as
+    tasks of the running event loop, results are yielded in the order of ``ids``.
+
+    :param client: Authenticated Confluence API client
+    :param ids: Confluence page IDs to fetch
+    :param body_format: Format of the page body content, None for metadata only
+    :param max_workers: Max number of batches fetched concurrently
+    :param on_missing: Called with each ID the API did not return, which is
+        then skipped. If None, a missing ID raises ``KeyError``.
+    """
+    if max_workers < 1:
+        raise ValueError(f"max_workers must be >= 1, got {max_workers}")
+
+    id_batches = batched(ids, n=250)
+    # (id_batch, task) in input order, the reorder buffer
+    pending: collections.deque[tuple[tuple[int, ...], asyncio.Task]] = (
+        collections.deque()
+    )
+
+    def submit_next():
+        id_batch = next(id_batches, None)
+        if id_batch is not None:
+            task = asyncio.ensure_future(
+                _aget_pages_batch(client, list(id_batch), body_format)
+            )
+            pending.append((id_batch, task))
+
+    for _ in range(max_workers):
+        submit_next()
+    try:
+        while pending:
+            id_batch, task = pending.popleft()
+            id_to_result_mapping = await task
+            submit_next()
+            for id in id_batch:
+                result = id_to_result_mapping.get(int(id))
+                if result is None:
+                    if on_missing is None:
+                        raise KeyError(id)
+                    on_missing(id)
+                    continue
+                yield result
+    finally:
+        for _, task in pending:
+            task.cancel()
+
+
+async def aget_pages_by_ids(
+    client: Confluence,
+    ids: list[int],
+    body_format: str | None = "atlas_doc_format",
+    max_workers: int = 1,
+    on_missing: T.Callable[[int], T.Any] | None = None,
+) -> list[GetPagesResponseResult]:
+    """
+    Fetches multiple Confluence pages by their IDs in batches.
+
+    See :func:`aiter_pages_by_ids` for the parameters.
+
+    :returns: List of page results strictly in the order of the provided IDs
+    """
+    return [
+        result
+        async for result in aiter_pages_by_ids(
+            client=client,
+            ids=ids,
+            body_format=body_format,
+            max_workers=max_workers,
+            on_missing=on_missing,
+        )
+    ]
+
+
+async def aget_pages_in_space(
+    client: Confluence,
+    space_id: int,
+    limit: int = 9999,
+    max_pages: int = 100,
+    body_format: str | None = "atlas_doc_format",
+    on_response: T.Callable[[GetPagesInSpaceResponse, float], T.Any] | None = None,
+) -> T.AsyncIterator[GetPagesInSpaceResponseResult]:
+    """
+    Async generator of all pages of a Confluence space,
+    see :func:`~docpack_confluence.shortcuts.get_pages_in_space`.
+
+    :param client: Authenticated Confluence API client
+    :param space_id: ID of the Confluence space to crawl
+    :param limit: Number of pages to fetch
+    :param max_pages: Max number of API calls (of 250 pages each), a
+        safeguard against endless pagination
+    :param body_format: Body representation to include, None for metadata only
+    :param on_response: Optional callback ``(response, latency)`` called for
+        every page of API results
+    """
+    path_params = GetPagesInSpaceRequestPathParams(id=space_id)
+    if body_format is None:
+        query_params = GetPagesInSpaceRequestQueryParams()
+    else:
+        query_params = GetPagesInSpaceRequestQueryParams(body_format=body_format)
+    request = GetPagesInSpaceRequest(
+        path_params=path_params,
+        query_params=query_params,
+    )
+    paginator = apaginate(
+        client=client,
+        request=request,
+        response_type=GetPagesInSpaceResponse,
+        page_size=250,
+        max_items=limit,
+        max_pages=max_pages,
+    )
+    async for result in _aiter_results(paginator, on_response):
+        yield result
+
+
+async def aget_descendants_of_page(
+    client: Confluence,
+    page_id: int,
+    limit: int = 9999,
+    depth: int = GET_PAGE_DESCENDANTS_MAX_DEPTH,
+    on_response: T.Callable[[GetPageDescendantsResponse, float], T.Any] | None = None,
+) -> T.AsyncIterator[GetPageDescendantsResponseResult]:
+    """
+    Async generator of the descendant pages of a Confluence page,
+    see :func:`~docpack_confluence.shortcuts.get_descendants_of_page`.
+
+    :param client: Authenticated Confluence API client
+    :param page_id: ID of the Confluence page whose descendants to fetch
+    :param limit: Number of descendant pages to fetch
+    :param depth: Maximum depth to traverse (API limit is 5)
+    :param on_response: Optional callback ``(response, latency)`` called for
+        every page of API results
+    """
+    path_params = GetPageDescendantsRequestPathParams(id=page_id)
+    query_params = GetPageDescendantsRequestQueryParams(depth=depth, limit=250)
+    request = GetPageDescendantsRequest(
+        path_params=path_params,
+        query_params=query_params,
+    )
+    paginator = apaginate(
+        client=client,
+        request=request,
+        response_type=GetPageDescendantsResponse,
+        page_size=250,
+        max_items=limit,
+    )
+    async for result in _aiter_results(paginator, on_response):
+        yield result
+
+
+async def aget_descendants_of_folder(
+    client: Confluence,
+    folder_id: int,
+    limit: int = 9999,
+    depth: int = GET_PAGE_DESCENDANTS_MAX_DEPTH,
+    on_response: T.Callable[[GetFolderDescendantsResponse, float], T.Any] | None = None,
+) -> T.AsyncIterator[GetFolderDescendantsResponseResult]:
+    """
+    Async generator of the descendant entities of a Confluence folder,
+    see :func:`~docpack_confluence.shortcuts.get_descendants_of_folder`.
+
+    :param client: Authenticated Confluence API client
+    :param folder_id: ID of the Confluence folder whose descendants to fetch
+    :param limit: Maximum number of descendant entities to fetch
+    :param depth: Maximum depth to traverse (API limit is 5)
+    :param on_response: Optional callback ``(response, latency)`` called for
+        every page of API results
+    """
+    path_params = GetFolderDescendantsRequestPathParams(id=folder_id)
+    query_params = GetFolderDescendantsRequestQueryParams(depth=depth, limit=250)
+    request = GetFolderDescendantsRequest(
+        path_params=path_params,
+        query_params=query_params,
+    )
+    paginator = apaginate(
+        client=client,
+        request=request,
+        response_type=GetFolderDescendantsResponse,
+        page_size=250,
+        max_items=limit,
+    )
+    async for result in _aiter_results(paginator, on_response):
+        yield result
@@ -0,0 +1,553 @@
+# -*- coding: utf-8 -*-
+
+"""
+Cache read-through helpers shared by the ``*_with_cache`` functions.
+
+:func:`cached_fetch` adds two protections against cache stampedes to any
+:class:`~docpack_confluence.type_hint.CacheLike`:
+
+- **stale-while-revalidate**: an expired entry is still served for a grace
+  period, while a single background thread refreshes it
+- **single-flight**: on a miss, only one caller fetches; the others wait for
+  it and read its result from the cache. The lock is a key in the cache
+  itself (:class:`CacheLock`), so with ``diskcache`` it is shared by every
+  process using the same cache directory.
+
+:class:`TTLCache` is a small in-process cache with per-key expiration, for
+callers that do not want a disk cache.
+
+:class:`MemoryCache` keeps the decoded objects of the most recently read keys
+in memory in front of any cache, so repeated hits skip decompressing and
+parsing the cached blobs.
+
+**Example**::
+
+    entities = crawl_descendants_with_cache(
+        client=client,
+        root_id=homepage_id,
+        root_type=DescendantTypeEnum.page,
+        cache=diskcache.Cache(".cache"),
+        expire=3600,
+        stale_while_revalidate=600,  # serve up to 10 min old data instantly
+        single_flight=True,  # one crawl per key across all workers
+    )
+"""
+
+import typing as T
+import time
+import uuid
+import contextlib
+import hashlib
+import threading
+import collections
+
+from .type_hint import CacheLike
+
+T_VALUE = T.TypeVar("T_VALUE")
+
+# suffixes of bookkeeping keys, which MemoryCache does not track with an etag
+_UNTRACKED_KEY_SUFFIXES = ("@fresh", "@lock", "@etag")
+
+# makes the get-then-set of CacheLock atomic within this process, for caches
+# without an atomic ``add``
+_local_add_guard = threading.Lock()
+
+
+class CacheLock:
+    """
+    Mutex held as a key in a cache.
+
+    With caches that have an atomic ``add(key, value, expire)`` (such as
+    ``diskcache.Cache``), the lock works across processes sharing the cache.
+    Other caches fall back to a get-then-set made atomic by a lock local to
+    this process, with the deadline of the holder stored in the lock key, so
+    the lock state lives in the cache either way. The lock expires after
+    ``expire`` seconds, so a crashed holder cannot block the key forever.
+    :meth:`release` deletes the key only if it still holds this lock's token,
+    atomically under ``cache.transact()`` when the cache has it
+    (``diskcache``, :class:`TTLCache`).
+
+    :param cache: Cache holding the lock
+    :param key: Cache key of the lock
+    :param expire: Max seconds the lock is held
+    :param poll: Seconds between two attempts of a blocking :meth:`acquire`
+    """
+
+    def __init__(
+        self,
+        cache: CacheLike,
+        key: str,
+        expire: float = 600,
+        poll: float = 0.05,
+    ):
+        self.cache = cache
+        self.key = key
+        self.expire = expire
+        self.poll = poll
+        self._token = uuid.uuid4().hex
+        self._has_add = hasattr(cache, "add")
+
+    def _add(self) -> bool:
+        """
+        Set the lock key to a new token if it is free or expired.
+        """
+        if self._has_add:
+            return self.cache.add(self.key, self._token, expire=self.expire)
+        with _local_add_guard:
+            held = self.cache.get(self.key)
+            now = time.time()
+            if held is not None:
+                try:
+                    deadline = float(held.split(" ", 1)[0])
+                except (AttributeError, TypeError, ValueError):
+                    deadline = float("inf")
+                if deadline > now:
+                    return False
+            self._token = f"{now + self.expire} {uuid.uuid4().hex}"
+            self.cache.set(self.key, self._token, expire=self.expire)
+            return True
+
+    def acquire(self, blocking: bool = True, timeout: float | None = None) -> bool:
+        """
+        Take the lock.
+
+        :param blocking: If False, return at once when the lock is held
+        :param timeout: Max seconds to wait, None to wait until the lock is free
+
+        :returns: True if the lock was taken
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            if self._add():
+                return True
+            if not blocking:
+                return False
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(self.poll)
+
+    def release(self):
+        """
+        Give the lock back. A lock that expired and was taken by someone
+        else is left alone.
+        """
+        # compare-and-delete, a get then a delete could remove the lock of
+        # the next holder if ours expired in between
+        transact = getattr(self.cache, "transact", None)
+        if not self._has_add:
+            guard = _local_add_guard
+        elif transact is None:
+            guard = contextlib.nullcontext()
+        else:
+            guard = transact()
+        with guard:
+            if self.cache.get(self.key) == self._token:
+                self.cache.delete(self.key)
+
+    def __enter__(self) -> "CacheLock":
+        self.acquire()
+        return self
+
+    def __exit__(self, *args):
+        self.release()
+
+
+def cached_fetch(
+    cache: CacheLike,
+    key: str,
+    load: T.Callable[[], T_VALUE | None],
+    fetch_and_store: T.Callable[[int | None], T_VALUE],
+    expire: int | None = 3600,
+    force_refresh: bool = False,
+    stale_while_revalidate: int | None = 0,
+    single_flight: bool = False,
+    lock_expire: float = 600,
+) -> T_VALUE:
+    """
+    Read ``key`` through the cache, fetching it on a miss.
+
+    With ``stale_while_revalidate``, the freshness of ``key`` is tracked by a
+    marker key ``f"{key}@fresh"`` that expires after ``expire``, and the
+    value itself after ``expire + stale_while_revalidate``. Entries without
+    a marker (e.g. written before this option was used) count as stale.
+
+    :param cache: Cache-like instance
+    :param key: Cache key of the value
+    :param load: Returns the cached value, None on a miss
+    :param fetch_and_store: Fetches the value, stores it in the cache with the
+        given expiration, and returns it
+    :param expire: Seconds the value is fresh, None for no expiration
+    :param force_refresh: If True, fetch even if the value is cached
+    :param stale_while_revalidate: Seconds an expired value is still returned
+        while one background thread refreshes it, None for no limit,
+        0 (default) to disable
+    :param single_flight: If True, concurrent misses of ``key`` (in all
+        processes sharing a cache with atomic ``add``) fetch only once, under
+        a :class:`CacheLock` on ``f"{key}@lock"``. Background refreshes are
+        always single-flight.
+    :param lock_expire: Max seconds a fetch may hold the lock
+
+    :returns: The cached or fetched value
+    """
+    swr = stale_while_revalidate != 0
+    fresh_key = f"{key}@fresh"
+    if not swr:
+        store_expire = expire
+    elif expire is None or stale_while_revalidate is None:
+        store_expire = None
+    else:
+        store_expire = expire + stale_while_revalidate
+
+    def lock() -> CacheLock:
+        return CacheLock(cache, f"{key}@lock", expire=lock_expire)
+
+    def refresh() -> T_VALUE:
+        value = fetch_and_store(store_expire)
+        if swr:
+            cache.set(fresh_key, b"1", expire=expire)
+        return value
+
+    if force_refresh:
+        if not single_flight:
+            return refresh()
+        with lock():
+            return refresh()
+
+    value = load()
+    if value is not None:
+        if swr and cache.get(fresh_key) is None:
+            _refresh_in_background(lock(), refresh, name=f"refresh-{key}")
+        return value
+
+    # Cache miss
+    if not single_flight:
+        return refresh()
+    with lock():
+        # another caller may have filled the cache while we waited
+        value = load()
+        if value is not None:
+            return value
+        return refresh()
+
+
+def _refresh_in_background(
+    lock: CacheLock,
+    refresh: T.Callable[[], T.Any],
+    name: str,
+) -> threading.Thread | None:
+    """
+    Run ``refresh`` in a daemon thread, unless another refresh holds ``lock``.
+
+    :returns: The started thread, None if the refresh is already running
+    """
+    if not lock.acquire(blocking=False):
+        return None
+
+    def run():
+        try:
+            refresh()
+        finally:
+            lock.release()
+
+    thread = threading.Thread(target=run, name=name, daemon=True)
+    thread.start()
+    return thread
+
+
+class TTLCache:
+    """
+    Thread-safe in-process :class:`~docpack_confluence.type_hint.CacheLike`
+    whose keys expire like in ``diskcache``.
+
+    Expired keys are dropped when read, or when the cache is full. Like in
+    ``diskcache``, :meth:`transact` makes a sequence of operations atomic.
+
+    :param max_entries: Max number of keys, the oldest written keys are
+        dropped first. None for no limit.
+    """
+
+    def __init__(self, max_entries: int | None = 1024):
+        self.max_entries = max_entries
+        # reentrant, so the operations can run inside transact()
+        self._lock = threading.RLock()
+        # key -> (value, time.monotonic() deadline or None)
+        self._data: collections.OrderedDict[
+            T.Any, tuple[T.Any, float | None]
+        ] = collections.OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def _get_entry(self, key: T.Any) -> tuple[T.Any, float | None] | None:
+        entry = self._data.get(key)
+        if entry is not None and entry[1] is not None and entry[1] <= time.monotonic():
+            del self._data[key]
+            return None
+        return entry
+
+    def _set(self, key: T.Any, value: T.Any, expire: float | int | None):
+        deadline = None if expire is None else time.monotonic() + expire
+        self._data.pop(key, None)
+        self._data[key] = (value, deadline)
+        if self.max_entries is not None and len(self._data) > self.max_entries:
+            now = time.monotonic()
+            for k in [
+                k for k, (_, d) in self._data.items() if d is not None and d <= now
+            ]:
+                del self._data[k]
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def set(
+        self,
+        key: T.Any,
+        value: T.Any,
+        expire: float | int | None = None,
+    ) -> bool:
+        with self._lock:
+            self._set(key, value, expire)
+        return True
+
+    def add(
+        self,
+        key: T.Any,
+        value: T.Any,
+        expire: float | int | None = None,
+    ) -> bool:
+        """
+        Set ``key`` only if it is missing (or expired), atomically.
+
+        :returns: True if the value was stored
+        """
+        with self._lock:
+            if self._get_entry(key) is not None:
+                return False
+            self._set(key, value, expire)
+        return True
+
+    def get(self, key: T.Any, default: T.Any | None = None) -> T.Any:
+        with self._lock:
+            entry = self._get_entry(key)
+        return default if entry is None else entry[0]
+
+    def __contains__(self, key: T.Any) -> bool:
+        with self._lock:
+            return self._get_entry(key) is not None
+
+    def delete(self, key: T.Any) -> bool:
+        with self._lock:
+            found = self._get_entry(key) is not None
+            self._data.pop(key, None)
+        return found
+
+    def clear(self) -> int:
+        with self._lock:
+            n = len(self._data)
+            self._data.clear()
+        return n
+
+    @contextlib.contextmanager
+    def transact(self) -> T.Iterator[None]:
+        """
+        Hold the cache for the operations of the ``with`` block, other
+        threads wait until it exits.
+        """
+        with self._lock:
+            yield
+
+
+class MemoryCache:
+    """
+    Two-tier cache: a bounded in-process LRU of decoded objects in front of
+    any :class:`~docpack_confluence.type_hint.CacheLike` backend.
+
+    It is itself a ``CacheLike``, so it can be passed to every
+    ``*_with_cache`` function. ``get`` / ``set`` / ``delete`` go to the
+    backend, while :meth:`get_decoded` (used by :func:`load_decoded`) returns
+    the decoded object of a key from memory as long as the backend value is
+    unchanged.
+
+    Every :meth:`set` of a data key also writes a random etag under
+    ``f"{key}@etag"`` with the same expiration, so a memory copy is
+    invalidated when the key is rewritten through any ``MemoryCache`` on the
+    same backend, including in other processes. A matching etag is only
+    trusted while the key itself is still in the backend, so a value that
+    expired or was evicted on its own is not served from memory. Keys
+    written to the backend directly have no etag, their memory copy is
+    checked against a digest of the raw value instead, which still skips
+    decoding. Bookkeeping keys (``@fresh`` markers, ``@lock`` keys) get no
+    etag.
+
+    Decoded objects are shared by all readers, do not mutate them.
+
+    :param backend: Cache storing the raw values
+    :param max_entries: Max number of decoded objects kept in memory
+    :param max_bytes: Max total size of the raw values behind the kept
+        objects (a proxy of their decoded size), None for no limit
+    """
+
+    def __init__(
+        self,
+        backend: CacheLike,
+        max_entries: int = 128,
+        max_bytes: int | None = None,
+    ):
+        self.backend = backend
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # key -> (etag or raw digest, kind, decoded object, raw size)
+        self._entries: collections.OrderedDict[
+            T.Any, tuple[str, str, T.Any, int]
+        ] = collections.OrderedDict()
+        self._n_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __getattr__(self, name: str) -> T.Any:
+        # other backend features, e.g. the atomic ``add`` used by CacheLock
+        if name == "backend":  # not set yet, e.g. while unpickling
+            raise AttributeError(name)
+        return getattr(self.backend, name)
+
+    def __len__(self) -> int:
+        """Number of decoded objects in memory."""
+        return len(self._entries)
+
+    @property
+    def n_bytes(self) -> int:
+        """Total raw size of the decoded objects in memory."""
+        return self._n_bytes
+
+    def _etag_key(self, key: T.Any) -> str | None:
+        """
+        Key of the etag of ``key``, None for bookkeeping keys.
+        """
+        if isinstance(key, str) and key.endswith(_UNTRACKED_KEY_SUFFIXES):
+            return None
+        return f"{key}@etag"
+
+    def _in_backend(self, key: T.Any) -> bool:
+        try:
+            # diskcache checks the key without reading the value
+            return key in self.backend
+        except TypeError:  # no __contains__
+            return self.backend.get(key) is not None
+
+    def _evict(self, key: T.Any):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._n_bytes -= entry[3]
+
+    def set(
+        self,
+        key: T.Any,
+        value: T.Any,
+        expire: float | int | None = None,
+        **kwargs,
+    ) -> T.Any:
+        with self._lock:
+            self._evict(key)
+        result = self.backend.set(key, value, expire=expire, **kwargs)
+        etag_key = self._etag_key(key)
+        if etag_key is not None:
+            self.backend.set(etag_key, uuid.uuid4().hex, expire=expire)
+        return result
+
+    def get(self, key: T.Any, default: T.Any | None = None, **kwargs) -> T.Any:
+        return self.backend.get(key, default, **kwargs)
+
+    def delete(self, key: T.Any) -> bool:
+        with self._lock:
+            self._evict(key)
+        etag_key = self._etag_key(key)
+        if etag_key is not None:
+            self.backend.delete(etag_key)
+        return self.backend.delete(key)
+
+    def clear(self) -> int:
+        with self._lock:
+            self._entries.clear()
+            self._n_bytes = 0
+        return self.backend.clear()
+
+    def get_decoded(
+        self,
+        key: T.Any,
+        decode: T.Callable[[T.Any], T_VALUE],
+        kind: str = "",
+    ) -> T_VALUE | None:
+        """
+        Decoded value of ``key``, from memory if the backend value is unchanged.
+
+        :param key: Cache key
+        :param decode: Turns the raw backend value into the object to keep
+        :param kind: Name of the decoded form, a key read in another form
+            than the one in memory is decoded again
+
+        :returns: The decoded object, None if ``key`` is not in the backend
+        """
+        etag_key = self._etag_key(key)
+        etag = None if etag_key is None else self.backend.get(etag_key)
+        raw = None
+        if etag is None:
+            raw = self.backend.get(key)
+            if raw is None:
+                with self._lock:
+                    self._evict(key)
+                return None
+            # not written by a MemoryCache, tell versions apart by content
+            etag = hashlib.blake2b(raw, digest_size=16).hexdigest()
+        with self._lock:
+            entry = self._entries.get(key)
+        # the etag may outlive a value the backend dropped on its own
+        if (
+            entry is not None
+            and entry[:2] == (etag, kind)
+            and (raw is not None or self._in_backend(key))
+        ):
+            with self._lock:
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                self.hits += 1
+            return entry[2]
+        with self._lock:
+            self.misses += 1
+        if raw is None:
+            raw = self.backend.get(key)
+            if raw is None:
+                with self._lock:
+                    self._evict(key)
+                return None
+        value = decode(raw)
+        size = len(raw)
+        with self._lock:
+            self._evict(key)
+            if self.max_bytes is None or size <= self.max_bytes:
+                self._entries[key] = (etag, kind, value, size)
+                self._n_bytes += size
+                while len(self._entries) > self.max_entries or (
+                    self.max_bytes is not None and self._n_bytes > self.max_bytes
+                ):
+                    self._evict(next(iter(self._entries)))
+        return value
+
+
+def load_decoded(
+    cache: CacheLike,
+    key: T.Any,
+    decode: T.Callable[[T.Any], T_VALUE],
+    kind: str = "",
+) -> T_VALUE | None:
+    """
+    Read and decode ``key``, through the memory tier if ``cache`` is a
+    :class:`MemoryCache`.
+
+    :param kind: Name of the decoded form, see :meth:`MemoryCache.get_decoded`
+
+    :returns: The decoded value, None on a miss
+    """
+    if isinstance(cache, MemoryCache):
+        return cache.get_decoded(key, decode, kind=kind)
+    raw = cache.get(key)
+    return None if raw is None else decode(raw)
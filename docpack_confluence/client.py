@@ -0,0 +1,288 @@
+# -*- coding: utf-8 -*-
+
+"""
+Factory of Confluence clients tuned for concurrent crawling and body fetching.
+
+A plain ``Confluence(url=..., username=..., password=...)`` client uses the
+``httpx`` defaults: a pool of at most 10 keep-alive connections, HTTP/1.1
+only, a 5 second timeout, and an ``httpx.Client`` that is only created on
+first use (so threads starting at the same time may each build their own).
+:func:`make_client` instead:
+
+- sizes the connection pools to the concurrency of the crawl. The sync
+  ``httpx.Client`` and the async ``httpx.AsyncClient`` have separate
+  transports, hence separate pools, each with the same limits: up to
+  ``max_workers`` connections per transport
+- optionally enables HTTP/2, which multiplexes all requests over a single
+  connection (needs ``pip install "docpack_confluence[http2]"``)
+- builds the sync ``httpx.Client`` eagerly, so every thread shares it
+  (``httpx.Client`` is thread-safe)
+- optionally routes every request through a
+  :class:`~docpack_confluence.throttle.Throttle`
+- optionally warms the sync pool up, so the first iteration of a crawl does
+  not pay for ``max_workers`` TLS handshakes at once. The async pool is tied
+  to the event loop that uses it, warm it up from that loop with
+  :func:`awarm_up_client`
+- gives the async transport one pool per event loop
+  (:class:`LoopLocalAsyncTransport`), so the cached ``client.async_client``
+  keeps working across several ``asyncio.run`` calls
+
+**Example**::
+
+    from docpack_confluence.client import make_client
+
+    client = make_client(
+        url="https://example.atlassian.net",
+        username="me@example.com",
+        password="api-token",
+        max_workers=16,
+        warm_up=True,
+    )
+    entities = crawl_descendants(client, homepage_id, max_workers=16)
+"""
+
+import typing as T
+import asyncio
+import weakref
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+
+from sanhe_confluence_sdk.api import Confluence
+
+from .throttle import Throttle, install_throttle
+
+
+def _http2_hint() -> ImportError:
+    """
+    Error raised when ``http2=True`` but the ``h2`` package is missing.
+    """
+    return ImportError(
+        "HTTP/2 needs an optional dependency, "
+        'run: pip install "docpack_confluence[http2]"'
+    )
+
+
+def make_limits(
+    max_workers: int,
+    keepalive_expiry: float | None = 30.0,
+) -> httpx.Limits:
+    """
+    Connection pool limits for ``max_workers`` concurrent requests: one
+    connection per worker, all of them kept alive between requests.
+    """
+    if max_workers < 1:
+        raise ValueError(f"max_workers must be >= 1, got {max_workers}")
+    return httpx.Limits(
+        max_connections=max_workers,
+        max_keepalive_connections=max_workers,
+        keepalive_expiry=keepalive_expiry,
+    )
+
+
+class LoopLocalAsyncTransport(httpx.AsyncBaseTransport):
+    """
+    Async transport with one wrapped transport, hence one connection pool,
+    per event loop.
+
+    Async connections and the locks of their pool belong to the event loop
+    that created them, and ``Confluence.async_client`` is cached for the
+    life of the client. With a plain ``httpx.AsyncHTTPTransport``, a second
+    ``asyncio.run`` would reuse the pool of the first, closed, loop. This
+    transport creates a new one with ``factory`` in each loop it is used
+    from, and forgets it when the loop is garbage collected.
+
+    Do not ``aclose()`` the ``async_client`` between two loops, a closed
+    ``httpx.AsyncClient`` cannot be reused. :meth:`aclose` only closes the
+    pool of the running loop.
+
+    :param factory: Creates the transport of a new event loop
+    """
+
+    def __init__(self, factory: T.Callable[[], httpx.AsyncBaseTransport]):
+        self.factory = factory
+        self._transports: weakref.WeakKeyDictionary[
+            asyncio.AbstractEventLoop, httpx.AsyncBaseTransport
+        ] = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def _transport(self) -> httpx.AsyncBaseTransport:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            transport = self._transports.get(loop)
+            if transport is None:
+                transport = self._transports[loop] = self.factory()
+            return transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        return await self._transport().handle_async_request(request)
+
+    async def aclose(self):
+        with self._lock:
+            transport = self._transports.pop(asyncio.get_running_loop(), None)
+        if transport is not None:
+            await transport.aclose()
+
+
+def make_client(
+    url: str,
+    username: str,
+    password: str,
+    max_workers: int = 8,
+    http2: bool = False,
+    timeout: float | httpx.Timeout = 30.0,
+    keepalive_expiry: float | None = 30.0,
+    throttle: Throttle | None = None,
+    warm_up: bool = False,
+    transport: httpx.BaseTransport | None = None,
+    async_transport: httpx.AsyncBaseTransport | None = None,
+) -> Confluence:
+    """
+    Create a Confluence client for high-throughput concurrent use.
+
+    :param url: Confluence site URL, e.g. ``https://example.atlassian.net``
+    :param username: Atlassian account email
+    :param password: API token
+    :param max_workers: Max number of concurrent requests the client is used
+        for, e.g. the ``max_workers`` of the crawl. Sizes the connection pool
+        of the sync and of the async transport, each one separately.
+    :param http2: If True, negotiate HTTP/2 and multiplex concurrent requests
+        over one connection
+    :param timeout: Timeout of every request in seconds, or an ``httpx.Timeout``.
+        The pool timeout applies while all connections are busy.
+    :param keepalive_expiry: Seconds an idle connection is kept open
+    :param throttle: Optional shared :class:`~docpack_confluence.throttle.Throttle`
+        installed with :func:`~docpack_confluence.throttle.install_throttle`
+    :param warm_up: If True, open the sync pool's connections right away,
+        see :func:`warm_up_client`. The async pool can only be warmed up
+        from the event loop that will use it, see :func:`awarm_up_client`.
+    :param transport: Custom sync transport, e.g. ``httpx.MockTransport`` in
+        tests. ``max_workers``, ``http2`` and ``keepalive_expiry`` configure
+        the default transports only.
+    :param async_transport: Custom async transport. Defaults to ``transport``
+        when it can serve async requests too (``httpx.MockTransport`` does),
+        so that no request of a mocked client reaches the network.
+
+    :raises ValueError: If ``transport`` is sync only and no
+        ``async_transport`` is given
+
+    :returns: A client whose ``sync_client`` is already built
+    """
+    limits = make_limits(max_workers, keepalive_expiry)
+    if async_transport is None and transport is not None:
+        if not isinstance(transport, httpx.AsyncBaseTransport):
+            raise ValueError(
+                "a custom sync transport needs an async_transport too, "
+                "otherwise async requests would bypass it"
+            )
+        async_transport = transport
+    try:
+        if transport is None:
+            transport = httpx.HTTPTransport(limits=limits, http2=http2)
+        if async_transport is None:
+            async_transport = LoopLocalAsyncTransport(
+                lambda: httpx.AsyncHTTPTransport(limits=limits, http2=http2)
+            )
+    except ImportError as e:  # pragma: no cover
+        raise _http2_hint() from e
+    client = Confluence(
+        url=url,
+        username=username,
+        password=password,
+        sync_client_kwargs={"transport": transport, "timeout": timeout},
+        async_client_kwargs={"transport": async_transport, "timeout": timeout},
+    )
+    if throttle is not None:
+        install_throttle(client, throttle)
+    # build the cached httpx.Client now, before threads race to create it
+    _ = client.sync_client
+    if warm_up:
+        warm_up_client(client, n_connections=1 if http2 else max_workers)
+    return client
+
+
+def warm_up_client(
+    client: Confluence,
+    n_connections: int,
+    timeout: float = 10.0,
+) -> int:
+    """
+    Open ``n_connections`` keep-alive connections of ``client``'s pool.
+
+    Sends ``n_connections`` cheap requests (a one-result space listing) at the
+    same time and holds every response open until all of them have arrived,
+    so each one needs its own connection. Their bodies are then read, which
+    returns the connections to the pool. Errors are ignored, warming up is
+    best effort.
+
+    :param client: Confluence API client
+    :param n_connections: Number of connections to open
+    :param timeout: Max seconds to wait for the other requests
+
+    :returns: Number of successful warm-up requests
+    """
+    url = f"{client._root_url}/spaces"
+    barrier = threading.Barrier(n_connections)
+
+    def open_connection() -> bool:
+        try:
+            with client.sync_client.stream("GET", url, params={"limit": 1}) as res:
+                try:
+                    barrier.wait(timeout=timeout)
+                except threading.BrokenBarrierError:
+                    pass
+                res.read()
+                return res.is_success
+        except httpx.HTTPError:
+            barrier.abort()
+            return False
+
+    with ThreadPoolExecutor(max_workers=n_connections) as executor:
+        results = list(executor.map(lambda _: open_connection(), range(n_connections)))
+    return sum(results)
+
+
+async def awarm_up_client(
+    client: Confluence,
+    n_connections: int,
+    timeout: float = 10.0,
+) -> int:
+    """
+    Async version of :func:`warm_up_client`, opens ``n_connections``
+    keep-alive connections of the pool of ``client.async_client``.
+
+    Async connections belong to the event loop that opened them, so await
+    this in the loop that then uses the client, e.g. at the start of the
+    coroutine passed to ``asyncio.run``.
+
+    :returns: Number of successful warm-up requests
+    """
+    url = f"{client._root_url}/spaces"
+    n_open = 0
+    all_open = asyncio.Event()
+
+    async def open_connection() -> bool:
+        nonlocal n_open
+        try:
+            async with client.async_client.stream(
+                "GET", url, params={"limit": 1}
+            ) as res:
+                n_open += 1
+                if n_open == n_connections:
+                    all_open.set()
+                try:
+                    await asyncio.wait_for(all_open.wait(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    pass
+                await res.aread()
+                return res.is_success
+        except httpx.HTTPError:
+            # do not keep the others waiting for a connection that failed
+            all_open.set()
+            return False
+
+    results = await asyncio.gather(
+        *(open_connection() for _ in range(n_connections))
+    )
+    return sum(results)
@@ -31,6 +31,41 @@ class DescendantTypeEnum(str, enum.Enum):
     whiteboard = "whiteboard"
 
 
+class CrawlModeEnum(str, enum.Enum):
+    """
+    How :func:`~docpack_confluence.crawler.crawl_descendants` discovers the hierarchy.
+
+    - ``clustered``: depth-limited descendants calls, refetching from clustered
+      boundary nodes until the bottom of the tree is reached
+    - ``flat``: one paginated listing of every page in the space, plus one
+      lookup per folder, hierarchy rebuilt from ``parentId``
+    - ``cql``: one paginated CQL ``ancestor = <root>`` search with ancestors
+      expanded, no depth limit
+    - ``auto``: ``clustered`` when every descendant is returned. When only
+      pages are selected, ``flat`` or ``clustered`` based on space size and
+      selector scope
+    """
+
+    auto = "auto"
+    clustered = "clustered"
+    flat = "flat"
+    cql = "cql"
+
+
+class SnapshotCodecEnum(str, enum.Enum):
+    """
+    Compression codec of a crawl snapshot, see :mod:`docpack_confluence.snapshot`.
+
+    - ``gzip``: standard library, always available
+    - ``zstd``: needs ``pip install "docpack_confluence[zstd]"``
+    - ``lz4``: needs ``pip install "docpack_confluence[lz4]"``
+    """
+
+    gzip = "gzip"
+    zstd = "zstd"
+    lz4 = "lz4"
+
+
 class BreadCrumbTypeEnum(str, enum.Enum):
     id = "id"
     title = "title"
@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+
+"""
+Structured instrumentation of a crawl, see :func:`docpack_confluence.crawler.crawl_descendants`.
+
+Pass an empty :class:`CrawlStats` to the crawler and it will be filled with
+per-iteration numbers (roots, API pages, new / duplicate / boundary nodes,
+bytes received and per-request latency), which is what you need to tune
+clustering and concurrency on real spaces.
+"""
+
+import typing as T
+import dataclasses
+
+
+@dataclasses.dataclass
+class RequestStats:
+    """
+    One HTTP request (one page of API results) made by the crawler.
+
+    :param root_id: ID of the root whose descendants were requested
+    :param root_type: "page" or "folder"
+    :param n_items: Number of results in the response
+    :param n_bytes: Size of the response body in bytes as received on the
+        wire, i.e. compressed when the response is gzip-encoded
+    :param latency: Seconds spent waiting for the response
+    """
+
+    root_id: str
+    root_type: str
+    n_items: int
+    n_bytes: int
+    latency: float
+
+
+@dataclasses.dataclass
+class IterationStats:
+    """
+    Numbers of one crawl iteration.
+
+    In the pipelined crawl there is no iteration barrier, so an iteration is a
+    generation instead: the crawl root is generation 1, and roots clustered
+    from the boundary nodes of a generation N root belong to generation N + 1.
+
+    :param iteration: 1-based iteration number
+    :param n_roots: Number of roots fetched
+    :param n_new_nodes: Number of nodes added to the crawl result
+    :param n_duplicates: Number of returned nodes discarded as already known
+    :param n_boundary_nodes: Number of new nodes at max depth
+    :param n_pruned_nodes: Number of boundary nodes not expanded because the
+        selector rules out their whole subtree
+    :param requests: Every HTTP request made for the roots of this iteration
+    """
+
+    iteration: int
+    n_roots: int = 0
+    n_new_nodes: int = 0
+    n_duplicates: int = 0
+    n_boundary_nodes: int = 0
+    n_pruned_nodes: int = 0
+    requests: list[RequestStats] = dataclasses.field(default_factory=list)
+
+    @property
+    def n_requests(self) -> int:
+        return len(self.requests)
+
+    @property
+    def n_bytes(self) -> int:
+        return sum(request.n_bytes for request in self.requests)
+
+    @property
+    def latencies(self) -> list[float]:
+        return [request.latency for request in self.requests]
+
+    def record_root(
+        self,
+        n_descendants: int,
+        n_new_nodes: int,
+        n_boundary_nodes: int,
+        requests: list[RequestStats],
+    ):
+        """
+        Add the outcome of one fetched and merged root.
+        """
+        self.n_roots += 1
+        self.n_new_nodes += n_new_nodes
+        self.n_duplicates += n_descendants - n_new_nodes
+        self.n_boundary_nodes += n_boundary_nodes
+        self.requests.extend(requests)
+
+    def merge(self, other: "IterationStats"):
+        """
+        Add the numbers of ``other`` (e.g. the same iteration of another crawl).
+        """
+        self.n_roots += other.n_roots
+        self.n_new_nodes += other.n_new_nodes
+        self.n_duplicates += other.n_duplicates
+        self.n_boundary_nodes += other.n_boundary_nodes
+        self.n_pruned_nodes += other.n_pruned_nodes
+        self.requests.extend(other.requests)
+
+
+@dataclasses.dataclass
+class CrawlStats:
+    """
+    Numbers of a whole crawl, one :class:`IterationStats` per iteration.
+
+    :param iterations: Iteration stats, ordered by iteration number
+    :param elapsed: Wall clock seconds of the crawl
+
+    **Example**::
+
+        stats = CrawlStats()
+        entities = crawl_descendants(client, homepage_id, stats=stats)
+        print(stats.n_requests, stats.n_duplicates, stats.n_bytes)
+        for it in stats.iterations:
+            print(it.iteration, it.n_roots, it.n_new_nodes, max(it.latencies))
+    """
+
+    iterations: list[IterationStats] = dataclasses.field(default_factory=list)
+    elapsed: float = 0.0
+
+    def get_iteration(self, iteration: int) -> IterationStats:
+        """
+        Get the stats of the given (1-based) iteration, creating it if needed.
+        """
+        while len(self.iterations) < iteration:
+            self.iterations.append(IterationStats(iteration=len(self.iterations) + 1))
+        return self.iterations[iteration - 1]
+
+    @property
+    def n_roots(self) -> int:
+        return sum(it.n_roots for it in self.iterations)
+
+    @property
+    def n_requests(self) -> int:
+        return sum(it.n_requests for it in self.iterations)
+
+    @property
+    def n_new_nodes(self) -> int:
+        return sum(it.n_new_nodes for it in self.iterations)
+
+    @property
+    def n_duplicates(self) -> int:
+        return sum(it.n_duplicates for it in self.iterations)
+
+    @property
+    def n_boundary_nodes(self) -> int:
+        return sum(it.n_boundary_nodes for it in self.iterations)
+
+    @property
+    def n_pruned_nodes(self) -> int:
+        return sum(it.n_pruned_nodes for it in self.iterations)
+
+    @property
+    def n_bytes(self) -> int:
+        return sum(it.n_bytes for it in self.iterations)
+
+    @property
+    def latencies(self) -> list[float]:
+        return [latency for it in self.iterations for latency in it.latencies]
+
+    def to_dict(self) -> dict[str, T.Any]:
+        return dataclasses.asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: dict[str, T.Any]) -> "CrawlStats":
+        return cls(
+            iterations=[
+                IterationStats(
+                    **{
+                        **it,
+                        "requests": [RequestStats(**req) for req in it["requests"]],
+                    }
+                )
+                for it in data["iterations"]
+            ],
+            elapsed=data["elapsed"],
+        )
@@ -17,6 +17,66 @@ from .utils import safe_write
 from .page import Page
 
 
+def render_page_to_xml(
+    page: Page,
+    breadcrumb_type: BreadCrumbTypeEnum = BreadCrumbTypeEnum.title,
+    wanted_fields: T.Optional[T.Set[ConfluencePageFieldEnum]] = None,
+    ignore_to_markdown_error: bool = True,
+) -> T.Tuple[str, str]:
+    """
+    Convert one page to XML, the CPU-bound part of the export.
+
+    :returns: Tuple of (file basename from the breadcrumb path, XML content)
+    """
+    xml = page.to_xml(
+        wanted_fields=wanted_fields,
+        to_markdown_ignore_error=ignore_to_markdown_error,
+    )
+
+    # Determine filename from breadcrumb path
+    if breadcrumb_type == BreadCrumbTypeEnum.id:
+        basename = f"{page.entity.id_breadcrumb_path}.xml"
+    elif breadcrumb_type == BreadCrumbTypeEnum.title:
+        basename = f"{page.entity.title_breadcrumb_path}.xml"
+    else:  # pragma: no cover
+        raise TypeError(f"Unsupported breadcrumb_type: {breadcrumb_type}")
+    return basename, xml
+
+
+def render_pages_to_xml(
+    pages: T.List[Page],
+    breadcrumb_type: BreadCrumbTypeEnum = BreadCrumbTypeEnum.title,
+    wanted_fields: T.Optional[T.Set[ConfluencePageFieldEnum]] = None,
+    ignore_to_markdown_error: bool = True,
+) -> T.List[T.Tuple[str, str]]:
+    """
+    :func:`render_page_to_xml` for a chunk of pages, a picklable unit of work
+    for a process pool.
+    """
+    return [
+        render_page_to_xml(
+            page=page,
+            breadcrumb_type=breadcrumb_type,
+            wanted_fields=wanted_fields,
+            ignore_to_markdown_error=ignore_to_markdown_error,
+        )
+        for page in pages
+    ]
+
+
+def write_xml_files(
+    files: T.Iterable[T.Tuple[str, str]],
+    dir_out: Path,
+    encoding: str = "utf-8",
+) -> None:
+    """
+    Write ``(basename, xml)`` pairs to ``dir_out``, in order, so the last
+    page of duplicated breadcrumb paths wins.
+    """
+    for basename, xml in files:
+        safe_write(path=dir_out / basename, content=xml, encoding=encoding)
+
+
 def export_pages_to_xml_files(
     pages: T.List[Page],
     dir_out: Path,
@@ -43,23 +103,16 @@ def export_pages_to_xml_files(
     if clean_output_dir:
         shutil.rmtree(dir_out, ignore_errors=True)
 
-    for page in pages:
-        # Convert page to XML
-        xml = page.to_xml(
+    files = (
+        render_page_to_xml(
+            page=page,
+            breadcrumb_type=breadcrumb_type,
             wanted_fields=wanted_fields,
-            to_markdown_ignore_error=ignore_to_markdown_error,
+            ignore_to_markdown_error=ignore_to_markdown_error,
         )
-
-        # Determine filename from breadcrumb path
-        if breadcrumb_type == BreadCrumbTypeEnum.id:
-            basename = f"{page.entity.id_breadcrumb_path}.xml"
-        elif breadcrumb_type == BreadCrumbTypeEnum.title:
-            basename = f"{page.entity.title_breadcrumb_path}.xml"
-        else:  # pragma: no cover
-            raise TypeError(f"Unsupported breadcrumb_type: {breadcrumb_type}")
-
-        path = dir_out / basename
-        safe_write(path=path, content=xml, encoding=encoding)
+        for page in pages
+    )
+    write_xml_files(files=files, dir_out=dir_out, encoding=encoding)
 
 
 def merge_files(
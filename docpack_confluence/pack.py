@@ -7,8 +7,14 @@ High-level API for exporting Confluence pages from multiple spaces
 to XML format for AI knowledge base ingestion.
 """
 
+import typing as T
+import asyncio
+import contextlib
 import dataclasses
+import functools
+import itertools
 import shutil
+from concurrent.futures import Executor
 from pathlib import Path
 
 from sanhe_confluence_sdk.api import Confluence
@@ -16,12 +22,23 @@ from sanhe_confluence_sdk.api import Confluence
 from .constants import ConfluencePageFieldEnum
 from .constants import DescendantTypeEnum
 from .constants import BreadCrumbTypeEnum
+from .type_hint import CacheLike
 from .shortcuts import get_space_by_id
 from .shortcuts import get_space_by_key
+from .shortcuts import get_spaces_by_ids_and_keys
+from .shortcuts import get_spaces_by_ids_and_keys_with_cache
 from .shortcuts import get_pages_by_ids
-from .crawler import select_entities
+from .shortcuts import get_pages_by_ids_with_cache
+from .async_shortcuts import aget_space_by_id
+from .async_shortcuts import aget_space_by_key
+from .async_shortcuts import aget_pages_by_ids
+from .crawler import Entity, select_entities
 from .page import Page
 from .exporter import export_pages_to_xml_files, merge_files
+from .exporter import render_pages_to_xml, write_xml_files
+
+# pages converted to XML per executor job in ``aexport``
+RENDER_CHUNK_SIZE = 50
 
 
 @dataclasses.dataclass(frozen=True)
@@ -37,6 +54,19 @@ class SpaceExportConfig:
     :param breadcrumb_type: Filename format - use page IDs or titles
     :param wanted_fields: Fields to include in XML output
     :param ignore_to_markdown_error: Skip errors during markdown conversion
+    :param max_workers: Max number of concurrent API requests, used for both
+        the crawl and the page body fetch
+    :param page_cache: Optional cache of page bodies keyed by page ID and
+        version number. Only bodies of pages whose version moved since the
+        last export are downloaded, after a cheap metadata-only pass.
+    :param crawl_from_include_roots: Crawl only the subtrees named by
+        ``include``, located with ancestors lookups, instead of the whole
+        space from its homepage. Much cheaper when ``include`` names a few
+        small sections of a large space.
+    :param on_missing: Called with the ID of each selected page whose body
+        could not be fetched (deleted since the crawl, no permission, ...).
+        Such pages are left out of the export. If None, a missing page
+        raises ``KeyError``.
     """
 
     # fmt: off
@@ -48,6 +78,10 @@ class SpaceExportConfig:
     breadcrumb_type: BreadCrumbTypeEnum = dataclasses.field(default=BreadCrumbTypeEnum.title)
     wanted_fields: set[ConfluencePageFieldEnum] | None = dataclasses.field(default=None)
     ignore_to_markdown_error: bool = dataclasses.field(default=True)
+    max_workers: int = dataclasses.field(default=1)
+    page_cache: CacheLike | None = dataclasses.field(default=None)
+    crawl_from_include_roots: bool = dataclasses.field(default=False)
+    on_missing: T.Callable[[int], T.Any] | None = dataclasses.field(default=None)
     # fmt: on
 
     @property
@@ -60,52 +94,90 @@ class SpaceExportConfig:
         else:
             raise ValueError("Either space_id or space_key must be provided")
 
-    def export(self, dir_out: Path, encoding: str = "utf-8") -> None:
+    def _select_entities(self, space: T.Any) -> list[Entity]:
         """
-        Export filtered pages from this space to XML files.
-
-        :param dir_out: Output directory for XML files
-        :param encoding: Output file encoding
+        Crawl and filter the pages to export, starting from the space homepage.
         """
-        # Get homepage ID to start crawling
-        if self.space_id is not None:
-            homepage_id = get_space_by_id(
-                client=self.client, space_id=self.space_id
-            ).homepageId
-        elif self.space_key is not None:
-            homepage_id = get_space_by_key(
-                client=self.client, space_key=self.space_key
-            ).homepageId
-        else:
-            raise ValueError("Either space_id or space_key must be provided")
-
-        entities = select_entities(
+        # space_id lets the crawler list the whole space in one linear scan
+        # (flat crawl mode) when the selection covers the whole space
+        return select_entities(
             client=self.client,
-            root_id=int(homepage_id),
+            root_id=int(space.homepageId),
             root_type=DescendantTypeEnum.page,
             include=self.include,
             exclude=self.exclude,
             verbose=False,
+            max_workers=self.max_workers,
+            space_id=int(space.id),
+            homepage_id=int(space.homepageId),
+            from_include_roots=self.crawl_from_include_roots,
         )
 
-        # Fetch full page content
-        results = get_pages_by_ids(
+    def _get_pages_with_cache(self, ids: list[int]) -> list[T.Any]:
+        return get_pages_by_ids_with_cache(
             client=self.client,
-            ids=[int(entity.node.id) for entity in entities],
+            ids=ids,
+            cache=self.page_cache,
+            max_workers=self.max_workers,
+            on_missing=self.on_missing,
         )
-        if len(entities) != len(results):
-            raise ValueError("Mismatch between filtered_entities and fetched_pages")
+
+    def _to_pages(
+        self,
+        entities: list[Entity],
+        results: list[T.Any],
+    ) -> list[Page]:
+        """
+        Pair crawled entities with their fetched bodies, pages deleted since
+        the crawl were already reported to :attr:`on_missing` and are skipped.
+        """
         result_by_id = {str(result.id): result for result in results}
+        pages = []
+        for entity in entities:
+            result = result_by_id.get(str(entity.node.id))
+            if result is None:
+                continue
+            pages.append(Page(site_url=self.client.url, entity=entity, result=result))
+        return pages
+
+    def export(
+        self,
+        dir_out: Path,
+        encoding: str = "utf-8",
+        space: T.Any | None = None,
+    ) -> None:
+        """
+        Export filtered pages from this space to XML files.
+
+        :param dir_out: Output directory for XML files
+        :param encoding: Output file encoding
+        :param space: The space, already resolved (e.g. by
+            :meth:`ExportSpec.resolve_spaces`), looked up if None
+        """
+        # Get homepage ID to start crawling
+        if space is not None:
+            pass
+        elif self.space_id is not None:
+            space = get_space_by_id(client=self.client, space_id=self.space_id)
+        elif self.space_key is not None:
+            space = get_space_by_key(client=self.client, space_key=self.space_key)
+        else:
+            raise ValueError("Either space_id or space_key must be provided")
+
+        entities = self._select_entities(space)
 
-        # Build Page objects
-        pages = [
-            Page(
-                site_url=self.client.url,
-                entity=entity,
-                result=result_by_id[str(entity.node.id)],
+        # Fetch full page content
+        ids = [int(entity.node.id) for entity in entities]
+        if self.page_cache is None:
+            results = get_pages_by_ids(
+                client=self.client,
+                ids=ids,
+                max_workers=self.max_workers,
+                on_missing=self.on_missing,
             )
-            for entity in entities
-        ]
+        else:
+            results = self._get_pages_with_cache(ids)
+        pages = self._to_pages(entities, results)
 
         # Export to XML files
         export_pages_to_xml_files(
@@ -118,6 +190,93 @@ class SpaceExportConfig:
             clean_output_dir=False,
         )
 
+    async def aexport(
+        self,
+        dir_out: Path,
+        encoding: str = "utf-8",
+        limiter: asyncio.Semaphore | None = None,
+        executor: Executor | None = None,
+        space: T.Any | None = None,
+    ) -> None:
+        """
+        Coroutine version of :meth:`export`, writes the same files.
+
+        The space lookup and the page body fetch are awaited on the client's
+        async ``httpx`` client (see :mod:`docpack_confluence.async_shortcuts`).
+        The crawl, and the body fetch when ``page_cache`` is set, run on the
+        threaded sync code in a worker thread. The markdown conversion runs
+        on ``executor`` in chunks of :data:`RENDER_CHUNK_SIZE` pages, then
+        the files are written in page order.
+
+        :param dir_out: Output directory for XML files
+        :param encoding: Output file encoding
+        :param limiter: Semaphore shared with other exports, each stage
+            (lookup, crawl, body fetch, conversion chunk, file writes) holds
+            one slot while it runs, whatever the number of requests it sends.
+            None for no limit.
+        :param executor: Executor of the markdown conversion, None for the
+            event loop's default thread pool. A ``ProcessPoolExecutor`` runs
+            the conversion on all CPU cores.
+        :param space: The space, already resolved, looked up if None
+        """
+        stage = contextlib.nullcontext() if limiter is None else limiter
+        loop = asyncio.get_running_loop()
+
+        async with stage:
+            if space is not None:
+                pass
+            elif self.space_id is not None:
+                space = await aget_space_by_id(
+                    client=self.client, space_id=self.space_id
+                )
+            elif self.space_key is not None:
+                space = await aget_space_by_key(
+                    client=self.client, space_key=self.space_key
+                )
+            else:
+                raise ValueError("Either space_id or space_key must be provided")
+
+        async with stage:
+            entities = await asyncio.to_thread(self._select_entities, space)
+
+        ids = [int(entity.node.id) for entity in entities]
+        async with stage:
+            if self.page_cache is None:
+                results = await aget_pages_by_ids(
+                    client=self.client,
+                    ids=ids,
+                    max_workers=self.max_workers,
+                    on_missing=self.on_missing,
+                )
+            else:
+                results = await asyncio.to_thread(self._get_pages_with_cache, ids)
+        pages = self._to_pages(entities, results)
+
+        render = functools.partial(
+            render_pages_to_xml,
+            breadcrumb_type=self.breadcrumb_type,
+            wanted_fields=self.wanted_fields,
+            ignore_to_markdown_error=self.ignore_to_markdown_error,
+        )
+
+        async def render_chunk(chunk: list[Page]) -> list[tuple[str, str]]:
+            async with stage:
+                return await loop.run_in_executor(executor, render, chunk)
+
+        rendered = await asyncio.gather(
+            *(
+                render_chunk(pages[i : i + RENDER_CHUNK_SIZE])
+                for i in range(0, len(pages), RENDER_CHUNK_SIZE)
+            )
+        )
+        async with stage:
+            await asyncio.to_thread(
+                write_xml_files,
+                files=itertools.chain.from_iterable(rendered),
+                dir_out=dir_out,
+                encoding=encoding,
+            )
+
 
 @dataclasses.dataclass(frozen=True)
 class ExportSpec:
@@ -127,31 +286,96 @@ class ExportSpec:
     :param space_configs: List of space export configurations
     :param dir_out: Root output directory
     :param encoding: File encoding for all output files
+    :param space_cache: Optional cache of the space lookups, e.g. a
+        :class:`~docpack_confluence.cache.TTLCache` shared by repeated exports
+    :param space_cache_expire: Seconds a cached space lookup is reused
     """
 
+    # fmt: off
     space_configs: list[SpaceExportConfig] = dataclasses.field()
     dir_out: Path = dataclasses.field()
     encoding: str = dataclasses.field(default="utf-8")
+    space_cache: CacheLike | None = dataclasses.field(default=None)
+    space_cache_expire: int | None = dataclasses.field(default=3600)
+    # fmt: on
 
     @property
     def path_merged_output(self) -> Path:
         """Path to merged knowledge base file."""
         return self.dir_out / "all_in_one_knowledge_base.txt"
 
+    def resolve_spaces(self) -> list[T.Any]:
+        """
+        Look up the spaces of all configs in bulk, one listing by IDs and one
+        by keys per client (see
+        :func:`~docpack_confluence.shortcuts.get_spaces_by_ids_and_keys`),
+        through :attr:`space_cache` if set.
+
+        :returns: The space of every config, in the order of :attr:`space_configs`
+
+        :raises ValueError: If a config has neither ID nor key, or its space
+            is not found
+        """
+        # config indexes grouped by client
+        groups: dict[int, list[int]] = {}
+        for i, space_config in enumerate(self.space_configs):
+            _ = space_config.space_identifier  # validate
+            groups.setdefault(id(space_config.client), []).append(i)
+
+        spaces: dict[int, T.Any] = {}
+        for indexes in groups.values():
+            configs = [self.space_configs[i] for i in indexes]
+            ids = [c.space_id for c in configs if c.space_id is not None]
+            keys = [c.space_key for c in configs if c.space_id is None]
+            if self.space_cache is None:
+                spaces_by_id, spaces_by_key = get_spaces_by_ids_and_keys(
+                    client=configs[0].client,
+                    ids=ids,
+                    keys=keys,
+                )
+            else:
+                spaces_by_id, spaces_by_key = get_spaces_by_ids_and_keys_with_cache(
+                    client=configs[0].client,
+                    ids=ids,
+                    keys=keys,
+                    cache=self.space_cache,
+                    expire=self.space_cache_expire,
+                )
+            for i, space_config in zip(indexes, configs):
+                if space_config.space_id is not None:
+                    space = spaces_by_id.get(int(space_config.space_id))
+                else:
+                    space = spaces_by_key.get(space_config.space_key)
+                if space is None:
+                    raise ValueError(
+                        f"Space not found: {space_config.space_identifier}"
+                    )
+                spaces[i] = space
+        return [spaces[i] for i in range(len(self.space_configs))]
+
     def export(self) -> None:
         """
         Execute the export: crawl, filter, and export pages from all spaces,
         then merge into a single knowledge base file.
+
+        See :meth:`aexport` to export all spaces concurrently.
         """
+        # Look up all spaces up front, in bulk
+        spaces = self.resolve_spaces()
+
         # Clean output directory
         shutil.rmtree(self.dir_out, ignore_errors=True)
 
         # Export each space to its own subdirectory
         dir_out_list: list[Path] = []
-        for space_config in self.space_configs:
+        for space_config, space in zip(self.space_configs, spaces):
             dir_out_space = self.dir_out / space_config.space_identifier
             dir_out_list.append(dir_out_space)
-            space_config.export(dir_out=dir_out_space, encoding=self.encoding)
+            space_config.export(
+                dir_out=dir_out_space,
+                encoding=self.encoding,
+                space=space,
+            )
 
         # Merge all exported files into one
         merge_files(
@@ -161,3 +385,69 @@ class ExportSpec:
             input_encoding=self.encoding,
             output_encoding=self.encoding,
         )
+
+    async def aexport(
+        self,
+        max_concurrent_stages: int = 8,
+        executor: Executor | None = None,
+    ) -> None:
+        """
+        Coroutine version of :meth:`export` with the same output, where all
+        spaces are exported concurrently, see :meth:`SpaceExportConfig.aexport`.
+        A multi-space export takes about as long as its slowest space.
+
+        :param max_concurrent_stages: Max number of stages (space lookups,
+            crawls, body fetches, conversion chunks, file writes) running at
+            once, across all spaces. This is not a limit on HTTP requests: a
+            stage that fans out, such as a crawl or a body fetch, still sends
+            up to its space's ``max_workers`` requests at once.
+        :param executor: Executor of the CPU-bound markdown conversion, None
+            for the event loop's default thread pool
+
+        **Example**::
+
+            await ExportSpec(space_configs=configs, dir_out=dir_out).aexport(
+                executor=ProcessPoolExecutor(),
+            )
+        """
+        if max_concurrent_stages < 1:
+            raise ValueError(
+                f"max_concurrent_stages must be >= 1, got {max_concurrent_stages}"
+            )
+        limiter = asyncio.Semaphore(max_concurrent_stages)
+
+        # Look up all spaces up front, in bulk
+        async with limiter:
+            spaces = await asyncio.to_thread(self.resolve_spaces)
+
+        # Clean output directory
+        await asyncio.to_thread(shutil.rmtree, self.dir_out, ignore_errors=True)
+
+        dir_out_list = [
+            self.dir_out / space_config.space_identifier
+            for space_config in self.space_configs
+        ]
+        await asyncio.gather(
+            *(
+                space_config.aexport(
+                    dir_out=dir_out_space,
+                    encoding=self.encoding,
+                    limiter=limiter,
+                    executor=executor,
+                    space=space,
+                )
+                for space_config, dir_out_space, space in zip(
+                    self.space_configs, dir_out_list, spaces
+                )
+            )
+        )
+
+        # Merge all exported files into one
+        await asyncio.to_thread(
+            merge_files,
+            dir_in_list=dir_out_list,
+            path_out=self.path_merged_output,
+            ext=".xml",
+            input_encoding=self.encoding,
+            output_encoding=self.encoding,
+        )
@@ -48,10 +48,13 @@ class Pattern:
 
     :param id: The page or folder ID extracted from the URL
     :param mode: The matching mode (SELF, DESCENDANTS, or RECURSIVE)
+    :param type: "page" or "folder", from the URL format. Not part of equality,
+        IDs are unique across both types.
     """
 
     id: str
     mode: MatchMode
+    type: str = dataclasses.field(default="page", compare=False)
 
     def __repr__(self) -> str:
         suffix = {
@@ -106,7 +109,7 @@ def parse_pattern(url: str) -> Pattern:
     # Try to match folder URL
     match = _FOLDER_URL_PATTERN.match(url)
     if match:
-        return Pattern(id=match.group(1), mode=mode)
+        return Pattern(id=match.group(1), mode=mode, type="folder")
 
     raise ValueError(f"Invalid Confluence URL format: {url}")
 
@@ -231,6 +234,51 @@ class Selector:
         # Check if matches any include pattern
         return self._matches_any(self._include_patterns, id_path)
 
+    def may_select_descendants(
+        self,
+        id_path: T_ID_PATH,
+        resolve: T.Callable[[str], T_ID_PATH | None] | None = None,
+    ) -> bool:
+        """
+        Determine if any strict descendant of a node could pass the filter,
+        i.e. if the node's subtree is worth crawling any further.
+
+        :param id_path: The node's full ID path from root to current node
+        :param resolve: Optional lookup of a pattern target's ID path, returning
+            None if the target has not been seen yet. A known target lets an
+            include pattern rule out subtrees that are not above it.
+
+        :returns: False only if no descendant can match, True if unsure
+
+        **Logic**:
+
+        1. Node is at or below an exclude ``/*`` or ``/**`` target -> False
+        2. If include patterns are empty -> True
+        3. Node is at or below an include ``/*`` or ``/**`` target -> True
+        4. An include target may be a strict descendant of the node (unknown
+           yet, or its known ID path goes through the node) -> True
+        5. Otherwise -> False
+        """
+        path_ids = set(id_path)
+        for pattern in self._exclude_patterns:
+            if pattern.mode != MatchMode.SELF and pattern.id in path_ids:
+                return False
+
+        if not self._include_patterns:
+            return True
+
+        node_id = id_path[-1] if id_path else None
+        for pattern in self._include_patterns:
+            if pattern.mode != MatchMode.SELF and pattern.id in path_ids:
+                return True
+            if pattern.id in path_ids:
+                # SELF target is this node or one of its ancestors
+                continue
+            target_id_path = None if resolve is None else resolve(pattern.id)
+            if target_id_path is None or node_id in target_id_path[:-1]:
+                return True
+        return False
+
     def select(
         self,
         pages: T.Iterable[tuple[str, T_ID_PATH]],
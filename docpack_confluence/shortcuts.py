@@ -7,6 +7,8 @@ Shortcut wrappers for sanhe-confluence-sdk API with simplified parameters.
 import typing as T
 import time
 import gzip
+import collections
+from concurrent.futures import ThreadPoolExecutor, Future
 
 import httpx
 import orjson
@@ -15,11 +17,13 @@ import orjson
 from sanhe_confluence_sdk.api import Confluence
 from sanhe_confluence_sdk.api import paginate
 from sanhe_confluence_sdk.methods.model import T_RESPONSE
+from sanhe_confluence_sdk.methods.model import BaseResponse
 from sanhe_confluence_sdk.methods.space.get_space import GetSpaceRequest
 from sanhe_confluence_sdk.methods.space.get_space import GetSpaceRequestPathParams
 from sanhe_confluence_sdk.methods.space.get_space import GetSpaceResponse
 from sanhe_confluence_sdk.methods.space.get_spaces import GetSpacesRequest
 from sanhe_confluence_sdk.methods.space.get_spaces import GetSpacesRequestQueryParams
+from sanhe_confluence_sdk.methods.space.get_spaces import GetSpacesResponse
 from sanhe_confluence_sdk.methods.space.get_spaces import GetSpacesResponseResult
 from sanhe_confluence_sdk.methods.page.get_pages import GetPagesRequest
 from sanhe_confluence_sdk.methods.page.get_pages import GetPagesRequestQueryParams
@@ -50,12 +54,16 @@ from sanhe_confluence_sdk.methods.folder.delete_folder import DeleteFolderReques
 from sanhe_confluence_sdk.methods.folder.create_folder import CreateFolderRequest
 from sanhe_confluence_sdk.methods.folder.create_folder import CreateFolderRequestBodyParams
 from sanhe_confluence_sdk.methods.folder.create_folder import CreateFolderResponse
+from sanhe_confluence_sdk.methods.folder.get_folder import GetFolderRequest
+from sanhe_confluence_sdk.methods.folder.get_folder import GetFolderRequestPathParams
+from sanhe_confluence_sdk.methods.folder.get_folder import GetFolderResponse
 # fmt: on
 
 from .vendor.more_itertools import batched
 
 from .constants import GET_PAGE_DESCENDANTS_MAX_DEPTH
 from .type_hint import HasRawData, CacheLike
+from .cache import cached_fetch, load_decoded
 from .selector import Selector
 
 if T.TYPE_CHECKING:  # pragma: no cover
@@ -95,44 +103,224 @@ def get_space_by_key(
     return space
 
 
+# max number of IDs or keys in the filter of one spaces listing
+SPACES_FILTER_BATCH_SIZE = 100
+
+
+def iter_spaces_by_ids_and_keys(
+    client: Confluence,
+    ids: T.Iterable[int] = (),
+    keys: T.Iterable[str] = (),
+) -> T.Iterator[GetSpacesResponseResult]:
+    """
+    Lists the Confluence spaces with the given IDs or keys.
+
+    The ``ids`` and ``keys`` filters of the spaces listing are combined with
+    AND by the API, so spaces are listed by IDs and by keys separately, in
+    batches of :data:`SPACES_FILTER_BATCH_SIZE` (each batch fits in one page
+    of results). Duplicated IDs and keys are requested once, unknown ones are
+    left out of the results.
+
+    :param client: Authenticated Confluence API client
+    :param ids: IDs of the spaces to fetch
+    :param keys: Keys of the spaces to fetch
+    """
+    unique_ids = list(dict.fromkeys(int(id) for id in ids))
+    unique_keys = list(dict.fromkeys(keys))
+    for field, values in [("ids", unique_ids), ("keys", unique_keys)]:
+        for batch in batched(values, n=SPACES_FILTER_BATCH_SIZE):
+            query_params = GetSpacesRequestQueryParams(**{field: list(batch)})
+            request = GetSpacesRequest(query_params=query_params)
+            paginator = paginate(
+                client=client,
+                request=request,
+                response_type=GetSpacesResponse,
+                page_size=250,
+                max_items=len(batch),
+            )
+            yield from _iter_results(paginator)
+
+
+def get_spaces_by_ids_and_keys(
+    client: Confluence,
+    ids: T.Iterable[int] = (),
+    keys: T.Iterable[str] = (),
+) -> tuple[dict[int, GetSpacesResponseResult], dict[str, GetSpacesResponseResult]]:
+    """
+    Fetches many Confluence spaces by ID and by key in as few calls as
+    possible, see :func:`iter_spaces_by_ids_and_keys`.
+
+    :param client: Authenticated Confluence API client
+    :param ids: IDs of the spaces to fetch
+    :param keys: Keys of the spaces to fetch
+
+    :returns: Tuple of (spaces by integer ID, spaces by key). Only the
+        requested IDs and keys that exist are in them.
+    """
+    ids = [int(id) for id in ids]
+    keys = list(keys)
+    spaces_by_id: dict[int, GetSpacesResponseResult] = {}
+    spaces_by_key: dict[str, GetSpacesResponseResult] = {}
+    for space in iter_spaces_by_ids_and_keys(client=client, ids=ids, keys=keys):
+        spaces_by_id[int(space.id)] = space
+        spaces_by_key[space.raw_data.get("key")] = space
+    return (
+        {id: spaces_by_id[id] for id in ids if id in spaces_by_id},
+        {key: spaces_by_key[key] for key in keys if key in spaces_by_key},
+    )
+
+
+def _get_pages_batch(
+    client: Confluence,
+    ids: list[int],
+    body_format: str | None,
+) -> dict[int, GetPagesResponseResult]:
+    """
+    Fetch up to 250 pages in one request, keyed by integer page ID.
+    """
+    kwargs = {} if body_format is None else {"body_format": body_format}
+    query_params = GetPagesRequestQueryParams(
+        id=ids,
+        limit=250,
+        **kwargs,
+    )
+    request = GetPagesRequest(
+        query_params=query_params,
+    )
+    response = request.sync(client)
+    return {int(result.id): result for result in response.results}
+
+
+def iter_pages_by_ids(
+    client: Confluence,
+    ids: T.Iterable[int],
+    body_format: str | None = "atlas_doc_format",
+    max_workers: int = 1,
+    on_missing: T.Callable[[int], T.Any] | None = None,
+) -> T.Iterator[GetPagesResponseResult]:
+    """
+    Streaming version of :func:`get_pages_by_ids`.
+
+    IDs are requested in batches of 250, up to ``max_workers`` batches
+    concurrently. Results are yielded in the order of ``ids`` as soon as
+    their batch and all batches before it have arrived. At most
+    ``max_workers`` batches are held in the reorder buffer, so memory does
+    not grow with the number of IDs, and ``ids`` may itself be a lazy
+    iterator (e.g. pages streamed from the crawler).
+
+    :param client: Authenticated Confluence API client
+    :param ids: Confluence page IDs to fetch
+    :param body_format: Format of the page body content, None for metadata only
+    :param max_workers: Max number of batches fetched concurrently
+    :param on_missing: Called with each ID the API did not return (deleted
+        page, no permission, ...), which is then skipped. If None, a missing
+        ID raises ``KeyError``.
+
+    :returns: Iterator of page results in the order of the provided IDs
+
+    **Example**::
+
+        missing = []
+        for result in iter_pages_by_ids(
+            client,
+            (int(e.node.id) for e in pages),
+            max_workers=8,
+            on_missing=missing.append,
+        ):
+            ...
+    """
+    if max_workers < 1:
+        raise ValueError(f"max_workers must be >= 1, got {max_workers}")
+
+    id_batches = batched(ids, n=250)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # (id_batch, future) in input order, the reorder buffer
+        pending: collections.deque[tuple[tuple[int, ...], Future]] = collections.deque()
+
+        def submit_next():
+            id_batch = next(id_batches, None)
+            if id_batch is not None:
+                future = executor.submit(
+                    _get_pages_batch, client, list(id_batch), body_format
+                )
+                pending.append((id_batch, future))
+
+        for _ in range(max_workers):
+            submit_next()
+        try:
+            while pending:
+                id_batch, future = pending.popleft()
+                id_to_result_mapping = future.result()
+                submit_next()
+                for id in id_batch:
+                    result = id_to_result_mapping.get(int(id))
+                    if result is None:
+                        if on_missing is None:
+                            raise KeyError(id)
+                        on_missing(id)
+                        continue
+                    yield result
+        finally:
+            for _, future in pending:
+                future.cancel()
+
+
 def get_pages_by_ids(
     client: Confluence,
     ids: list[int],
-    body_format: str = "atlas_doc_format",
+    body_format: str | None = "atlas_doc_format",
+    max_workers: int = 1,
+    on_missing: T.Callable[[int], T.Any] | None = None,
 ) -> list[GetPagesResponseResult]:
     """
     Fetches multiple Confluence pages by their IDs in batches.
 
     :param client: Authenticated Confluence API client
     :param ids: List of Confluence page IDs to fetch
-    :param body_format: Format of the page body content
+    :param body_format: Format of the page body content, None for metadata only
+    :param max_workers: Max number of 250-ID batches fetched concurrently
+    :param on_missing: Called with each ID the API did not return, which is
+        then skipped. If None, a missing ID raises ``KeyError``, see
+        :func:`iter_pages_by_ids`
 
     :returns: List of page results strictly in the order of the provided IDs
     """
-    id_to_result_mapping = dict()
-    for id_batch in batched(ids, n=250):
-        query_params = GetPagesRequestQueryParams(
-            id=id_batch,
+    return list(
+        iter_pages_by_ids(
+            client=client,
+            ids=ids,
             body_format=body_format,
-            limit=250,
+            max_workers=max_workers,
+            on_missing=on_missing,
         )
-        request = GetPagesRequest(
-            query_params=query_params,
-        )
-        response = request.sync(client)
-        for result in response.results:
-            id_to_result_mapping[int(result.id)] = result
-    results = [
-        id_to_result_mapping[id]
-        for id in ids
-    ]
-    return results
+    )
+
+
+def _iter_results(
+    paginator: T.Iterable[T_RESPONSE],
+    on_response: T.Callable[[T_RESPONSE, float], T.Any] | None = None,
+) -> T.Iterator[T.Any]:
+    """
+    Flatten the results of a paginator, timing each page if ``on_response`` is given.
+
+    The clock restarts after the consumer resumes the iterator, so the time
+    spent processing results is not counted as request latency.
+    """
+    start = time.perf_counter()
+    for response in paginator:
+        if on_response is not None:
+            on_response(response, time.perf_counter() - start)
+        yield from response.results
+        start = time.perf_counter()
 
 
 def get_pages_in_space(
     client: Confluence,
     space_id: int,
     limit: int = 9999,
+    max_pages: int = 100,
+    body_format: str | None = "atlas_doc_format",
+    on_response: T.Callable[[GetPagesInSpaceResponse, float], T.Any] | None = None,
 ) -> T.Iterator[GetPagesInSpaceResponseResult]:
     """
     Crawls and retrieves all pages from a Confluence space using pagination.
@@ -140,15 +328,25 @@ def get_pages_in_space(
     :param client: Authenticated Confluence API client
     :param space_id: ID of the Confluence space to crawl
     :param limit: Number of pages to fetch
+    :param max_pages: Max number of API calls (of 250 pages each), a
+        safeguard against endless pagination
+    :param body_format: Body representation to include, None for metadata only
+        (id, title, parentId, parentType, position, ...), which keeps each
+        response small when only the hierarchy is needed
+    :param on_response: Optional callback ``(response, latency)`` called for
+        every page of API results, see :func:`get_descendants_of_page`
 
     :returns: Iterator of page results from the space
     """
     path_params = GetPagesInSpaceRequestPathParams(
         id=space_id,
     )
-    query_params = GetPagesInSpaceRequestQueryParams(
-        body_format="atlas_doc_format",
-    )
+    if body_format is None:
+        query_params = GetPagesInSpaceRequestQueryParams()
+    else:
+        query_params = GetPagesInSpaceRequestQueryParams(
+            body_format=body_format,
+        )
     request = GetPagesInSpaceRequest(
         path_params=path_params,
         query_params=query_params,
@@ -159,10 +357,112 @@ def get_pages_in_space(
         response_type=GetPagesInSpaceResponse,
         page_size=250,
         max_items=limit,
+        max_pages=max_pages,
     )
-    for response in paginator:
-        for result in response.results:
+    yield from _iter_results(paginator, on_response)
+
+
+def get_folder_by_id(
+    client: Confluence,
+    folder_id: int,
+) -> GetFolderResponse:
+    """
+    Fetches a Confluence folder by its ID.
+
+    :param client: Authenticated Confluence API client
+    :param folder_id: ID of the Confluence folder to fetch
+    """
+    path_params = GetFolderRequestPathParams(id=folder_id)
+    request = GetFolderRequest(path_params=path_params)
+    response = request.sync(client)
+    return response
+
+
+def get_ancestors(
+    client: Confluence,
+    node_id: int,
+    node_type: str = "page",
+) -> list[dict[str, T.Any]]:
+    """
+    Fetches the ancestor chain of a page or folder using the v2
+    ``/pages/{id}/ancestors`` or ``/folders/{id}/ancestors`` API.
+
+    sanhe-confluence-sdk has no ancestors request, so this calls the endpoint
+    directly with the client's authenticated HTTP session.
+
+    :param client: Authenticated Confluence API client
+    :param node_id: ID of the page or folder
+    :param node_type: "page" or "folder"
+
+    :returns: Raw ancestors (``{"id": ..., "type": ...}`` JSON dicts), top
+        to bottom, i.e. the space root first and the direct parent last
+    """
+    url = f"{client.url}/wiki/api/v2/{node_type}s/{node_id}/ancestors"
+    params = {"limit": 250}
+    ancestors = []
+    while url is not None:
+        http_res = client.sync_client.get(url, params=params)
+        response = BaseResponse.from_success_http_response(http_res)
+        ancestors.extend(response.raw_data.get("results", []))
+        # next link already carries the query string and cursor
+        next_link = response.raw_data.get("_links", {}).get("next")
+        if next_link:
+            url = f"{client.url}{next_link}"
+            params = None
+        else:
+            url = None
+    return ancestors
+
+
+def search_content_by_cql(
+    client: Confluence,
+    cql: str,
+    expand: list[str] | None = None,
+    limit: int = 999999,
+    page_size: int = 250,
+    on_response: T.Callable[[BaseResponse, float], T.Any] | None = None,
+) -> T.Iterator[dict[str, T.Any]]:
+    """
+    Search content with CQL using the v1 ``/wiki/rest/api/content/search`` API,
+    following the cursor based ``_links.next`` until all results are fetched.
+
+    The v2 API used by sanhe-confluence-sdk has no CQL search, so this calls
+    the endpoint directly with the client's authenticated HTTP session.
+
+    :param client: Authenticated Confluence API client
+    :param cql: CQL query, e.g. ``"ancestor = 123456"``
+    :param expand: Properties to expand, e.g. ``["ancestors"]``
+    :param limit: Stop after this many results
+    :param page_size: Results per API call (the server may cap it)
+    :param on_response: Optional callback ``(response, latency)`` called for
+        every page of API results, see :func:`get_descendants_of_page`
+
+    :returns: Iterator of raw content results (JSON dicts)
+    """
+    url = f"{client.url}/wiki/rest/api/content/search"
+    params = {"cql": cql, "limit": page_size}
+    if expand:
+        params["expand"] = ",".join(expand)
+    n_fetched = 0
+    while url is not None:
+        start = time.perf_counter()
+        http_res = client.sync_client.get(url, params=params)
+        response = BaseResponse.from_success_http_response(http_res)
+        if on_response is not None:
+            on_response(response, time.perf_counter() - start)
+        for result in response.raw_data.get("results", []):
             yield result
+            n_fetched += 1
+            if n_fetched >= limit:
+                return
+        # next link already carries the query string and cursor
+        links = response.raw_data.get("_links", {})
+        next_link = links.get("next")
+        if next_link:
+            url = links.get("base", f"{client.url}/wiki") + next_link
+            params = None
+        else:
+            url = None
 
 
 def get_descendants_of_page(
@@ -170,6 +470,7 @@ def get_descendants_of_page(
     page_id: int,
     limit: int = 9999,
     depth: int = GET_PAGE_DESCENDANTS_MAX_DEPTH,
+    on_response: T.Callable[[GetPageDescendantsResponse, float], T.Any] | None = None,
 ) -> T.Iterator[GetPageDescendantsResponseResult]:
     """
     Crawls and retrieves all descendant pages of a given Confluence page using pagination.
@@ -177,6 +478,9 @@ def get_descendants_of_page(
     :param client: Authenticated Confluence API client
     :param page_id: ID of the Confluence page whose descendants to fetch
     :param limit: Number of descendant pages to fetch
+    :param depth: Maximum depth to traverse (API limit is 5)
+    :param on_response: Optional callback ``(response, latency)`` called for
+        every page of API results, ``latency`` is the seconds spent waiting for it
     """
     path_params = GetPageDescendantsRequestPathParams(
         id=page_id,
@@ -196,9 +500,7 @@ def get_descendants_of_page(
         page_size=250,
         max_items=limit,
     )
-    for response in paginator:
-        for result in response.results:
-            yield result
+    yield from _iter_results(paginator, on_response)
 
 
 def get_descendants_of_folder(
@@ -206,6 +508,7 @@ def get_descendants_of_folder(
     folder_id: int,
     limit: int = 9999,
     depth: int = GET_PAGE_DESCENDANTS_MAX_DEPTH,
+    on_response: T.Callable[[GetFolderDescendantsResponse, float], T.Any] | None = None,
 ) -> T.Iterator[GetFolderDescendantsResponseResult]:
     """
     Crawls and retrieves all descendant entities of a given Confluence folder using pagination.
@@ -214,6 +517,8 @@ def get_descendants_of_folder(
     :param folder_id: ID of the Confluence folder whose descendants to fetch
     :param limit: Maximum number of descendant entities to fetch
     :param depth: Maximum depth to traverse (API limit is 5)
+    :param on_response: Optional callback ``(response, latency)`` called for
+        every page of API results, see :func:`get_descendants_of_page`
 
     :returns: Iterator of descendant results (pages and folders)
     """
@@ -235,9 +540,7 @@ def get_descendants_of_folder(
         page_size=250,
         max_items=limit,
     )
-    for response in paginator:
-        for result in response.results:
-            yield result
+    yield from _iter_results(paginator, on_response)
 
 
 def serialize_many(objects: list[HasRawData]) -> bytes:
@@ -262,6 +565,8 @@ def get_pages_in_space_with_cache(
     expire: int | None = 3600,
     force_refresh: bool = False,
     limit: int = 9999,
+    stale_while_revalidate: int | None = 0,
+    single_flight: bool = False,
 ) -> list[GetPagesInSpaceResponseResult]:
     """
     Retrieves all pages from a Confluence space with disk caching.
@@ -275,6 +580,11 @@ def get_pages_in_space_with_cache(
     :param expire: Cache expiration time in seconds (None for no expiration)
     :param force_refresh: If True, bypass cache and fetch fresh data
     :param limit: Maximum number of pages to fetch
+    :param stale_while_revalidate: Seconds an expired entry is still returned
+        while one background refresh runs, see
+        :func:`~docpack_confluence.cache.cached_fetch`
+    :param single_flight: If True, concurrent misses fetch only once,
+        see :func:`~docpack_confluence.cache.cached_fetch`
 
     :returns: List of page results from the space
     """
@@ -290,22 +600,188 @@ def get_pages_in_space_with_cache(
             )
         )
 
-    def store(pages):
-        cache.set(cache_key, serialize_many(pages), expire=expire)
-
-    if force_refresh:
+    def fetch_and_store(expire: int | None):
         pages = fetch()
-        store(pages)
+        cache.set(cache_key, serialize_many(pages), expire=expire)
         return pages
 
-    cached_data = cache.get(cache_key)
-    if cached_data is not None:
-        return deserialize_many(cached_data, GetPagesInSpaceResponseResult)
+    def load():
+        cached = load_decoded(
+            cache,
+            cache_key,
+            lambda b: deserialize_many(b, GetPagesInSpaceResponseResult),
+            kind=GetPagesInSpaceResponseResult.__name__,
+        )
+        if cached is not None:
+            # the decoded list may be shared through a MemoryCache
+            return list(cached)
+
+    return cached_fetch(
+        cache=cache,
+        key=cache_key,
+        load=load,
+        fetch_and_store=fetch_and_store,
+        expire=expire,
+        force_refresh=force_refresh,
+        stale_while_revalidate=stale_while_revalidate,
+        single_flight=single_flight,
+    )
+
+
+def _get_version_number(result: HasRawData) -> int | None:
+    """
+    Version number of a page result, None if the response has none.
+    """
+    version = result.raw_data.get("version") or {}
+    return version.get("number")
+
+
+def get_pages_by_ids_with_cache(
+    client: Confluence,
+    ids: list[int],
+    cache: CacheLike,
+    body_format: str = "atlas_doc_format",
+    expire: int | None = None,
+    force_refresh: bool = False,
+    max_workers: int = 1,
+    on_missing: T.Callable[[int], T.Any] | None = None,
+) -> list[GetPagesResponseResult]:
+    """
+    Fetches multiple Confluence pages by their IDs, downloading the body only
+    of pages that changed since they were cached.
+
+    A metadata-only pass (no body, 250 pages per request) reads the current
+    version number of every page first. Each page is cached under its ID
+    and version number, so a cache hit is always up to date, and only the
+    pages whose version moved are fetched with their body.
+
+    :param client: Authenticated Confluence API client
+    :param ids: List of Confluence page IDs to fetch
+    :param cache: cache like instance for storing page results
+    :param body_format: Format of the page body content
+    :param expire: Cache expiration time in seconds (None for no expiration).
+        Entries of old versions are never read again, an expiration lets
+        them age out.
+    :param force_refresh: If True, bypass cache and fetch every body
+    :param max_workers: Max number of batches fetched concurrently,
+        see :func:`iter_pages_by_ids`
+    :param on_missing: Called once with each ID the API did not return,
+        in either pass, which is then skipped. If None, a missing ID raises
+        ``KeyError``, see :func:`iter_pages_by_ids`
+
+    :returns: List of page results in the order of the provided IDs
+    """
+
+    def make_cache_key(page_id: int, version: int) -> str:
+        return f"get_pages_by_ids@{page_id}@v{version}@{body_format}"
+
+    # each ID is requested, and reported missing, at most once
+    unique_ids = list(dict.fromkeys(int(id) for id in ids))
+    versions: dict[int, int | None] = {}
+    for result in iter_pages_by_ids(
+        client=client,
+        ids=unique_ids,
+        body_format=None,
+        max_workers=max_workers,
+        on_missing=on_missing,
+    ):
+        versions[int(result.id)] = _get_version_number(result)
+
+    results_by_id: dict[int, GetPagesResponseResult] = {}
+    stale_ids: list[int] = []
+    for page_id, version in versions.items():
+        cached_data = None
+        if not force_refresh and version is not None:
+            cached_data = cache.get(make_cache_key(page_id, version))
+        if cached_data is None:
+            stale_ids.append(page_id)
+        else:
+            results_by_id[page_id] = deserialize_many(
+                cached_data, GetPagesResponseResult
+            )[0]
+
+    for result in iter_pages_by_ids(
+        client=client,
+        ids=stale_ids,
+        body_format=body_format,
+        max_workers=max_workers,
+        on_missing=on_missing,
+    ):
+        page_id = int(result.id)
+        results_by_id[page_id] = result
+        # key by the fetched version, the page may have moved on since the listing
+        version = _get_version_number(result)
+        if version is not None:
+            cache.set(
+                make_cache_key(page_id, version),
+                serialize_many([result]),
+                expire=expire,
+            )
+
+    return [results_by_id[int(id)] for id in ids if int(id) in results_by_id]
+
+
+def get_spaces_by_ids_and_keys_with_cache(
+    client: Confluence,
+    ids: T.Iterable[int],
+    keys: T.Iterable[str],
+    cache: CacheLike,
+    expire: int | None = 3600,
+    force_refresh: bool = False,
+) -> tuple[dict[int, GetSpacesResponseResult], dict[str, GetSpacesResponseResult]]:
+    """
+    :func:`get_spaces_by_ids_and_keys` with a cache of every space, so only
+    the IDs and keys missing from the cache are fetched, in bulk.
 
-    # Cache miss - fetch and cache
-    pages = fetch()
-    store(pages)
-    return pages
+    Each fetched space is cached under both its ID and its key, so a space
+    looked up by ID is a cache hit when it is later looked up by key.
+    Unknown IDs and keys are not cached.
+
+    :param client: Authenticated Confluence API client
+    :param ids: IDs of the spaces to fetch
+    :param keys: Keys of the spaces to fetch
+    :param cache: cache like instance for storing space results, e.g. a
+        :class:`~docpack_confluence.cache.TTLCache`
+    :param expire: Cache expiration time in seconds (None for no expiration)
+    :param force_refresh: If True, bypass cache and fetch every space
+
+    :returns: Tuple of (spaces by integer ID, spaces by key),
+        see :func:`get_spaces_by_ids_and_keys`
+    """
+    ids = [int(id) for id in ids]
+    keys = list(keys)
+
+    def make_cache_key(field: str, value: int | str) -> str:
+        return f"get_space@{field}-{value}"
+
+    def load(field: str, value: int | str) -> GetSpacesResponseResult | None:
+        if force_refresh:
+            return None
+        cached_data = cache.get(make_cache_key(field, value))
+        if cached_data is None:
+            return None
+        return deserialize_many(cached_data, GetSpacesResponseResult)[0]
+
+    spaces_by_id = {id: load("id", id) for id in ids}
+    spaces_by_key = {key: load("key", key) for key in keys}
+    for space in iter_spaces_by_ids_and_keys(
+        client=client,
+        ids=[id for id, space in spaces_by_id.items() if space is None],
+        keys=[key for key, space in spaces_by_key.items() if space is None],
+    ):
+        data = serialize_many([space])
+        key = space.raw_data.get("key")
+        cache.set(make_cache_key("id", int(space.id)), data, expire=expire)
+        if key is not None:
+            cache.set(make_cache_key("key", key), data, expire=expire)
+        if int(space.id) in spaces_by_id:
+            spaces_by_id[int(space.id)] = space
+        if key in spaces_by_key:
+            spaces_by_key[key] = space
+    return (
+        {id: space for id, space in spaces_by_id.items() if space is not None},
+        {key: space for key, space in spaces_by_key.items() if space is not None},
+    )
 
 
 def get_descendants_of_page_with_cache(
@@ -316,6 +792,8 @@ def get_descendants_of_page_with_cache(
     expire: int | None = 3600,
     force_refresh: bool = False,
     limit: int = 9999,
+    stale_while_revalidate: int | None = 0,
+    single_flight: bool = False,
 ) -> list[GetPageDescendantsResponseResult]:
     """
     Retrieves all descendant pages of a Confluence page with disk caching.
@@ -329,6 +807,11 @@ def get_descendants_of_page_with_cache(
     :param expire: Cache expiration time in seconds (None for no expiration)
     :param force_refresh: If True, bypass cache and fetch fresh data
     :param limit: Maximum number of descendant pages to fetch
+    :param stale_while_revalidate: Seconds an expired entry is still returned
+        while one background refresh runs, see
+        :func:`~docpack_confluence.cache.cached_fetch`
+    :param single_flight: If True, concurrent misses fetch only once,
+        see :func:`~docpack_confluence.cache.cached_fetch`
 
     :returns: List of descendant page results
     """
@@ -344,22 +827,32 @@ def get_descendants_of_page_with_cache(
             )
         )
 
-    def store(pages):
-        cache.set(cache_key, serialize_many(pages), expire=expire)
-
-    if force_refresh:
+    def fetch_and_store(expire: int | None):
         pages = fetch()
-        store(pages)
+        cache.set(cache_key, serialize_many(pages), expire=expire)
         return pages
 
-    cached_data = cache.get(cache_key)
-    if cached_data is not None:
-        return deserialize_many(cached_data, GetPageDescendantsResponseResult)
-
-    # Cache miss - fetch and cache
-    pages = fetch()
-    store(pages)
-    return pages
+    def load():
+        cached = load_decoded(
+            cache,
+            cache_key,
+            lambda b: deserialize_many(b, GetPageDescendantsResponseResult),
+            kind=GetPageDescendantsResponseResult.__name__,
+        )
+        if cached is not None:
+            # the decoded list may be shared through a MemoryCache
+            return list(cached)
+
+    return cached_fetch(
+        cache=cache,
+        key=cache_key,
+        load=load,
+        fetch_and_store=fetch_and_store,
+        expire=expire,
+        force_refresh=force_refresh,
+        stale_while_revalidate=stale_while_revalidate,
+        single_flight=single_flight,
+    )
 
 
 def get_descendants_of_folder_with_cache(
@@ -370,6 +863,8 @@ def get_descendants_of_folder_with_cache(
     expire: int | None = 3600,
     force_refresh: bool = False,
     limit: int = 9999,
+    stale_while_revalidate: int | None = 0,
+    single_flight: bool = False,
 ) -> list[GetFolderDescendantsResponseResult]:
     """
     Retrieves all descendant entities of a Confluence folder with disk caching.
@@ -383,6 +878,11 @@ def get_descendants_of_folder_with_cache(
     :param expire: Cache expiration time in seconds (None for no expiration)
     :param force_refresh: If True, bypass cache and fetch fresh data
     :param limit: Maximum number of descendant entities to fetch
+    :param stale_while_revalidate: Seconds an expired entry is still returned
+        while one background refresh runs, see
+        :func:`~docpack_confluence.cache.cached_fetch`
+    :param single_flight: If True, concurrent misses fetch only once,
+        see :func:`~docpack_confluence.cache.cached_fetch`
 
     :returns: List of descendant results (pages and folders)
     """
@@ -398,22 +898,32 @@ def get_descendants_of_folder_with_cache(
             )
         )
 
-    def store(descendants):
-        cache.set(cache_key, serialize_many(descendants), expire=expire)
-
-    if force_refresh:
+    def fetch_and_store(expire: int | None):
         descendants = fetch()
-        store(descendants)
+        cache.set(cache_key, serialize_many(descendants), expire=expire)
         return descendants
 
-    cached_data = cache.get(cache_key)
-    if cached_data is not None:
-        return deserialize_many(cached_data, GetFolderDescendantsResponseResult)
-
-    # Cache miss - fetch and cache
-    descendants = fetch()
-    store(descendants)
-    return descendants
+    def load():
+        cached = load_decoded(
+            cache,
+            cache_key,
+            lambda b: deserialize_many(b, GetFolderDescendantsResponseResult),
+            kind=GetFolderDescendantsResponseResult.__name__,
+        )
+        if cached is not None:
+            # the decoded list may be shared through a MemoryCache
+            return list(cached)
+
+    return cached_fetch(
+        cache=cache,
+        key=cache_key,
+        load=load,
+        fetch_and_store=fetch_and_store,
+        expire=expire,
+        force_refresh=force_refresh,
+        stale_while_revalidate=stale_while_revalidate,
+        single_flight=single_flight,
+    )
 
 
 def delete_pages_and_folders_in_space(
@@ -0,0 +1,246 @@
+# -*- coding: utf-8 -*-
+
+"""
+Versioned, columnar binary format for crawl snapshots (lists of crawled nodes).
+
+The JSON format of the first releases stored every node's raw data plus its
+full lineage ID list, which is ``O(N x depth)`` bytes. A snapshot stores one
+row per node in columns instead, with lineages encoded as parent pointers
+and repeated strings (titles, types, statuses) in string tables.
+
+**Layout**::
+
+    b"DPCS" | format version (1 byte) | codec (1 byte) | compressed payload
+
+The payload is the orjson dump of::
+
+    {
+        "ids": ["1001", "1002", ...],
+        "parents": [-1, 0, ...],  # row index of the parent, or -1 - k for
+                                  # the k-th entry of "external_parent_ids"
+        "external_parent_ids": ["1000"],  # parents outside the snapshot
+        "strings": ["p01", "page", "current", ...],  # string table
+        "titles": [0, ...],       # string table index, -1 for None
+        "types": [1, ...],
+        "statuses": [2, ...],
+        "positions": [0, ...],
+        "extras": [{"depth": 1}, ...],  # any other raw fields, or None
+        "missing": [None, ...],   # column fields absent from the raw data
+        "hidden": [5, ...],       # rows stored only as ancestors of other rows
+    }
+
+Use :func:`is_snapshot` to tell a snapshot from a legacy gzip JSON blob.
+"""
+
+import typing as T
+import gzip
+
+import orjson
+
+from .constants import SnapshotCodecEnum
+
+MAGIC = b"DPCS"
+FORMAT_VERSION = 1
+_HEADER_SIZE = len(MAGIC) + 2
+
+_CODEC_IDS: dict[SnapshotCodecEnum, int] = {
+    SnapshotCodecEnum.gzip: 1,
+    SnapshotCodecEnum.zstd: 2,
+    SnapshotCodecEnum.lz4: 3,
+}
+_CODECS_BY_ID = {v: k for k, v in _CODEC_IDS.items()}
+
+# raw node fields stored as dedicated columns
+_COLUMN_FIELDS_ORDER = ["parentId", "title", "type", "status", "childPosition"]
+_COLUMN_FIELDS = {"id", *_COLUMN_FIELDS_ORDER}
+
+
+def _import_codec(codec: SnapshotCodecEnum):
+    """
+    Import the optional compression library of ``codec``.
+    """
+    try:
+        if codec == SnapshotCodecEnum.zstd:
+            import zstandard
+
+            return zstandard
+        else:
+            import lz4.frame
+
+            return lz4.frame
+    except ImportError as e:  # pragma: no cover
+        raise ImportError(
+            f"The {codec.value!r} snapshot codec needs an optional dependency, "
+            f'run: pip install "docpack_confluence[{codec.value}]"'
+        ) from e
+
+
+def compress(data: bytes, codec: SnapshotCodecEnum) -> bytes:
+    codec = SnapshotCodecEnum(codec)
+    if codec == SnapshotCodecEnum.gzip:
+        return gzip.compress(data)
+    elif codec == SnapshotCodecEnum.zstd:
+        return _import_codec(codec).ZstdCompressor().compress(data)
+    else:
+        return _import_codec(codec).compress(data)
+
+
+def decompress(data: bytes, codec: SnapshotCodecEnum) -> bytes:
+    codec = SnapshotCodecEnum(codec)
+    if codec == SnapshotCodecEnum.gzip:
+        return gzip.decompress(data)
+    elif codec == SnapshotCodecEnum.zstd:
+        return _import_codec(codec).ZstdDecompressor().decompress(data)
+    else:
+        return _import_codec(codec).decompress(data)
+
+
+def is_snapshot(b: bytes) -> bool:
+    """
+    Whether ``b`` is in the snapshot format (as opposed to legacy gzip JSON).
+    """
+    return b[: len(MAGIC)] == MAGIC
+
+
+def encode_columns(
+    nodes: T.Iterable[dict[str, T.Any]],
+    hidden: T.Iterable[int] = (),
+) -> dict[str, T.Any]:
+    """
+    Encode raw node data into the snapshot columns.
+
+    :param nodes: Raw data of the nodes, every node's parent should be among
+        them unless it is the crawl root (or another node outside the snapshot)
+    :param hidden: Row indexes of nodes that are stored only as ancestors
+
+    :returns: The columns, see the module docstring
+    """
+    nodes = list(nodes)
+    row_by_id = {node["id"]: i for i, node in enumerate(nodes)}
+    external_parent_ids: dict[str, int] = {}
+    string_index: dict[str, int] = {}
+
+    def intern(value: str | None) -> int:
+        if value is None:
+            return -1
+        try:
+            return string_index[value]
+        except KeyError:
+            string_index[value] = len(string_index)
+            return string_index[value]
+
+    parents = []
+    titles = []
+    types = []
+    statuses = []
+    positions = []
+    extras = []
+    missing = []
+    for node in nodes:
+        parent_id = node.get("parentId")
+        parent_row = row_by_id.get(parent_id)
+        if parent_row is None:
+            if parent_id not in external_parent_ids:
+                external_parent_ids[parent_id] = len(external_parent_ids)
+            parent_row = -1 - external_parent_ids[parent_id]
+        parents.append(parent_row)
+        titles.append(intern(node.get("title")))
+        types.append(intern(node.get("type")))
+        statuses.append(intern(node.get("status")))
+        positions.append(node.get("childPosition"))
+        extra = {k: v for k, v in node.items() if k not in _COLUMN_FIELDS}
+        extras.append(extra or None)
+        absent = [k for k in _COLUMN_FIELDS_ORDER if k not in node]
+        missing.append(absent or None)
+
+    return {
+        "ids": list(row_by_id),
+        "parents": parents,
+        "external_parent_ids": list(external_parent_ids),
+        "strings": list(string_index),
+        "titles": titles,
+        "types": types,
+        "statuses": statuses,
+        "positions": positions,
+        "extras": extras,
+        "missing": missing,
+        "hidden": sorted(hidden),
+    }
+
+
+def decode_row(columns: dict[str, T.Any], row: int) -> dict[str, T.Any]:
+    """
+    Raw node data of one row of the snapshot columns.
+    """
+    strings = columns["strings"]
+    ids = columns["ids"]
+    parent = columns["parents"][row]
+    title = columns["titles"][row]
+    type = columns["types"][row]
+    status = columns["statuses"][row]
+    node = {
+        "id": ids[row],
+        "status": None if status < 0 else strings[status],
+        "title": None if title < 0 else strings[title],
+        "type": None if type < 0 else strings[type],
+        "parentId": (
+            ids[parent]
+            if parent >= 0
+            else columns["external_parent_ids"][-1 - parent]
+        ),
+        "childPosition": columns["positions"][row],
+    }
+    extra = columns["extras"][row]
+    if extra:
+        node.update(extra)
+    absent = columns["missing"][row]
+    if absent:
+        for k in absent:
+            node.pop(k)
+    return node
+
+
+def decode_columns(
+    columns: dict[str, T.Any],
+) -> tuple[list[dict[str, T.Any]], list[int], set[int]]:
+    """
+    Inverse of :func:`encode_columns`.
+
+    :returns: Tuple of (raw node data, parent row index or negative for nodes
+        whose parent is outside the snapshot, hidden row indexes)
+    """
+    nodes = [decode_row(columns, row) for row in range(len(columns["ids"]))]
+    return nodes, columns["parents"], set(columns["hidden"])
+
+
+def dump_snapshot(
+    columns: dict[str, T.Any],
+    codec: SnapshotCodecEnum = SnapshotCodecEnum.gzip,
+) -> bytes:
+    """
+    Serialize snapshot columns to bytes, header included.
+    """
+    codec = SnapshotCodecEnum(codec)
+    header = MAGIC + bytes([FORMAT_VERSION, _CODEC_IDS[codec]])
+    return header + compress(orjson.dumps(columns), codec)
+
+
+def load_snapshot(b: bytes) -> dict[str, T.Any]:
+    """
+    Deserialize bytes written by :func:`dump_snapshot` back to columns.
+
+    The whole payload is decompressed and parsed, every column is in memory
+    once this returns.
+
+    :raises ValueError: If ``b`` is not a snapshot, or written by a newer
+        format version or with an unknown codec
+    """
+    if not is_snapshot(b):
+        raise ValueError("Not a crawl snapshot")
+    version, codec_id = b[len(MAGIC)], b[len(MAGIC) + 1]
+    if version > FORMAT_VERSION:
+        raise ValueError(f"Unsupported crawl snapshot format version {version}")
+    if codec_id not in _CODECS_BY_ID:
+        raise ValueError(f"Unknown crawl snapshot codec {codec_id}")
+    return orjson.loads(decompress(b[_HEADER_SIZE:], _CODECS_BY_ID[codec_id]))
+
@@ -0,0 +1,381 @@
+# -*- coding: utf-8 -*-
+
+"""
+In-memory fake of the Confluence descendants API for offline crawler tests.
+
+Builds a page / folder hierarchy from spec strings (same format as
+:data:`docpack_confluence.tests.data.hierarchy_specs`) and serves
+``get_descendants_of_page`` / ``get_descendants_of_folder`` compatible
+responses, honoring the ``depth`` parameter, plus the flat
+``get_pages_in_space`` listing, the ``search_content_by_cql`` ancestor search
+and ``get_ancestors`` / ``get_pages_by_ids`` / ``get_folder_by_id`` /
+``get_space_by_id`` lookups.
+"""
+
+import typing as T
+import re
+import threading
+
+import httpx
+import orjson
+
+# fmt: off
+from sanhe_confluence_sdk.methods.descendant.get_page_descendants import GetPageDescendantsResponse
+from sanhe_confluence_sdk.methods.descendant.get_page_descendants import GetPageDescendantsResponseResult
+from sanhe_confluence_sdk.methods.page.get_pages import GetPagesResponseResult
+from sanhe_confluence_sdk.methods.page.get_pages_in_space import GetPagesInSpaceResponse
+from sanhe_confluence_sdk.methods.page.get_pages_in_space import GetPagesInSpaceResponseResult
+from sanhe_confluence_sdk.methods.folder.get_folder import GetFolderResponse
+from sanhe_confluence_sdk.methods.space.get_space import GetSpaceResponse
+from sanhe_confluence_sdk.methods.model import BaseResponse
+# fmt: on
+
+from .data import hierarchy_specs as default_hierarchy_specs
+
+
+class FakeSpace:
+    """
+    Fake Confluence space built from hierarchy spec strings.
+
+    Node IDs are assigned sequentially in spec order, starting right after
+    ``homepage_id``. Titles starting with ``"f"`` are folders, others are pages.
+
+    :param hierarchy_specs: Spec strings such as ``"p01-L1/f04-L4"``
+    :param homepage_id: ID of the space homepage (the crawl root)
+    :param space_id: ID of the space
+    :param page_size: Results per page of the ``get_pages_in_space`` listing
+    """
+
+    def __init__(
+        self,
+        hierarchy_specs: list[str] | None = None,
+        homepage_id: int = 1000,
+        space_id: int = 1,
+        page_size: int = 250,
+    ):
+        if hierarchy_specs is None:
+            hierarchy_specs = default_hierarchy_specs
+        self.homepage_id = str(homepage_id)
+        self.space_id = str(space_id)
+        self.page_size = page_size
+        self.title_to_id: dict[str, str] = {}
+        self.nodes: dict[str, dict[str, T.Any]] = {}
+        self.children: dict[str, list[str]] = {self.homepage_id: []}
+        self.calls: list[tuple[str, int]] = []
+        self.listing_calls: int = 0
+        self.search_calls: int = 0
+        self.folder_calls: list[str] = []
+        self.ancestor_calls: list[str] = []
+        self.page_calls: list[list[int]] = []
+        self.space_calls: int = 0
+        self._lock = threading.Lock()
+
+        next_id = homepage_id + 1
+        for spec in hierarchy_specs:
+            parts = spec.split("/")
+            title = parts[-1]
+            if len(parts) == 1:
+                parent_id = self.homepage_id
+            else:
+                parent_id = self.title_to_id[parts[-2]]
+            node_id = str(next_id)
+            next_id += 1
+            self.title_to_id[title] = node_id
+            self.nodes[node_id] = {
+                "id": node_id,
+                "status": "current",
+                "title": title,
+                "type": "folder" if title.startswith("f") else "page",
+                "parentId": parent_id,
+                "childPosition": len(self.children[parent_id]),
+            }
+            self.children[parent_id].append(node_id)
+            self.children[node_id] = []
+
+    def get_descendants(
+        self,
+        root_id: int,
+        depth: int,
+    ) -> list[GetPageDescendantsResponseResult]:
+        """
+        Return descendants of ``root_id`` down to ``depth`` levels, parents first.
+        """
+        with self._lock:
+            self.calls.append((str(root_id), depth))
+        results = []
+
+        def walk(parent_id: str, level: int):
+            for child_id in self.children[parent_id]:
+                raw_data = dict(self.nodes[child_id])
+                raw_data["depth"] = level
+                results.append(GetPageDescendantsResponseResult(_raw_data=raw_data))
+                if level < depth:
+                    walk(child_id, level + 1)
+
+        walk(str(root_id), 1)
+        return results
+
+    def _iter_descendants(
+        self,
+        root_id: int,
+        depth: int,
+        on_response: T.Callable[[GetPageDescendantsResponse, float], T.Any] | None,
+    ) -> T.Iterator[GetPageDescendantsResponseResult]:
+        results = self.get_descendants(root_id, depth)
+        if on_response is not None:
+            raw_data = {"results": [result.raw_data for result in results]}
+            response = GetPageDescendantsResponse(
+                _raw_data=raw_data,
+                _http_res=httpx.Response(200, content=orjson.dumps(raw_data)),
+            )
+            on_response(response, 0.0)
+        yield from results
+
+    def get_descendants_of_page(
+        self,
+        client,
+        page_id: int,
+        limit: int = 9999,
+        depth: int = 5,
+        on_response=None,
+        **kwargs,
+    ) -> T.Iterator[GetPageDescendantsResponseResult]:
+        yield from self._iter_descendants(page_id, depth, on_response)
+
+    def get_descendants_of_folder(
+        self,
+        client,
+        folder_id: int,
+        limit: int = 9999,
+        depth: int = 5,
+        on_response=None,
+        **kwargs,
+    ) -> T.Iterator[GetPageDescendantsResponseResult]:
+        yield from self._iter_descendants(folder_id, depth, on_response)
+
+    def _parent_type(self, node_id: str) -> str | None:
+        parent_id = self.nodes[node_id]["parentId"]
+        if parent_id == self.homepage_id:
+            return "page"
+        return self.nodes[parent_id]["type"]
+
+    def get_pages_in_space(
+        self,
+        client,
+        space_id: int,
+        limit: int = 9999,
+        max_pages: int = 100,
+        body_format: str | None = None,
+        on_response=None,
+        **kwargs,
+    ) -> T.Iterator[GetPagesInSpaceResponseResult]:
+        """
+        Serves ``page_size`` results per call and stops like the SDK
+        paginator: after ``max_pages`` calls, or once ``limit`` results
+        (at least one call's worth) were served.
+        """
+        raw_pages = [
+            {
+                "id": self.homepage_id,
+                "status": "current",
+                "title": "homepage",
+                "spaceId": self.space_id,
+                "parentId": None,
+                "parentType": None,
+                "position": 0,
+            }
+        ]
+        for node_id, node in self.nodes.items():
+            if node["type"] != "page":
+                continue
+            raw_pages.append(
+                {
+                    "id": node_id,
+                    "status": node["status"],
+                    "title": node["title"],
+                    "spaceId": self.space_id,
+                    "parentId": node["parentId"],
+                    "parentType": self._parent_type(node_id),
+                    "position": node["childPosition"],
+                }
+            )
+        max_items = max(limit, self.page_size)
+        for n_calls, start in enumerate(range(0, len(raw_pages), self.page_size)):
+            if n_calls >= max_pages or start >= max_items:
+                break
+            with self._lock:
+                self.listing_calls += 1
+            chunk = raw_pages[start : start + self.page_size]
+            raw_data = {"results": chunk, "_links": {}}
+            if start + self.page_size < len(raw_pages):
+                raw_data["_links"]["next"] = f"/next?cursor={start}"
+            if on_response is not None:
+                response = GetPagesInSpaceResponse(
+                    _raw_data=raw_data,
+                    _http_res=httpx.Response(200, content=orjson.dumps(raw_data)),
+                )
+                on_response(response, 0.0)
+            for raw_page in chunk:
+                yield GetPagesInSpaceResponseResult(_raw_data=raw_page)
+
+    def get_folder_by_id(self, client, folder_id: int) -> GetFolderResponse:
+        folder_id = str(folder_id)
+        with self._lock:
+            self.folder_calls.append(folder_id)
+        node = self.nodes[folder_id]
+        raw_data = {
+            "id": folder_id,
+            "type": "folder",
+            "status": node["status"],
+            "title": node["title"],
+            "parentId": node["parentId"],
+            "parentType": self._parent_type(folder_id),
+            "position": node["childPosition"],
+            "spaceId": self.space_id,
+        }
+        return GetFolderResponse(
+            _raw_data=raw_data,
+            _http_res=httpx.Response(200, content=orjson.dumps(raw_data)),
+        )
+
+    def _ancestors(self, node_id: str) -> list[dict[str, T.Any]]:
+        """Ancestor chain of a node, homepage first, direct parent last."""
+        ancestors = []
+        parent_id = self.nodes[node_id]["parentId"]
+        while parent_id != self.homepage_id:
+            node = self.nodes[parent_id]
+            ancestors.append(
+                {
+                    "id": parent_id,
+                    "type": node["type"],
+                    "status": node["status"],
+                    "title": node["title"],
+                }
+            )
+            parent_id = node["parentId"]
+        ancestors.append(
+            {
+                "id": self.homepage_id,
+                "type": "page",
+                "status": "current",
+                "title": "homepage",
+            }
+        )
+        return ancestors[::-1]
+
+    def get_ancestors(
+        self,
+        client,
+        node_id: int,
+        node_type: str = "page",
+    ) -> list[dict[str, T.Any]]:
+        node_id = str(node_id)
+        with self._lock:
+            self.ancestor_calls.append(node_id)
+        assert self.nodes[node_id]["type"] == node_type
+        return [
+            {"id": ancestor["id"], "type": ancestor["type"]}
+            for ancestor in self._ancestors(node_id)
+        ]
+
+    def get_pages_by_ids(
+        self,
+        client,
+        ids: list[int],
+        body_format: str | None = "atlas_doc_format",
+        **kwargs,
+    ) -> list[GetPagesResponseResult]:
+        with self._lock:
+            self.page_calls.append(list(ids))
+        results = []
+        for page_id in ids:
+            page_id = str(page_id)
+            node = self.nodes[page_id]
+            results.append(
+                GetPagesResponseResult(
+                    _raw_data={
+                        "id": page_id,
+                        "status": node["status"],
+                        "title": node["title"],
+                        "spaceId": self.space_id,
+                        "parentId": node["parentId"],
+                        "parentType": self._parent_type(page_id),
+                        "position": node["childPosition"],
+                    }
+                )
+            )
+        return results
+
+    def search_content_by_cql(
+        self,
+        client,
+        cql: str,
+        expand: list[str] | None = None,
+        limit: int = 999999,
+        page_size: int = 250,
+        on_response=None,
+    ) -> T.Iterator[dict[str, T.Any]]:
+        """
+        Supports ``ancestor = <id>`` followed by any number of
+        ``AND NOT ancestor = <id>`` only. Like the real content search, only
+        pages are returned, folders only show up in the ancestor chains.
+        """
+        match = re.fullmatch(r"ancestor = (\d+)((?: AND NOT ancestor = \d+)*)", cql)
+        root_id = match.group(1)
+        excluded_ids = set(re.findall(r"\d+", match.group(2)))
+        results = []
+        for node_id in self.nodes:
+            ancestors = self._ancestors(node_id)
+            if self.nodes[node_id]["type"] != "page":
+                continue
+            ancestor_ids = {a["id"] for a in ancestors}
+            if root_id not in ancestor_ids or ancestor_ids & excluded_ids:
+                continue
+            node = self.nodes[node_id]
+            results.append(
+                {
+                    "id": node_id,
+                    "type": "page",
+                    "status": node["status"],
+                    "title": node["title"],
+                    "ancestors": ancestors,
+                    "extensions": {"position": node["childPosition"]},
+                }
+            )
+        for start in range(0, len(results), self.page_size):
+            with self._lock:
+                self.search_calls += 1
+            chunk = results[start : start + self.page_size]
+            if on_response is not None:
+                raw_data = {"results": chunk}
+                response = BaseResponse(
+                    _raw_data=raw_data,
+                    _http_res=httpx.Response(200, content=orjson.dumps(raw_data)),
+                )
+                on_response(response, 0.0)
+            yield from chunk
+
+    def get_space_by_id(self, client, space_id: int) -> GetSpaceResponse:
+        with self._lock:
+            self.space_calls += 1
+        return GetSpaceResponse(
+            _raw_data={"id": self.space_id, "homepageId": self.homepage_id}
+        )
+
+    def install(self, monkeypatch, module) -> "FakeSpace":
+        """
+        Patch the shortcuts imported by ``module`` with this fake.
+        """
+        for name in [
+            "get_descendants_of_page",
+            "get_descendants_of_folder",
+            "get_pages_in_space",
+            "get_folder_by_id",
+            "get_space_by_id",
+            "get_ancestors",
+            "get_pages_by_ids",
+            "search_content_by_cql",
+        ]:
+            if hasattr(module, name):
+                monkeypatch.setattr(module, name, getattr(self, name))
+        return self
@@ -0,0 +1,398 @@
+# -*- coding: utf-8 -*-
+
+"""
+Client-side throttling shared by every request of a Confluence client.
+
+Confluence Cloud answers ``429 Too Many Requests`` (sometimes ``503``) with a
+``Retry-After`` header once a tenant goes over its rate limit. Instead of
+failing, :class:`ThrottledTransport` sits under the client's ``httpx.Client``
+(and :class:`AsyncThrottledTransport` under its ``httpx.AsyncClient``) so
+that every SDK call and every raw request in
+:mod:`docpack_confluence.shortcuts` and
+:mod:`docpack_confluence.async_shortcuts` goes through one :class:`Throttle`:
+
+- a :class:`TokenBucket` caps the request rate, and pauses *all* requests
+  until ``Retry-After`` has passed once the server pushes back
+- an :class:`AdaptiveConcurrency` limit grows by one slot per window of
+  successful requests and halves on every 429 / 503 (AIMD)
+- throttled requests are retried transparently
+
+**Example**::
+
+    from docpack_confluence.throttle import Throttle, install_throttle
+
+    throttle = install_throttle(client, Throttle())
+    # crawls and body fetches now run near the tenant's limit
+    entities = crawl_descendants(client, homepage_id, max_workers=8)
+"""
+
+import typing as T
+import dataclasses
+import threading
+import time
+import asyncio
+import email.utils
+
+import httpx
+
+from sanhe_confluence_sdk.api import Confluence
+
+
+@dataclasses.dataclass
+class TokenBucket:
+    """
+    Thread-safe token bucket rate limiter with a global pause.
+
+    :param rate: Tokens added per second, None for no rate limit
+    :param burst: Max number of tokens, i.e. requests allowed back to back
+    """
+
+    rate: float | None = 10.0
+    burst: int = 10
+
+    def __post_init__(self):
+        self._lock = threading.Lock()
+        self._tokens: float = float(self.burst)
+        self._updated_at: float = time.monotonic()
+        self._paused_until: float = 0.0
+
+    @property
+    def paused_until(self) -> float:
+        """``time.monotonic()`` timestamp until which all requests wait."""
+        return self._paused_until
+
+    def pause(self, seconds: float):
+        """
+        Hold every caller of :meth:`acquire` for ``seconds`` from now.
+        Overlapping pauses are merged, the latest end wins.
+        """
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def _try_acquire(self) -> float:
+        """
+        Take a token if one is available.
+
+        :returns: 0 if a token was taken, else the seconds to wait before trying again
+        """
+        with self._lock:
+            now = time.monotonic()
+            if now < self._paused_until:
+                return self._paused_until - now
+            if self.rate is None:
+                return 0.0
+            elapsed = now - self._updated_at
+            self._tokens = min(self.burst, self._tokens + elapsed * self.rate)
+            self._updated_at = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+    def acquire(self):
+        """
+        Block until a token is available and take it.
+        """
+        while wait := self._try_acquire():
+            time.sleep(wait)
+
+    async def aacquire(self):
+        """
+        Async version of :meth:`acquire`, waits without blocking the event loop.
+        """
+        while wait := self._try_acquire():
+            await asyncio.sleep(wait)
+
+
+@dataclasses.dataclass
+class AdaptiveConcurrency:
+    """
+    Thread-safe concurrency limit with additive increase, multiplicative
+    decrease (AIMD).
+
+    Every successful request raises the limit by ``1 / limit``, i.e. by one
+    slot per full window of successes. Every throttled request multiplies it
+    by ``decrease``. Callers beyond the current limit block in :meth:`acquire`.
+
+    :param initial: Starting limit
+    :param minimum: Lowest limit
+    :param maximum: Highest limit
+    :param decrease: Factor applied to the limit on throttling
+    :param poll_interval: Seconds between two checks of :meth:`aacquire`
+    """
+
+    initial: int = 4
+    minimum: int = 1
+    maximum: int = 32
+    decrease: float = 0.5
+    poll_interval: float = 0.01
+
+    def __post_init__(self):
+        self._cond = threading.Condition()
+        self._limit: float = float(self.initial)
+        self._in_flight: int = 0
+
+    @property
+    def limit(self) -> int:
+        """Current number of requests allowed in flight."""
+        return int(self._limit)
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def acquire(self):
+        """
+        Block until fewer than :attr:`limit` requests are in flight, then take a slot.
+        """
+        with self._cond:
+            while self._in_flight >= int(self._limit):
+                self._cond.wait()
+            self._in_flight += 1
+
+    async def aacquire(self):
+        """
+        Async version of :meth:`acquire`.
+
+        The limit is shared with sync callers in other threads, which cannot
+        wake up an event loop, so this polls every :attr:`poll_interval`
+        seconds instead of waiting on the condition.
+        """
+        while True:
+            with self._cond:
+                if self._in_flight < int(self._limit):
+                    self._in_flight += 1
+                    return
+            await asyncio.sleep(self.poll_interval)
+
+    def release(self, throttled: bool = False):
+        """
+        Give back a slot and adapt the limit.
+
+        :param throttled: True if the request was answered with 429 / 503
+        """
+        with self._cond:
+            self._in_flight -= 1
+            if throttled:
+                self._limit = max(self.minimum, self._limit * self.decrease)
+            else:
+                self._limit = min(self.maximum, self._limit + 1 / self._limit)
+            self._cond.notify_all()
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """
+    Parse a ``Retry-After`` header, either delay seconds or an HTTP date.
+
+    :returns: Seconds to wait (never negative), None if missing or invalid
+    """
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+@dataclasses.dataclass
+class Throttle:
+    """
+    Rate limit, adaptive concurrency and retry policy shared by all requests
+    of one or more clients.
+
+    :param bucket: Request rate limiter, also holds the ``Retry-After`` pause
+    :param concurrency: AIMD limit of requests in flight
+    :param retry_on: HTTP status codes that mean "slow down"
+    :param retry_methods: HTTP methods that are retried on any :attr:`retry_on`
+        status. Other methods, e.g. ``POST``, are only retried on a 429 with a
+        ``Retry-After`` header, which means the request was rejected before it
+        was processed; a 503 does not prove that. None retries every method
+    :param max_retries: Max number of retries of one throttled request
+    :param backoff: Delay of the first retry when there is no ``Retry-After``
+        header, doubled on every further retry
+    :param max_delay: Upper bound of any single wait in seconds
+    """
+
+    bucket: TokenBucket = dataclasses.field(default_factory=TokenBucket)
+    concurrency: AdaptiveConcurrency = dataclasses.field(
+        default_factory=AdaptiveConcurrency
+    )
+    retry_on: set[int] = dataclasses.field(default_factory=lambda: {429, 503})
+    retry_methods: set[str] | None = dataclasses.field(
+        default_factory=lambda: {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+    )
+    max_retries: int = 5
+    backoff: float = 1.0
+    max_delay: float = 60.0
+
+    def retry_delay(self, response: httpx.Response, attempt: int) -> float:
+        """
+        Seconds to wait before retrying a throttled ``response``.
+
+        :param attempt: 0-based number of the failed attempt
+        """
+        delay = parse_retry_after(response.headers.get("Retry-After"))
+        if delay is None:
+            delay = self.backoff * 2**attempt
+        return min(delay, self.max_delay)
+
+    def is_retryable(self, request: httpx.Request, response: httpx.Response) -> bool:
+        """
+        Whether a throttled ``response`` to ``request`` may be retried.
+        """
+        if self.retry_methods is None or request.method in self.retry_methods:
+            return True
+        return response.status_code == 429 and "Retry-After" in response.headers
+
+    def send(
+        self,
+        request: httpx.Request,
+        send: T.Callable[[httpx.Request], httpx.Response],
+    ) -> httpx.Response:
+        """
+        Send ``request`` with ``send`` under the throttle, retrying while the
+        server answers with one of :attr:`retry_on` and
+        :meth:`is_retryable` allows it.
+
+        :returns: The first response that is not retried, or the last
+            throttled one once the retries are exhausted
+        """
+        attempt = 0
+        while True:
+            self.bucket.acquire()
+            self.concurrency.acquire()
+            throttled = False
+            try:
+                response = send(request)
+                throttled = response.status_code in self.retry_on
+            finally:
+                self.concurrency.release(throttled=throttled)
+            if (
+                not throttled
+                or attempt >= self.max_retries
+                or not self.is_retryable(request, response)
+            ):
+                return response
+            self.bucket.pause(self.retry_delay(response, attempt))
+            response.close()
+            attempt += 1
+
+    async def asend(
+        self,
+        request: httpx.Request,
+        send: T.Callable[[httpx.Request], T.Awaitable[httpx.Response]],
+    ) -> httpx.Response:
+        """
+        Async version of :meth:`send`, ``send`` is a coroutine function.
+        """
+        attempt = 0
+        while True:
+            await self.bucket.aacquire()
+            await self.concurrency.aacquire()
+            throttled = False
+            try:
+                response = await send(request)
+                throttled = response.status_code in self.retry_on
+            finally:
+                self.concurrency.release(throttled=throttled)
+            if (
+                not throttled
+                or attempt >= self.max_retries
+                or not self.is_retryable(request, response)
+            ):
+                return response
+            self.bucket.pause(self.retry_delay(response, attempt))
+            await response.aclose()
+            attempt += 1
+
+
+class ThrottledTransport(httpx.BaseTransport):
+    """
+    ``httpx`` transport that sends every request through a :class:`Throttle`.
+
+    :param throttle: Shared throttle
+    :param transport: Wrapped transport, a default ``httpx.HTTPTransport`` if None
+    """
+
+    def __init__(
+        self,
+        throttle: Throttle,
+        transport: httpx.BaseTransport | None = None,
+    ):
+        self.throttle = throttle
+        self.transport = httpx.HTTPTransport() if transport is None else transport
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        return self.throttle.send(request, self.transport.handle_request)
+
+    def close(self):
+        self.transport.close()
+
+
+class AsyncThrottledTransport(httpx.AsyncBaseTransport):
+    """
+    Async counterpart of :class:`ThrottledTransport`.
+
+    :param throttle: Shared throttle
+    :param transport: Wrapped transport, a default ``httpx.AsyncHTTPTransport`` if None
+    """
+
+    def __init__(
+        self,
+        throttle: Throttle,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ):
+        self.throttle = throttle
+        self.transport = httpx.AsyncHTTPTransport() if transport is None else transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        return await self.throttle.asend(request, self.transport.handle_async_request)
+
+    async def aclose(self):
+        await self.transport.aclose()
+
+
+def install_throttle(
+    client: Confluence,
+    throttle: Throttle | None = None,
+) -> Throttle:
+    """
+    Route every request of ``client``, sync and async, through ``throttle``.
+
+    Wraps the transports given in ``client.sync_client_kwargs`` and
+    ``client.async_client_kwargs`` (if any) and rebuilds ``client.sync_client``
+    and ``client.async_client`` on next access. Both clients share the rate
+    and the concurrency limit of the throttle. Pass the same throttle to
+    several clients of one tenant to share its budget.
+
+    :param client: Confluence API client
+    :param throttle: Throttle to use, a default :class:`Throttle` if None
+
+    :returns: The installed throttle
+    """
+    if throttle is None:
+        throttle = Throttle()
+    transport = client.sync_client_kwargs.get("transport")
+    if isinstance(transport, ThrottledTransport):
+        transport = transport.transport
+    client.sync_client_kwargs["transport"] = ThrottledTransport(
+        throttle=throttle,
+        transport=transport,
+    )
+    async_transport = client.async_client_kwargs.get("transport")
+    if isinstance(async_transport, AsyncThrottledTransport):
+        async_transport = async_transport.transport
+    client.async_client_kwargs["transport"] = AsyncThrottledTransport(
+        throttle=throttle,
+        transport=async_transport,
+    )
+    # the clients are cached properties, drop them so they are rebuilt with the transports
+    client.__dict__.pop("sync_client", None)
+    client.__dict__.pop("async_client", None)
+    return throttle
@@ -10,23 +10,50 @@ def test():
     _ = api.GET_PAGE_DESCENDANTS_MAX_DEPTH
     _ = api.DescendantTypeEnum
     _ = api.BreadCrumbTypeEnum
+    _ = api.CrawlModeEnum
+    _ = api.SnapshotCodecEnum
     _ = api.T_ID_PATH
     _ = api.HasRawData
     _ = api.CacheLike
     _ = api.safe_write
+    _ = api.CacheLock
+    _ = api.cached_fetch
+    _ = api.MemoryCache
+    _ = api.TTLCache
+    _ = api.load_decoded
+    _ = api.TokenBucket
+    _ = api.AdaptiveConcurrency
+    _ = api.Throttle
+    _ = api.ThrottledTransport
+    _ = api.parse_retry_after
+    _ = api.install_throttle
+    _ = api.make_limits
+    _ = api.make_client
+    _ = api.warm_up_client
+    _ = api.awarm_up_client
+    _ = api.LoopLocalAsyncTransport
     _ = api.MatchMode
     _ = api.parse_pattern
     _ = api.is_match
     _ = api.Selector
     _ = api.get_space_by_id
     _ = api.get_space_by_key
+    _ = api.SPACES_FILTER_BATCH_SIZE
+    _ = api.iter_spaces_by_ids_and_keys
+    _ = api.get_spaces_by_ids_and_keys
     _ = api.get_pages_by_ids
+    _ = api.iter_pages_by_ids
     _ = api.get_pages_in_space
+    _ = api.get_folder_by_id
+    _ = api.search_content_by_cql
+    _ = api.get_ancestors
     _ = api.get_descendants_of_page
     _ = api.get_descendants_of_folder
     _ = api.serialize_many
     _ = api.deserialize_many
     _ = api.get_pages_in_space_with_cache
+    _ = api.get_pages_by_ids_with_cache
+    _ = api.get_spaces_by_ids_and_keys_with_cache
     _ = api.get_descendants_of_page_with_cache
     _ = api.get_descendants_of_folder_with_cache
     _ = api.delete_pages_and_folders_in_space
@@ -34,14 +61,39 @@ def test():
     _ = api.T_RESPONSE_TYPE
     _ = api.execute_with_retry
     _ = api.create_pages_and_folders
+    _ = api.arequest
+    _ = api.apaginate
+    _ = api.aget_space_by_id
+    _ = api.aget_space_by_key
+    _ = api.aiter_pages_by_ids
+    _ = api.aget_pages_by_ids
+    _ = api.aget_pages_in_space
+    _ = api.aget_descendants_of_page
+    _ = api.aget_descendants_of_folder
+    _ = api.RequestStats
+    _ = api.IterationStats
+    _ = api.CrawlStats
     _ = api.Entity
+    _ = api.EntityTree
+    _ = api.ClusterStrategy
+    _ = api.ParentClusterStrategy
+    _ = api.CostModelClusterStrategy
+    _ = api.CrawlCheckpoint
     _ = api.crawl_descendants
+    _ = api.iter_descendants
+    _ = api.crawl_entity_tree
     _ = api.serialize_entities
     _ = api.deserialize_entities
+    _ = api.SnapshotView
     _ = api.crawl_descendants_with_cache
+    _ = api.crawl_descendants_with_subtree_cache
     _ = api.filter_entities
+    _ = api.iter_filter_entities
     _ = api.select_entities
     _ = api.Page
+    _ = api.render_page_to_xml
+    _ = api.render_pages_to_xml
+    _ = api.write_xml_files
     _ = api.export_pages_to_xml_files
     _ = api.merge_files
     _ = api.SpaceExportConfig
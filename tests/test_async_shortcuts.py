@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+
+import httpx
+import pytest
+from sanhe_confluence_sdk.api import Confluence
+
+from docpack_confluence.async_shortcuts import (
+    aget_space_by_id,
+    aget_space_by_key,
+    aget_pages_by_ids,
+    aiter_pages_by_ids,
+    aget_pages_in_space,
+    aget_descendants_of_page,
+    aget_descendants_of_folder,
+)
+
+
+def make_client(handler) -> Confluence:
+    return Confluence(
+        url="https://example.atlassian.net",
+        username="user",
+        password="token",
+        async_client_kwargs={"transport": httpx.MockTransport(handler)},
+    )
+
+
+def paged_handler(requests: list[httpx.Request], path: str):
+    """
+    Serve 3 results over 2 pages of ``path``.
+    """
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        assert request.url.path == path
+        if "cursor" not in request.url.params:
+            data = {
+                "results": [{"id": "1"}, {"id": "2"}],
+                "_links": {"next": f"/wiki/api/v2{path[12:]}?cursor=abc"},
+            }
+        else:
+            data = {"results": [{"id": "3"}], "_links": {}}
+        return httpx.Response(200, json=data)
+
+    return handler
+
+
+async def collect(agen) -> list:
+    return [item async for item in agen]
+
+
+def test_aget_space():
+    requests: list[httpx.Request] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        if request.url.path == "/wiki/api/v2/spaces/1":
+            return httpx.Response(200, json={"id": "1", "homepageId": "1000"})
+        return httpx.Response(200, json={"results": [{"id": "2", "key": "DOC"}]})
+
+    client = make_client(handler)
+    space = asyncio.run(aget_space_by_id(client, space_id=1))
+    assert space.homepageId == "1000"
+    space = asyncio.run(aget_space_by_key(client, space_key="DOC"))
+    assert space.id == "2"
+    assert requests[1].url.path == "/wiki/api/v2/spaces"
+    assert requests[1].url.params["keys"] == "DOC"
+
+
+@pytest.mark.parametrize(
+    "func, path",
+    [
+        (aget_pages_in_space, "/wiki/api/v2/spaces/7/pages"),
+        (aget_descendants_of_page, "/wiki/api/v2/pages/7/descendants"),
+        (aget_descendants_of_folder, "/wiki/api/v2/folders/7/descendants"),
+    ],
+)
+def test_pagination(func, path):
+    requests: list[httpx.Request] = []
+    client = make_client(paged_handler(requests, path))
+    latencies = []
+    results = asyncio.run(
+        collect(
+            func(
+                client,
+                7,
+                on_response=lambda response, latency: latencies.append(latency),
+            )
+        )
+    )
+    assert [result.id for result in results] == ["1", "2", "3"]
+    assert len(latencies) == 2
+    assert requests[0].url.params["limit"] == "250"
+    assert requests[1].url.params["cursor"] == "abc"
+
+
+@pytest.mark.parametrize("max_workers", [1, 4])
+def test_aget_pages_by_ids(max_workers):
+    n_in_flight = 0
+    max_in_flight = 0
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        nonlocal n_in_flight, max_in_flight
+        n_in_flight += 1
+        max_in_flight = max(max_in_flight, n_in_flight)
+        await asyncio.sleep(0.02)
+        ids = request.url.params.get_list("id")
+        # results come back in any order, deleted pages are left out
+        results = [{"id": id} for id in reversed(ids) if int(id) % 100 != 7]
+        n_in_flight -= 1
+        return httpx.Response(200, json={"results": results, "_links": {}})
+
+    client = make_client(handler)
+    ids = list(range(1, 1001))
+    missing = []
+    results = asyncio.run(
+        aget_pages_by_ids(
+            client=client,
+            ids=ids,
+            max_workers=max_workers,
+            on_missing=missing.append,
+        )
+    )
+    assert [int(result.id) for result in results] == [
+        id for id in ids if id % 100 != 7
+    ]
+    assert missing == [id for id in ids if id % 100 == 7]
+    assert max_in_flight <= max_workers
+    assert (max_in_flight > 1) == (max_workers > 1)
+
+    # missing IDs fail loudly unless skipping is asked for
+    with pytest.raises(KeyError):
+        asyncio.run(aget_pages_by_ids(client=client, ids=ids, max_workers=max_workers))
+
+    # stopping early cancels the batches in flight
+    async def first_three() -> list[int]:
+        agen = aiter_pages_by_ids(client=client, ids=iter(ids), max_workers=max_workers)
+        firsts = [int((await anext(agen)).id) for _ in range(3)]
+        await agen.aclose()
+        return firsts
+
+    assert asyncio.run(first_three()) == [1, 2, 3]
+
+    with pytest.raises(ValueError):
+        asyncio.run(collect(aiter_pages_by_ids(client=client, ids=ids, max_workers=0)))
+
+
+if __name__ == "__main__":
+    from docpack_confluence.tests import run_cov_test
+
+    run_cov_test(
+        __file__,
+        "docpack_confluence.async_shortcuts",
+        preview=False,
+    )
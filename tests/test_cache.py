@@ -0,0 +1,423 @@
+# -*- coding: utf-8 -*-
+
+import threading
+import time
+
+import diskcache
+import pytest
+
+from docpack_confluence import crawler
+from docpack_confluence.cache import (
+    CacheLock,
+    TTLCache,
+    MemoryCache,
+    cached_fetch,
+    load_decoded,
+)
+from docpack_confluence.crawler import SnapshotView, crawl_descendants_with_cache
+from docpack_confluence.crawler import crawl_descendants_with_subtree_cache
+from docpack_confluence.tests.fake import FakeSpace
+
+
+class DictCache:
+    """Minimal CacheLike without an atomic ``add``."""
+
+    def __init__(self):
+        self.data = {}
+
+    def set(self, key, value, expire=None):
+        self.data[key] = value
+
+    def get(self, key, default=None):
+        return self.data.get(key, default)
+
+    def delete(self, key):
+        return self.data.pop(key, None) is not None
+
+    def clear(self):
+        n = len(self.data)
+        self.data.clear()
+        return n
+
+
+@pytest.fixture(params=["diskcache", "dict", "ttl"])
+def cache(request, tmp_path):
+    if request.param == "diskcache":
+        return diskcache.Cache(str(tmp_path))
+    if request.param == "ttl":
+        return TTLCache()
+    return DictCache()
+
+
+def _join_refreshes(key: str):
+    for thread in threading.enumerate():
+        if thread.name == f"refresh-{key}":
+            thread.join()
+
+
+def test_cache_lock(cache):
+    lock = CacheLock(cache, "lock")
+    other = CacheLock(cache, "lock")
+    assert lock.acquire(blocking=False)
+    assert not other.acquire(blocking=False)
+    assert not other.acquire(timeout=0.1)
+    lock.release()
+    with other:
+        assert not lock.acquire(blocking=False)
+    assert lock.acquire(blocking=False)
+    lock.release()
+
+
+def test_cache_lock_expire(cache):
+    lock = CacheLock(cache, "lock", expire=0.1)
+    other = CacheLock(cache, "lock")
+    assert lock.acquire()
+    # a crashed holder does not block the key forever
+    assert other.acquire(timeout=5)
+    # the expired holder does not release the new holder's lock
+    lock.release()
+    assert cache.get("lock") is not None
+    other.release()
+    assert cache.get("lock") is None
+
+
+def test_cache_lock_without_add():
+    cache = DictCache()
+    lock = CacheLock(cache, "lock")
+    assert lock.acquire(blocking=False)
+    # the lock state is kept in the cache, not in a process-wide registry
+    assert cache.get("lock") == lock._token
+    assert CacheLock(DictCache(), "lock").acquire(blocking=False)
+    lock.release()
+    assert cache.data == {}
+    # a foreign value in the lock key counts as held
+    cache.set("lock", b"1")
+    assert not lock.acquire(blocking=False)
+
+
+@pytest.mark.parametrize("backend", ["diskcache", "ttl"])
+def test_cache_lock_release_is_atomic(tmp_path, backend):
+    base = diskcache.Cache if backend == "diskcache" else TTLCache
+
+    class RacyCache(base):
+        race = None
+
+        def get(self, key, *args, **kwargs):
+            value = super().get(key, *args, **kwargs)
+            if key == "lock" and self.race is not None:
+                # our lock expires and another holder takes it right after the read
+                self.race.start()
+                self.race.join(0.2)
+                self.race = None
+            return value
+
+    cache = RacyCache(str(tmp_path)) if backend == "diskcache" else RacyCache()
+    lock = CacheLock(cache, "lock")
+    other = CacheLock(cache, "lock")
+    assert lock.acquire(blocking=False)
+
+    def take_over():
+        cache.delete("lock")
+        other.acquire()
+
+    thread = threading.Thread(target=take_over)
+    cache.race = thread
+    lock.release()
+    thread.join()
+    # the release did not delete the new holder's lock
+    assert cache.get("lock") == other._token
+    other.release()
+    assert cache.get("lock") is None
+
+
+def _make_source(delay: float = 0.0):
+    calls = []
+
+    def make_fetch_and_store(cache, key):
+        def fetch_and_store(expire):
+            calls.append(expire)
+            time.sleep(delay)
+            value = f"v{len(calls)}"
+            cache.set(key, value, expire=expire)
+            return value
+
+        return fetch_and_store
+
+    return calls, make_fetch_and_store
+
+
+def test_cached_fetch_stale_while_revalidate(cache):
+    calls, make_fetch_and_store = _make_source()
+    kwargs = dict(
+        cache=cache,
+        key="key",
+        load=lambda: cache.get("key"),
+        fetch_and_store=make_fetch_and_store(cache, "key"),
+        expire=60,
+        stale_while_revalidate=30,
+    )
+    assert cached_fetch(**kwargs) == "v1"
+    # the value outlives its freshness by the stale period
+    assert calls == [90]
+    assert cached_fetch(**kwargs) == "v1"
+    assert len(calls) == 1
+
+    # expired: the stale value is served, one refresh runs in the background
+    cache.delete("key@fresh")
+    assert cached_fetch(**kwargs) == "v1"
+    _join_refreshes("key")
+    assert len(calls) == 2
+    assert cached_fetch(**kwargs) == "v2"
+    assert cache.get("key@lock") is None
+
+    # entries written without the option count as stale
+    cache.set("key", "legacy")
+    cache.delete("key@fresh")
+    assert cached_fetch(**kwargs) == "legacy"
+    _join_refreshes("key")
+    assert cached_fetch(**kwargs) == "v3"
+
+    assert cached_fetch(force_refresh=True, **kwargs) == "v4"
+
+
+def test_cached_fetch_single_flight(cache):
+    calls, make_fetch_and_store = _make_source(delay=0.2)
+    results = []
+
+    def get():
+        results.append(
+            cached_fetch(
+                cache=cache,
+                key="key",
+                load=lambda: cache.get("key"),
+                fetch_and_store=make_fetch_and_store(cache, "key"),
+                single_flight=True,
+            )
+        )
+
+    threads = [threading.Thread(target=get) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert calls == [3600]
+    assert results == ["v1"] * 4
+
+
+def test_crawl_descendants_with_cache_stale_while_revalidate(monkeypatch, tmp_path):
+    fake_space = FakeSpace().install(monkeypatch, crawler)
+    cache = diskcache.Cache(str(tmp_path))
+    kwargs = dict(
+        client=None,
+        root_id=int(fake_space.homepage_id),
+        root_type=crawler.DescendantTypeEnum.page,
+        cache=cache,
+        cache_key="space",
+        stale_while_revalidate=None,
+        single_flight=True,
+    )
+    entities = crawl_descendants_with_cache(**kwargs)
+    n_calls = len(fake_space.calls)
+
+    cache.delete("space@fresh")
+    fake_space.calls.clear()
+    stale = crawl_descendants_with_cache(**kwargs)
+    assert len(stale) == len(entities)
+    _join_refreshes("space")
+    assert len(fake_space.calls) == n_calls
+    assert cache.get("space@fresh") is not None
+
+
+class LockSpyCache(TTLCache):
+    """TTLCache recording the expiration of every ``add``."""
+
+    def __init__(self):
+        super().__init__(max_entries=None)
+        self.adds = []
+
+    def add(self, key, value, expire=None):
+        self.adds.append((key, expire))
+        return super().add(key, value, expire=expire)
+
+
+def test_crawl_descendants_with_cache_lock_expire(monkeypatch):
+    fake_space = FakeSpace().install(monkeypatch, crawler)
+    cache = LockSpyCache()
+    crawl_descendants_with_cache(
+        client=None,
+        root_id=int(fake_space.homepage_id),
+        root_type=crawler.DescendantTypeEnum.page,
+        cache=cache,
+        cache_key="space",
+        per_subtree=True,
+        single_flight=True,
+        lock_expire=1234,
+    )
+    keys = [key for key, _ in cache.adds]
+    assert keys[:2] == ["space@lock", "space@top@lock"]
+    assert any(key.startswith("space@subtree@") for key in keys)
+    assert {expire for _, expire in cache.adds} == {1234}
+
+
+def test_crawl_descendants_with_subtree_cache_single_flight(monkeypatch):
+    fake_space = FakeSpace().install(monkeypatch, crawler)
+    cache = TTLCache(max_entries=None)
+    kwargs = dict(
+        client=None,
+        root_id=int(fake_space.homepage_id),
+        root_type=crawler.DescendantTypeEnum.page,
+        cache=cache,
+        cache_key="space",
+    )
+    expected = crawl_descendants_with_subtree_cache(**kwargs)
+    n_calls = len(fake_space.calls)
+    cache.clear()
+    fake_space.calls.clear()
+
+    # another caller is fetching the top when this one misses it
+    holder = CacheLock(cache, "space@top@lock")
+    holder.acquire()
+    results = []
+    thread = threading.Thread(
+        target=lambda: results.append(
+            crawl_descendants_with_subtree_cache(single_flight=True, **kwargs)
+        )
+    )
+    thread.start()
+    thread.join(0.2)
+    assert thread.is_alive()
+    # the holder stores every piece, then releases
+    crawl_descendants_with_subtree_cache(**kwargs)
+    holder.release()
+    thread.join()
+    assert results == [expected]
+    assert len(fake_space.calls) == n_calls
+
+
+
+def test_memory_cache(tmp_path):
+    backend = diskcache.Cache(str(tmp_path))
+    cache = MemoryCache(backend, max_entries=2)
+    decoded = []
+
+    def decode(b: bytes) -> list[bytes]:
+        decoded.append(b)
+        return [b]
+
+    cache.set("a", b"a1")
+    first = load_decoded(cache, "a", decode)
+    assert first == [b"a1"]
+    # a hit returns the very same object, without decoding again
+    assert load_decoded(cache, "a", decode) is first
+    assert decoded == [b"a1"]
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    # rewriting the key, even through another wrapper, invalidates the copy
+    MemoryCache(backend).set("a", b"a2")
+    assert load_decoded(cache, "a", decode) == [b"a2"]
+    # keys written to the backend directly are checked by content
+    backend.set("b", b"b1")
+    assert load_decoded(cache, "b", decode) == [b"b1"]
+    assert load_decoded(cache, "b", decode) == [b"b1"]
+    assert decoded == [b"a1", b"a2", b"b1"]
+    backend.set("b", b"b2")
+    assert load_decoded(cache, "b", decode) == [b"b2"]
+
+    # LRU eviction by entry count, then by size
+    cache.set("c", b"c1")
+    load_decoded(cache, "c", decode)
+    assert len(cache) == 2
+    assert "a" not in cache._entries
+    cache.max_bytes = 2
+    cache.set("d", b"d1")
+    load_decoded(cache, "d", decode)
+    assert list(cache._entries) == ["d"]
+    assert cache.n_bytes == 2
+
+    # deleted and missing keys
+    cache.delete("d")
+    assert load_decoded(cache, "d", decode) is None
+    assert cache.get("d") is None
+    assert load_decoded(DictCache(), "d", decode) is None
+    # backend features are forwarded
+    assert cache.add("e", b"e1")
+
+    # bookkeeping keys get no etag
+    cache.set("f@fresh", b"1")
+    cache.set("f@lock", b"token")
+    assert backend.get("f@fresh@etag") is None
+    assert backend.get("f@lock@etag") is None
+    cache.set("f", b"f1")
+    assert backend.get("f@etag") is not None
+
+    # a value dropped by the backend is not served from memory
+    assert load_decoded(cache, "f", decode) == [b"f1"]
+    backend.delete("f")
+    assert backend.get("f@etag") is not None
+    assert load_decoded(cache, "f", decode) is None
+    assert "f" not in cache._entries
+    # same without __contains__ on the backend
+    dict_cache = MemoryCache(DictCache())
+    dict_cache.set("g", b"g1")
+    assert load_decoded(dict_cache, "g", decode) == [b"g1"]
+    assert load_decoded(dict_cache, "g", decode) == [b"g1"]
+    dict_cache.backend.delete("g")
+    assert load_decoded(dict_cache, "g", decode) is None
+    cache.clear()
+    assert len(cache) == 0
+    assert backend.get("a") is None
+
+
+def test_crawl_descendants_with_memory_cache(monkeypatch, tmp_path):
+    fake_space = FakeSpace().install(monkeypatch, crawler)
+    cache = MemoryCache(diskcache.Cache(str(tmp_path)))
+    kwargs = dict(
+        client=None,
+        root_id=int(fake_space.homepage_id),
+        root_type=crawler.DescendantTypeEnum.page,
+        cache=cache,
+    )
+    entities = crawl_descendants_with_cache(**kwargs)
+    first = crawl_descendants_with_cache(**kwargs)
+    second = crawl_descendants_with_cache(**kwargs)
+    assert first == entities
+    assert first is not second
+    assert all(a is b for a, b in zip(first, second))
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    view = crawl_descendants_with_cache(lazy=True, **kwargs)
+    assert isinstance(view, SnapshotView)
+    assert crawl_descendants_with_cache(lazy=True, **kwargs) is view
+
+
+def test_ttl_cache():
+    cache = TTLCache(max_entries=3)
+    cache.set("a", 1, expire=0.05)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    assert not cache.add("a", 10)
+    time.sleep(0.06)
+    assert cache.get("a") is None
+    assert cache.get("a", "default") == "default"
+    assert cache.add("a", 10)
+    assert cache.get("a") == 10
+
+    # the oldest written keys go first when full
+    cache.set("c", 3)
+    cache.set("d", 4)
+    assert len(cache) == 3
+    assert cache.get("b") is None
+    assert cache.delete("c")
+    assert not cache.delete("c")
+    assert cache.clear() == 2
+    assert len(cache) == 0
+
+
+if __name__ == "__main__":
+    from docpack_confluence.tests import run_cov_test
+
+    run_cov_test(
+        __file__,
+        "docpack_confluence.cache",
+        preview=False,
+    )
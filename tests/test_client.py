@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+import pytest
+
+from docpack_confluence.client import make_limits, make_client, warm_up_client
+from docpack_confluence.client import awarm_up_client, LoopLocalAsyncTransport
+from docpack_confluence.shortcuts import get_space_by_id
+from docpack_confluence.async_shortcuts import aget_space_by_id
+from docpack_confluence.throttle import Throttle, ThrottledTransport
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def do_GET(self):
+        self.server.peers.add(self.client_address)
+        body = b'{"id": "1", "results": []}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    server.peers = set()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_make_limits():
+    limits = make_limits(16)
+    assert limits.max_connections == 16
+    assert limits.max_keepalive_connections == 16
+    with pytest.raises(ValueError):
+        make_limits(0)
+
+
+def test_make_client(server):
+    host, port = server.server_address
+    client = make_client(
+        url=f"http://{host}:{port}",
+        username="user",
+        password="token",
+        max_workers=4,
+        warm_up=True,
+    )
+    assert "sync_client" in client.__dict__
+    # one connection per worker opened up front ...
+    assert len(server.peers) == 4
+
+    # ... and reused by concurrent requests from many threads
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        list(executor.map(lambda _: get_space_by_id(client, 1), range(20)))
+    assert len(server.peers) == 4
+    assert warm_up_client(client, n_connections=2) == 2
+    assert len(server.peers) == 4
+
+
+def test_awarm_up_client(server):
+    host, port = server.server_address
+    client = make_client(
+        url=f"http://{host}:{port}",
+        username="user",
+        password="token",
+        max_workers=3,
+    )
+
+    async def main():
+        # the async transport has its own pool, with the same limits
+        assert await awarm_up_client(client, n_connections=3) == 3
+        assert len(server.peers) == 3
+        await asyncio.gather(*(aget_space_by_id(client, 1) for _ in range(12)))
+        assert len(server.peers) == 3
+        await client.async_client.aclose()
+
+    asyncio.run(main())
+    # the sync pool is still cold
+    assert get_space_by_id(client, 1).raw_data["id"] == "1"
+    assert len(server.peers) == 4
+
+
+def test_make_client_several_event_loops(server):
+    host, port = server.server_address
+    client = make_client(
+        url=f"http://{host}:{port}",
+        username="user",
+        password="token",
+    )
+    transport = client.async_client_kwargs["transport"]
+    assert isinstance(transport, LoopLocalAsyncTransport)
+
+    async def main():
+        space = await aget_space_by_id(client, 1)
+        return space.raw_data["id"]
+
+    # the cached async_client outlives the first loop
+    assert asyncio.run(main()) == "1"
+    assert asyncio.run(main()) == "1"
+
+
+def test_make_client_mock_transport():
+    requests: list[httpx.Request] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return httpx.Response(200, json={"id": "1"})
+
+    # the mock serves the async requests too, none of them reach the network
+    client = make_client(
+        url="https://example.atlassian.net",
+        username="user",
+        password="token",
+        transport=httpx.MockTransport(handler),
+    )
+    assert get_space_by_id(client, 1).raw_data["id"] == "1"
+    assert asyncio.run(aget_space_by_id(client, 1)).raw_data["id"] == "1"
+    assert len(requests) == 2
+
+    # a sync-only transport would let async requests bypass it
+    with pytest.raises(ValueError):
+        make_client(
+            url="https://example.atlassian.net",
+            username="user",
+            password="token",
+            transport=httpx.HTTPTransport(),
+        )
+    client = make_client(
+        url="https://example.atlassian.net",
+        username="user",
+        password="token",
+        transport=httpx.HTTPTransport(),
+        async_transport=httpx.MockTransport(handler),
+    )
+    assert asyncio.run(aget_space_by_id(client, 1)).raw_data["id"] == "1"
+    assert len(requests) == 3
+
+
+def test_make_client_throttle(server):
+    host, port = server.server_address
+    throttle = Throttle()
+    client = make_client(
+        url=f"http://{host}:{port}",
+        username="user",
+        password="token",
+        throttle=throttle,
+    )
+    assert isinstance(client.sync_client_kwargs["transport"], ThrottledTransport)
+    assert get_space_by_id(client, 1).raw_data["id"] == "1"
+    assert len(server.peers) == 1
+
+
+if __name__ == "__main__":
+    from docpack_confluence.tests import run_cov_test
+
+    run_cov_test(
+        __file__,
+        "docpack_confluence.client",
+        preview=False,
+    )
@@ -1,15 +1,1004 @@
 # -*- coding: utf-8 -*-
 
+import gzip
+import time
+import threading
+
+import pytest
+import diskcache
+import httpx
+import orjson
+
+from docpack_confluence import crawler
+from docpack_confluence.constants import CrawlModeEnum
+from docpack_confluence.crawl_stats import CrawlStats
 from docpack_confluence.crawler import (
     Entity,
+    EntityTree,
+    ParentClusterStrategy,
+    CostModelClusterStrategy,
+    CrawlCheckpoint,
+    crawl_descendants,
+    crawl_entity_tree,
+    iter_descendants,
+    crawl_descendants_with_cache,
+    crawl_descendants_with_subtree_cache,
+    filter_entities,
+    iter_filter_entities,
+    select_entities,
     serialize_entities,
     deserialize_entities,
+    SnapshotView,
 )
+from docpack_confluence.tests.fake import FakeSpace
 from sanhe_confluence_sdk.methods.descendant.get_page_descendants import (
     GetPageDescendantsResponseResult,
 )
 
 
+@pytest.fixture
+def fake_space(monkeypatch) -> FakeSpace:
+    return FakeSpace().install(monkeypatch, crawler)
+
+
+def _paths(entities: list[Entity]) -> list[tuple]:
+    """
+    Hierarchy content of entities, ignoring the ``depth`` field of the nodes,
+    which is relative to whichever root returned them.
+    """
+    return [
+        (e.node.type, e.id_path, e.title_path, e.position_path) for e in entities
+    ]
+
+
+def _to_url(fake_space: FakeSpace, pattern: str) -> str:
+    """
+    Page or folder URL pattern from a node title, e.g. ``"f04-L4/**"``.
+    Unknown titles (e.g. ``"homepage"``) point to the homepage.
+    """
+    title, _, suffix = pattern.partition("/")
+    node_id = fake_space.title_to_id.get(title, fake_space.homepage_id)
+    suffix = f"/{suffix}" if suffix else ""
+    if title.startswith("f"):
+        return f"https://example.atlassian.net/wiki/spaces/DEMO/folder/{node_id}{suffix}"
+    return f"https://example.atlassian.net/wiki/spaces/DEMO/pages/{node_id}/t{suffix}"
+
+
+def test_crawl_descendants(fake_space):
+    entities = crawl_descendants(
+        client=None,
+        root_id=int(fake_space.homepage_id),
+    )
+    assert len(entities) == 77
+    assert max(len(e.lineage) for e in entities) == 12
+    position_paths = [e.position_path for e in entities]
+    assert position_paths == sorted(position_paths)
+    for entity in entities:
+        assert entity.title_path == [n.title for n in reversed(entity.lineage)]
+        assert int(entity.node.title.split("-L")[1]) == len(entity.lineage)
+
+
+def test_crawl_descendants_max_workers(fake_space):
+    root_id = int(fake_space.homepage_id)
+    serial = crawl_descendants(client=None, root_id=root_id)
+    concurrent = crawl_descendants(client=None, root_id=root_id, max_workers=4)
+    assert concurrent == serial
+
+    with pytest.raises(ValueError):
+        crawl_descendants(client=None, root_id=root_id, max_workers=0)
+
+
+@pytest.mark.parametrize("max_workers", [1, 4])
+def test_crawl_descendants_pipelined(fake_space, max_workers):
+    root_id = int(fake_space.homepage_id)
+    lock_step = crawl_descendants(client=None, root_id=root_id)
+    pipelined = crawl_descendants(
+        client=None,
+        root_id=root_id,
+        max_workers=max_workers,
+        pipelined=True,
+    )
+    assert _paths(pipelined) == _paths(lock_step)
+
+
+@pytest.mark.parametrize("pipelined", [False, True])
+def test_iter_descendants(fake_space, pipelined):
+    root_id = int(fake_space.homepage_id)
+    expected = crawl_descendants(client=None, root_id=root_id)
+
+    # discovery order: every parent is yielded before its children
+    seen = set()
+    entities = []
+    for entity in iter_descendants(
+        client=None,
+        root_id=root_id,
+        max_workers=2,
+        pipelined=pipelined,
+    ):
+        assert entity.node.parentId in seen or len(entity.lineage) == 1
+        seen.add(entity.node.id)
+        entities.append(entity)
+    assert _paths(sorted(entities, key=lambda e: e.position_path)) == _paths(expected)
+
+    depth_first = iter_descendants(
+        client=None,
+        root_id=root_id,
+        pipelined=pipelined,
+        depth_first=True,
+    )
+    assert _paths(list(depth_first)) == _paths(expected)
+
+
+def test_iter_filter_entities(fake_space):
+    root_id = int(fake_space.homepage_id)
+    entities = crawl_descendants(client=None, root_id=root_id)
+    f04 = fake_space.title_to_id["f04-L4"]
+    include = [f"https://example.atlassian.net/wiki/spaces/DEMO/folder/{f04}/*"]
+    pages = iter_filter_entities(
+        iter_descendants(client=None, root_id=root_id),
+        include=include,
+    )
+    assert sorted(pages, key=lambda e: e.position_path) == filter_entities(
+        entities, include=include
+    )
+
+
+@pytest.mark.parametrize("pipelined", [False, True])
+def test_crawl_descendants_cluster_strategy(fake_space, pipelined):
+    root_id = int(fake_space.homepage_id)
+    expected = crawl_descendants(client=None, root_id=root_id)
+    n_parent_calls = len(fake_space.calls)
+
+    fake_space.calls.clear()
+    entities = crawl_descendants(
+        client=None,
+        root_id=root_id,
+        pipelined=pipelined,
+        cluster_strategy=CostModelClusterStrategy(),
+    )
+    assert _paths(entities) == _paths(expected)
+    assert len(fake_space.calls) <= n_parent_calls
+
+
+def test_crawl_entity_tree(fake_space):
+    root_id = fake_space.homepage_id
+    expected = crawl_descendants(client=None, root_id=int(root_id))
+    tree = crawl_entity_tree(client=None, root_id=int(root_id))
+    assert isinstance(tree, EntityTree)
+    assert len(tree) == 77
+    assert sorted(tree.values(), key=lambda e: e.position_path) == expected
+
+    # every node is stored once, ancestors are shared by reference
+    for entity in tree.values():
+        if entity.parent is not None:
+            assert entity.parent is tree[entity.node.parentId]
+            assert entity in tree.children(entity.node.parentId)
+    top_level = [e.node.id for e in tree.children(root_id)]
+    assert top_level == fake_space.children[root_id]
+    assert tree.children("not-exists") == []
+
+    # adding a known node returns the existing entity
+    entity = next(iter(tree.values()))
+    assert tree.add(entity.node) is entity
+    assert len(tree) == 77
+
+
+def test_entity_tree_iter_depth_first():
+    # siblings discovered out of position order, with a tie at position 1
+    tree = EntityTree()
+    specs = [
+        ("a", "0", 2),
+        ("b", "0", 0),
+        ("c", "0", 1),
+        ("d", "0", 1),
+        ("b2", "b", 1),
+        ("b1", "b", 0),
+        ("d1", "d", 0),
+        ("b11", "b1", 0),
+    ]
+    for node_id, parent_id, position in specs:
+        tree.add(
+            GetPageDescendantsResponseResult(
+                _raw_data={"id": node_id, "parentId": parent_id, "childPosition": position}
+            )
+        )
+    expected = sorted(tree.values(), key=lambda e: e.position_path)
+    result = list(tree.iter_depth_first())
+    assert [e.node.id for e in result] == [e.node.id for e in expected]
+    assert [e.node.id for e in result] == ["b", "b1", "b11", "b2", "c", "d", "d1", "a"]
+
+
+def test_entity_lineage_compat():
+    p1 = GetPageDescendantsResponseResult(_raw_data={"id": "1", "parentId": "0"})
+    p2 = GetPageDescendantsResponseResult(_raw_data={"id": "2", "parentId": "1"})
+    e1 = Entity(node=p1)
+    e2 = Entity(node=p2, parent=e1)
+    assert e2 == Entity(lineage=[p2, p1])
+    assert e2 != e1
+    assert e2.lineage == [p2, p1]
+    assert e2.id_path == ["1", "2"]
+    assert [e.node.id for e in e2.iter_lineage()] == ["2", "1"]
+
+    # with a shared pool, ancestors are built once and reused
+    p3 = GetPageDescendantsResponseResult(_raw_data={"id": "3", "parentId": "2"})
+    p4 = GetPageDescendantsResponseResult(_raw_data={"id": "4", "parentId": "2"})
+    pool = {}
+    e3 = Entity(lineage=[p3, p2, p1], pool=pool)
+    e4 = Entity(lineage=[p4, p2, p1], pool=pool)
+    assert e3.parent is e4.parent is pool["2"]
+    assert e3.parent.parent is pool["1"]
+    assert pool["3"] is e3 and pool["4"] is e4
+    # a node already in the pool keeps its interned entity
+    e2 = Entity(lineage=[p2, p1], pool=pool)
+    assert pool["2"] is not e2
+    assert e2 == pool["2"]
+    assert Entity(lineage=[p3, p2, p1]).parent is not e3.parent
+
+
+def test_entity_memoized_paths(fake_space):
+    tree = crawl_entity_tree(client=None, root_id=int(fake_space.homepage_id))
+    for entity in tree.values():
+        lineage = list(reversed(entity.lineage))
+        assert entity.id_path == [n.id for n in lineage]
+        assert entity.id_path is entity.id_path
+        assert entity.title_path == [n.title for n in lineage]
+        assert entity.position_path == [n.childPosition for n in lineage]
+        assert entity.id_breadcrumb_path == " ~ ".join(entity.id_path)
+        assert entity.title_breadcrumb_path == " ~ ".join(entity.title_path)
+
+    entities = list(tree.values())
+    assert sorted(entities, key=lambda e: e.sort_key) == sorted(
+        entities, key=lambda e: e.position_path
+    )
+
+
+@pytest.mark.parametrize(
+    "position_paths",
+    [
+        [[0], [0, 0], [0, 1], [1], [1, 0]],
+        [[-5], [-1, 7], [0], [3], [2**40]],
+    ],
+)
+def test_entity_sort_key(position_paths):
+    entities = []
+    for i, position_path in enumerate(position_paths):
+        parent = None
+        for j, position in enumerate(position_path):
+            node = GetPageDescendantsResponseResult(
+                _raw_data={"id": f"{i}-{j}", "childPosition": position}
+            )
+            parent = Entity(node=node, parent=parent)
+        entities.append(parent)
+    ordered = sorted(reversed(entities), key=lambda e: e.sort_key)
+    assert [e.position_path for e in ordered] == position_paths
+
+
+def test_request_stats_wire_bytes():
+    body = orjson.dumps({"results": [{"id": str(i)} for i in range(100)]})
+    compressed = gzip.compress(body)
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(
+            200, content=compressed, headers={"Content-Encoding": "gzip"}
+        )
+
+    with httpx.Client(transport=httpx.MockTransport(handler)) as client:
+        http_res = client.get("https://example.atlassian.net/wiki/api/v2/pages")
+    assert http_res.content == body
+
+    class Response:
+        _http_res = http_res
+
+    request = crawler._request_stats("1", "page", Response(), n_items=100, latency=0.1)
+    # the compressed size, not the decoded one
+    assert request.n_bytes == len(compressed) < len(body)
+
+    Response._http_res = httpx.Response(200, content=body)
+    assert crawler._request_stats("1", "page", Response(), 100, 0.1).n_bytes == len(body)
+    Response._http_res = None
+    assert crawler._request_stats("1", "page", Response(), 0, 0.1).n_bytes == 0
+
+
+@pytest.mark.parametrize("pipelined", [False, True])
+def test_crawl_descendants_stats(fake_space, pipelined):
+    root_id = int(fake_space.homepage_id)
+    stats = CrawlStats()
+    entities = crawl_descendants(
+        client=None,
+        root_id=root_id,
+        max_workers=2,
+        pipelined=pipelined,
+        stats=stats,
+    )
+    assert stats.n_new_nodes == len(entities) == 77
+    assert stats.n_roots == stats.n_requests == len(fake_space.calls)
+    assert stats.n_duplicates == sum(
+        len(fake_space.get_descendants(root_id, depth))
+        for root_id, depth in list(fake_space.calls)
+    ) - len(entities)
+    assert stats.n_bytes > 0
+    assert len(stats.latencies) == stats.n_requests
+    assert stats.elapsed > 0
+
+    # 12 levels: root -> L1-L5, then 2 more iterations to reach L12
+    first = stats.iterations[0]
+    assert (first.iteration, first.n_roots, first.n_duplicates) == (1, 1, 0)
+    # parents of the boundary nodes return them again as duplicates
+    assert first.n_boundary_nodes == stats.iterations[1].n_duplicates
+    assert len(stats.iterations) == 3
+
+
+def test_crawl_descendants_with_cache_stats(fake_space, tmp_path):
+    cache = diskcache.Cache(str(tmp_path))
+    root_id = int(fake_space.homepage_id)
+    kwargs = dict(
+        client=None,
+        root_id=root_id,
+        root_type=crawler.DescendantTypeEnum.page,
+        cache=cache,
+    )
+    stats = CrawlStats()
+    entities = crawl_descendants_with_cache(stats=stats, **kwargs)
+    assert stats.n_new_nodes == len(entities)
+    assert cache.get(f"crawl_descendants@page-{root_id}@stats") is not None
+
+    # cache hit: no API call, stats of the original crawl are loaded
+    fake_space.calls.clear()
+    cached_stats = CrawlStats()
+    cached = crawl_descendants_with_cache(stats=cached_stats, **kwargs)
+    assert fake_space.calls == []
+    assert _paths(cached) == _paths(entities)
+    assert cached_stats == stats
+    assert CrawlStats.from_dict(stats.to_dict()) == stats
+
+
+def test_crawl_descendants_with_subtree_cache(fake_space, tmp_path):
+    root_id = int(fake_space.homepage_id)
+    expected = crawl_descendants(client=None, root_id=root_id)
+    n_calls = len(fake_space.calls)
+    cache = diskcache.Cache(str(tmp_path))
+    expires = {}
+
+    def subtree_expire(entity: Entity) -> int:
+        expires[entity.node.id] = 60 * len(entity.id_path)
+        return expires[entity.node.id]
+
+    kwargs = dict(
+        client=None,
+        root_id=root_id,
+        root_type=crawler.DescendantTypeEnum.page,
+        cache=cache,
+        cache_key="space",
+        subtree_expire=subtree_expire,
+    )
+
+    # cold cache: same requests as the plain crawl
+    fake_space.calls.clear()
+    stats = CrawlStats()
+    entities = crawl_descendants_with_subtree_cache(stats=stats, **kwargs)
+    assert _paths(entities) == _paths(expected)
+    assert len(fake_space.calls) == n_calls
+    assert stats.n_requests == n_calls
+    # one piece per root clustered from the top
+    subtree_root_ids = list(expires)
+    assert len(subtree_root_ids) == 5
+    assert set(subtree_root_ids) < {root_id for root_id, _ in fake_space.calls}
+
+    # warm cache: rebuilt from the pieces
+    fake_space.calls.clear()
+    assert _paths(crawl_descendants_with_subtree_cache(**kwargs)) == _paths(expected)
+    assert fake_space.calls == []
+
+    # an expired subtree is the only one refetched
+    expired_type = fake_space.nodes[subtree_root_ids[1]]["type"]
+    cache.delete(f"space@subtree@{expired_type}-{subtree_root_ids[1]}")
+    fake_space.calls.clear()
+    assert _paths(crawl_descendants_with_subtree_cache(**kwargs)) == _paths(expected)
+    assert fake_space.calls[0][0] == subtree_root_ids[1]
+    assert len(fake_space.calls) == 2
+
+    # invalidating a node refetches the subtree containing it
+    deep_id = fake_space.calls[-1][0]
+    fake_space.calls.clear()
+    entities = crawl_descendants_with_subtree_cache(refresh_ids=[deep_id], **kwargs)
+    assert _paths(entities) == _paths(expected)
+    assert [root_id for root_id, _ in fake_space.calls] == [
+        subtree_root_ids[1],
+        deep_id,
+    ]
+
+    # invalidating the root refetches everything
+    fake_space.calls.clear()
+    entities = crawl_descendants_with_subtree_cache(refresh_ids=[root_id], **kwargs)
+    assert _paths(entities) == _paths(expected)
+    assert len(fake_space.calls) == n_calls
+
+
+def test_crawl_descendants_with_cache_per_subtree(fake_space, tmp_path):
+    cache = diskcache.Cache(str(tmp_path))
+    kwargs = dict(
+        client=None,
+        root_id=int(fake_space.homepage_id),
+        root_type=crawler.DescendantTypeEnum.page,
+        cache=cache,
+        cache_key="space",
+        per_subtree=True,
+    )
+    entities = crawl_descendants_with_cache(**kwargs)
+    assert len(entities) == 77
+    assert cache.get("space@top") is not None
+
+    # a forced refresh of the whole tree reuses the unexpired pieces
+    fake_space.calls.clear()
+    refreshed = crawl_descendants_with_cache(force_refresh=True, **kwargs)
+    assert fake_space.calls == []
+    assert _paths(refreshed) == _paths(entities)
+
+
+@pytest.mark.parametrize("pipelined", [False, True])
+def test_crawl_descendants_checkpoint(fake_space, monkeypatch, tmp_path, pipelined):
+    root_id = int(fake_space.homepage_id)
+    expected = crawl_descendants(client=None, root_id=root_id, pipelined=pipelined)
+    n_calls = len(fake_space.calls)
+
+    cache = diskcache.Cache(str(tmp_path))
+    checkpoint = CrawlCheckpoint(cache=cache, key="checkpoint")
+    get_descendants = fake_space.get_descendants
+
+    def flaky_get_descendants(root_id: int, depth: int):
+        if len(fake_space.calls) >= 8:
+            raise httpx.ConnectError("network blip")
+        return get_descendants(root_id, depth)
+
+    # the first run dies during iteration 3
+    fake_space.calls.clear()
+    monkeypatch.setattr(fake_space, "get_descendants", flaky_get_descendants)
+    with pytest.raises(httpx.ConnectError):
+        crawl_descendants(
+            client=None,
+            root_id=root_id,
+            pipelined=pipelined,
+            stats=CrawlStats(),
+            checkpoint=checkpoint,
+        )
+    assert cache.get("checkpoint") is not None
+
+    # the second run resumes from the last checkpoint
+    fake_space.calls.clear()
+    monkeypatch.setattr(fake_space, "get_descendants", get_descendants)
+    stats = CrawlStats()
+    entities = crawl_descendants(
+        client=None,
+        root_id=root_id,
+        pipelined=pipelined,
+        stats=stats,
+        checkpoint=checkpoint,
+    )
+    assert _paths(entities) == _paths(expected)
+    assert 0 < len(fake_space.calls) <= n_calls - 6
+    # saved stats are restored, the requests of both runs add up
+    assert stats.n_requests == n_calls
+    assert cache.get("checkpoint") is None
+
+    # a checkpoint of another root is ignored
+    checkpoint.save((1, "page"), EntityTree(), [(1, "page", 1)])
+    assert crawl_descendants(
+        client=None,
+        root_id=root_id,
+        pipelined=pipelined,
+        checkpoint=checkpoint,
+    ) == expected
+
+
+@pytest.mark.parametrize("n_ok_calls", [2, 5, 9])
+def test_crawl_descendants_checkpoint_resume_order(
+    fake_space, monkeypatch, tmp_path, n_ok_calls
+):
+    root_id = int(fake_space.homepage_id)
+    kwargs = dict(client=None, root_id=root_id, pipelined=True)
+    expected = [e.node.id for e in iter_descendants(**kwargs)]
+    expected_calls = list(fake_space.calls)
+
+    cache = diskcache.Cache(str(tmp_path))
+    checkpoint = CrawlCheckpoint(cache=cache, key="checkpoint")
+    get_descendants = fake_space.get_descendants
+
+    def flaky_get_descendants(root_id: int, depth: int):
+        if len(fake_space.calls) >= n_ok_calls:
+            raise httpx.ConnectError("network blip")
+        return get_descendants(root_id, depth)
+
+    # dies with roots still in flight
+    fake_space.calls.clear()
+    monkeypatch.setattr(fake_space, "get_descendants", flaky_get_descendants)
+    with pytest.raises(httpx.ConnectError):
+        for _ in iter_descendants(checkpoint=checkpoint, **kwargs):
+            pass
+    saved = orjson.loads(gzip.decompress(cache.get("checkpoint")))
+    in_flight = {root_id for root_id, _, _ in saved["frontier"]}
+    completed = set(saved["submitted"]) - in_flight
+    assert in_flight and completed
+    submitted = set()
+    checkpoint.restore((root_id, "page"), EntityTree(), submitted=submitted)
+    assert submitted == {int(root_id) for root_id in saved["submitted"]}
+
+    fake_space.calls.clear()
+    monkeypatch.setattr(fake_space, "get_descendants", get_descendants)
+    resumed = [e.node.id for e in iter_descendants(checkpoint=checkpoint, **kwargs)]
+    # same entities in the same order as the one-shot crawl
+    assert resumed == expected
+    # only the roots not completed before the crash are fetched
+    resumed_roots = [root_id for root_id, _ in fake_space.calls]
+    assert completed.isdisjoint(resumed_roots)
+    assert len(resumed_roots) == len(expected_calls) - len(completed)
+
+
+def test_crawl_descendants_checkpoint_modes(fake_space, tmp_path):
+    checkpoint = CrawlCheckpoint(cache=diskcache.Cache(str(tmp_path)), key="x")
+    root_id = int(fake_space.homepage_id)
+    space_id = int(fake_space.space_id)
+    for crawl_mode in [CrawlModeEnum.flat, CrawlModeEnum.cql]:
+        with pytest.raises(ValueError):
+            crawl_descendants(
+                client=None,
+                root_id=root_id,
+                crawl_mode=crawl_mode,
+                space_id=space_id,
+                checkpoint=checkpoint,
+            )
+    with pytest.raises(ValueError):
+        crawl_descendants(
+            client=None,
+            root_id=root_id,
+            selector=crawler.Selector(include=["p01-L1/**"]),
+            from_include_roots=True,
+            checkpoint=checkpoint,
+        )
+    # auto mode picks the resumable clustered crawl
+    fake_space.calls.clear()
+    entities = crawl_descendants(
+        client=None,
+        root_id=root_id,
+        space_id=space_id,
+        checkpoint=checkpoint,
+    )
+    assert len(entities) == 77
+    assert fake_space.listing_calls == 0
+    assert fake_space.calls != []
+
+
+def test_crawl_descendants_with_cache_checkpoint(fake_space, tmp_path):
+    cache = diskcache.Cache(str(tmp_path))
+    entities = crawl_descendants_with_cache(
+        client=None,
+        root_id=int(fake_space.homepage_id),
+        root_type=crawler.DescendantTypeEnum.page,
+        cache=cache,
+        cache_key="space",
+        checkpoint=True,
+    )
+    assert len(entities) == 77
+    assert cache.get("space@checkpoint") is None
+
+
+class TestFlatCrawl:
+    def test_flat_matches_clustered(self, fake_space):
+        root_id = int(fake_space.homepage_id)
+        clustered = crawl_descendants(client=None, root_id=root_id)
+        # the flat listing only discovers pages and the folders above them
+        with_pages = {
+            entity_id
+            for entity in clustered
+            if entity.node.type == "page"
+            for entity_id in entity.id_path
+        }
+        expected = [e for e in clustered if e.node.id in with_pages]
+        assert len(expected) < len(clustered)
+
+        fake_space.calls.clear()
+        stats = CrawlStats()
+        flat = crawl_descendants(
+            client=None,
+            root_id=root_id,
+            crawl_mode=CrawlModeEnum.flat,
+            space_id=int(fake_space.space_id),
+            max_workers=4,
+            stats=stats,
+        )
+        assert _paths(flat) == _paths(expected)
+        assert fake_space.calls == []
+        assert fake_space.listing_calls == 1
+        assert len(fake_space.folder_calls) == len(set(fake_space.folder_calls))
+        assert stats.n_requests == 1 + len(fake_space.folder_calls)
+        assert stats.n_new_nodes == len(flat)
+        assert stats.iterations[0].n_duplicates == 1  # the homepage itself
+
+        # flat crawl of a folder subtree
+        f04 = fake_space.title_to_id["f04-L4"]
+        subtree = crawl_descendants(
+            client=None,
+            root_id=int(f04),
+            root_type=crawler.DescendantTypeEnum.folder,
+            crawl_mode=CrawlModeEnum.flat,
+            space_id=int(fake_space.space_id),
+        )
+        level = next(len(e.id_path) for e in expected if e.node.id == f04)
+        assert [e.id_path for e in subtree] == [
+            e.id_path[level:] for e in expected if f04 in e.id_path[:-1]
+        ]
+
+    def test_flat_requires_space_id(self, fake_space):
+        with pytest.raises(ValueError):
+            crawl_descendants(
+                client=None,
+                root_id=int(fake_space.homepage_id),
+                crawl_mode=CrawlModeEnum.flat,
+            )
+
+    @pytest.mark.parametrize(
+        "page_size, root_title, include_title, expected_mode",
+        [
+            (250, None, None, "flat"),  # whole space in one listing call
+            (250, "f04-L4", None, "flat"),
+            (10, None, None, "flat"),  # whole-space crawl
+            (10, "f04-L4", None, "clustered"),  # subtree of a large space
+            (10, None, "f04-L4", "clustered"),  # narrow selector scope
+        ],
+    )
+    def test_auto_mode(
+        self, monkeypatch, page_size, root_title, include_title, expected_mode
+    ):
+        fake_space = FakeSpace(page_size=page_size).install(monkeypatch, crawler)
+        if root_title is None:
+            root_id, root_type = fake_space.homepage_id, "page"
+        else:
+            root_id = fake_space.title_to_id[root_title]
+            root_type = fake_space.nodes[root_id]["type"]
+        include = None
+        if include_title is not None:
+            node_id = fake_space.title_to_id[include_title]
+            include = [f"https://x.atlassian.net/wiki/spaces/X/folder/{node_id}/**"]
+        select_entities(
+            client=None,
+            root_id=int(root_id),
+            root_type=crawler.DescendantTypeEnum(root_type),
+            include=include,
+            space_id=int(fake_space.space_id),
+        )
+        n_pages = 1 + sum(n["type"] == "page" for n in fake_space.nodes.values())
+        if expected_mode == "flat":
+            assert fake_space.calls == []
+            assert fake_space.listing_calls == -(-n_pages // page_size)
+        else:
+            assert len(fake_space.calls) > 0
+            # only the probe page of the listing was fetched
+            assert fake_space.listing_calls == 1
+
+    def test_auto_mode_without_space_id(self, fake_space):
+        crawl_descendants(client=None, root_id=int(fake_space.homepage_id))
+        assert fake_space.listing_calls == 0
+        assert len(fake_space.calls) > 0
+
+    def test_auto_mode_known_homepage_id(self, monkeypatch):
+        fake_space = FakeSpace(page_size=10).install(monkeypatch, crawler)
+        kwargs = dict(
+            client=None,
+            root_id=int(fake_space.homepage_id),
+            root_type=crawler.DescendantTypeEnum.page,
+            space_id=int(fake_space.space_id),
+        )
+        select_entities(**kwargs)
+        assert fake_space.space_calls == 1
+        fake_space.space_calls = 0
+        fake_space.listing_calls = 0
+        select_entities(**kwargs, homepage_id=int(fake_space.homepage_id))
+        assert fake_space.space_calls == 0
+        assert fake_space.calls == []  # still the flat crawl
+        assert fake_space.listing_calls > 1
+
+    def test_auto_mode_keeps_nodes_without_pages(self, monkeypatch):
+        # f1 and f1/f2 have no page below them
+        fake_space = FakeSpace(["p1", "f1", "f1/f2", "p1/p2"]).install(
+            monkeypatch, crawler
+        )
+        kwargs = dict(client=None, root_id=int(fake_space.homepage_id))
+        clustered = crawl_descendants(**kwargs)
+        assert sorted(e.node.title for e in clustered) == ["f1", "f2", "p1", "p2"]
+
+        # auto returns the full descendant set, even with a space_id
+        fake_space.listing_calls = 0
+        space_id = int(fake_space.space_id)
+        auto = crawl_descendants(**kwargs, space_id=space_id)
+        assert _paths(auto) == _paths(clustered)
+        assert fake_space.listing_calls == 0
+        tree = crawl_entity_tree(**kwargs, space_id=space_id)
+        assert sorted(tree) == sorted(e.node.id for e in clustered)
+
+        # the flat crawl misses them, which does not change a page selection
+        flat = crawl_descendants(
+            **kwargs, crawl_mode=CrawlModeEnum.flat, space_id=space_id
+        )
+        assert sorted(e.node.title for e in flat) == ["p1", "p2"]
+        selected = select_entities(
+            **kwargs, root_type=crawler.DescendantTypeEnum.page, space_id=space_id
+        )
+        assert fake_space.listing_calls == 2  # flat crawl, then auto -> flat
+        assert _paths(selected) == _paths(
+            select_entities(**kwargs, root_type=crawler.DescendantTypeEnum.page)
+        )
+        assert [e.node.title for e in selected] == ["p1", "p2"]
+
+    def test_flat_listing_is_not_truncated(self, monkeypatch):
+        # 151 listing calls, more than the paginator's default of 100
+        specs = [f"p{i:03d}" for i in range(150)]
+        fake_space = FakeSpace(specs, page_size=1).install(monkeypatch, crawler)
+        entities = crawl_descendants(
+            client=None,
+            root_id=int(fake_space.homepage_id),
+            crawl_mode=CrawlModeEnum.flat,
+            space_id=int(fake_space.space_id),
+        )
+        assert [e.node.title for e in entities] == specs
+        assert fake_space.listing_calls == 151
+
+        # the fake caps the listing like the real paginator
+        listing = fake_space.get_pages_in_space(None, int(fake_space.space_id))
+        assert len(list(listing)) == 100
+
+
+def test_crawl_descendants_cql(monkeypatch):
+    fake_space = FakeSpace(page_size=10).install(monkeypatch, crawler)
+    root_id = int(fake_space.homepage_id)
+    clustered = crawl_descendants(client=None, root_id=root_id)
+    # the search only finds pages and the folders above them
+    with_pages = {
+        entity_id
+        for entity in clustered
+        if entity.node.type == "page"
+        for entity_id in entity.id_path
+    }
+    expected = [e for e in clustered if e.node.id in with_pages]
+
+    # some results come back without their position
+    search_content_by_cql = fake_space.search_content_by_cql
+    no_position = {fake_space.title_to_id[t] for t in ["p05-L5", "p38-L4"]}
+
+    def search_without_some_positions(*args, **kwargs):
+        for result in search_content_by_cql(*args, **kwargs):
+            if result["id"] in no_position:
+                result = {k: v for k, v in result.items() if k != "extensions"}
+            yield result
+
+    monkeypatch.setattr(crawler, "search_content_by_cql", search_without_some_positions)
+
+    fake_space.calls.clear()
+    stats = CrawlStats()
+    entities = crawl_descendants(
+        client=None,
+        root_id=root_id,
+        crawl_mode=CrawlModeEnum.cql,
+        stats=stats,
+    )
+    assert fake_space.calls == []
+    # folders are rebuilt from ancestor chains, with their positions looked up
+    assert _paths(entities) == _paths(expected)
+    assert max(len(e.lineage) for e in entities) == 12
+    n_pages = sum(e.node.type == "page" for e in entities)
+    n_folders = len(entities) - n_pages
+    n_searches = -(-n_pages // 10)
+    assert fake_space.search_calls == n_searches
+    assert len(fake_space.folder_calls) == n_folders
+    assert sorted(fake_space.page_calls) == [sorted(int(i) for i in no_position)]
+    assert stats.n_requests == n_searches + n_folders
+    assert stats.n_new_nodes == len(entities)
+    assert stats.n_duplicates == 0
+
+
+
+def test_crawl_descendants_cql_position_lookups(monkeypatch):
+    fake_space = FakeSpace(["f1", "f1/p2", "f3", "f3/p4", "f5", "f5/p6", "p7"])
+    fake_space.install(monkeypatch, crawler)
+    root_id = int(fake_space.homepage_id)
+    get_folder_by_id = fake_space.get_folder_by_id
+    lock = threading.Lock()
+    in_flight = [0]
+    max_in_flight = [0]
+    # f1 was deleted since the search, its position cannot be found
+    f1_id = fake_space.title_to_id["f1"]
+
+    def slow_get_folder_by_id(client, folder_id):
+        with lock:
+            in_flight[0] += 1
+            max_in_flight[0] = max(max_in_flight[0], in_flight[0])
+        time.sleep(0.05)
+        with lock:
+            in_flight[0] -= 1
+        folder = get_folder_by_id(client, folder_id)
+        if folder.id == f1_id:
+            folder.raw_data.pop("position")
+        return folder
+
+    monkeypatch.setattr(crawler, "get_folder_by_id", slow_get_folder_by_id)
+    entities = crawl_descendants(
+        client=None,
+        root_id=root_id,
+        crawl_mode=CrawlModeEnum.cql,
+        max_workers=3,
+    )
+    assert max_in_flight[0] == 3
+    titles = [e.node.title for e in entities if len(e.lineage) == 1]
+    # the unresolved folder goes after its resolved siblings, not first
+    assert titles == ["f3", "f5", "p7", "f1"]
+
+
+@pytest.mark.parametrize("pipelined", [False, True])
+@pytest.mark.parametrize(
+    "include,exclude,fewer_calls",
+    [
+        # whole branches excluded
+        ([], ["f21-L4/**", "p38-L4/*", "f55-L2/**"], True),
+        # include target found in iteration 1, other branches are pruned
+        (["f04-L4/**"], [], True),
+        (["f04-L4/*"], ["p05-L5/**"], True),
+        # SELF target deep in the tree, located while crawling
+        (["p12-L12"], [], False),
+        # excluding the crawl root is a no-op for the filter, and for the crawl
+        (["p01-L1/**", "f66-L1"], ["homepage/**"], False),
+    ],
+)
+def test_crawl_descendants_selector_pushdown(
+    fake_space,
+    pipelined,
+    include,
+    exclude,
+    fewer_calls,
+):
+    include = [_to_url(fake_space, pattern) for pattern in include]
+    exclude = [_to_url(fake_space, pattern) for pattern in exclude]
+    root_id = int(fake_space.homepage_id)
+    full = crawl_descendants(client=None, root_id=root_id, pipelined=pipelined)
+    n_full_calls = len(fake_space.calls)
+
+    fake_space.calls.clear()
+    stats = CrawlStats()
+    pruned = crawl_descendants(
+        client=None,
+        root_id=root_id,
+        pipelined=pipelined,
+        max_workers=2,
+        stats=stats,
+        selector=crawler.Selector(include=include, exclude=exclude),
+    )
+    assert filter_entities(pruned, include, exclude) == filter_entities(
+        full, include, exclude
+    )
+    if fewer_calls:
+        assert len(fake_space.calls) < n_full_calls
+        assert len(pruned) < len(full)
+        assert stats.n_pruned_nodes > 0
+    else:
+        assert len(fake_space.calls) <= n_full_calls
+
+
+def test_crawl_descendants_cql_selector_pushdown(monkeypatch):
+    fake_space = FakeSpace().install(monkeypatch, crawler)
+    root_id = int(fake_space.homepage_id)
+    exclude = [
+        f"https://example.atlassian.net/wiki/spaces/DEMO/folder/{fake_space.title_to_id['f21-L4']}/**",
+        f"https://example.atlassian.net/wiki/spaces/DEMO/pages/{root_id}/t/**",
+    ]
+    full = crawl_descendants(client=None, root_id=root_id, crawl_mode=CrawlModeEnum.cql)
+    pruned = crawl_descendants(
+        client=None,
+        root_id=root_id,
+        crawl_mode=CrawlModeEnum.cql,
+        selector=crawler.Selector(exclude=exclude),
+    )
+    assert filter_entities(pruned, exclude=exclude) == filter_entities(
+        full, exclude=exclude
+    )
+    assert len(pruned) < len(full)
+
+
+@pytest.mark.parametrize(
+    "include,exclude,crawl_mode",
+    [
+        (["f04-L4/**", "p38-L4/*", "p12-L12"], [], CrawlModeEnum.clustered),
+        # f04 is found by the crawl of p01, p56 is outside of the root
+        (["p01-L1/**", "f04-L4/*"], ["p05-L5/**"], CrawlModeEnum.clustered),
+        (["f21-L4/**", "f66-L1/*"], ["p26-L9/*"], CrawlModeEnum.cql),
+        # root itself is a target: normal crawl
+        (["homepage/**", "f04-L4/*"], [], CrawlModeEnum.clustered),
+    ],
+)
+def test_select_entities_from_include_roots(fake_space, include, exclude, crawl_mode):
+    include = [_to_url(fake_space, pattern) for pattern in include]
+    exclude = [_to_url(fake_space, pattern) for pattern in exclude]
+    root_id = int(fake_space.homepage_id)
+    kwargs = dict(
+        client=None,
+        root_type=crawler.DescendantTypeEnum.page,
+        include=include,
+        exclude=exclude,
+        crawl_mode=crawl_mode,
+    )
+    expected = select_entities(root_id=root_id, **kwargs)
+    n_full_calls = len(fake_space.calls)
+
+    fake_space.calls.clear()
+    entities = select_entities(root_id=root_id, from_include_roots=True, **kwargs)
+    if crawl_mode == CrawlModeEnum.cql:
+        # the full CQL crawl does not know folder positions, seeded chains do
+        assert [e.id_path for e in entities] == [e.id_path for e in expected]
+    else:
+        assert _paths(entities) == _paths(expected)
+    assert len(fake_space.calls) <= n_full_calls
+
+
+def test_select_entities_from_include_roots_self_only(fake_space):
+    root_id = int(fake_space.homepage_id)
+    titles = ["p12-L12", "p46-L12", "f65-L12", "p20-L5"]
+    include = [_to_url(fake_space, title) for title in titles]
+    entities = select_entities(
+        client=None,
+        root_id=root_id,
+        root_type=crawler.DescendantTypeEnum.page,
+        include=include,
+        from_include_roots=True,
+    )
+    # no descendants call, one ancestors call per target, one pages batch
+    assert fake_space.calls == []
+    assert len(fake_space.ancestor_calls) == 4
+    assert len(fake_space.page_calls) == 1
+    assert [e.node.title for e in entities] == ["p12-L12", "p20-L5", "p46-L12"]
+    expected = select_entities(
+        client=None,
+        root_id=root_id,
+        root_type=crawler.DescendantTypeEnum.page,
+        include=include,
+    )
+    assert _paths(entities) == _paths(expected)
+
+
+class TestCostModelClusterStrategy:
+    def _pool(self, fake_space) -> dict[str, Entity]:
+        root_id = int(fake_space.homepage_id)
+        entities = crawl_descendants(client=None, root_id=root_id)
+        return {e.node.id: e for e in entities}
+
+    def test_siblings_refetch_parent(self, fake_space):
+        pool = self._pool(fake_space)
+        f04 = fake_space.title_to_id["f04-L4"]
+        boundary_nodes = [
+            pool[fake_space.title_to_id[title]].node
+            for title in ["p05-L5", "p16-L5", "f17-L5", "p18-L5", "f19-L5", "p20-L5"]
+        ]
+        strategy = CostModelClusterStrategy()
+        assert strategy.cluster(boundary_nodes, pool, 5) == [(int(f04), "folder")]
+        assert ParentClusterStrategy().cluster(boundary_nodes, pool, 5) == [
+            (int(f04), "folder")
+        ]
+
+    def test_lone_boundary_node_refetch_self(self, fake_space):
+        pool = self._pool(fake_space)
+        p58 = fake_space.title_to_id["p58-L5"]
+        strategy = CostModelClusterStrategy()
+        assert strategy.cluster([pool[p58].node], pool, 5) == [(int(p58), "page")]
+
+    def test_expensive_calls_refetch_common_ancestor(self, fake_space):
+        pool = self._pool(fake_space)
+        p03 = fake_space.title_to_id["p03-L3"]
+        # all L5 children of f04-L4 and f21-L4, both under p03-L3
+        boundary_nodes = [
+            entity.node
+            for entity in pool.values()
+            if len(entity.lineage) == 5 and entity.id_path[2] == p03
+        ]
+        assert len(boundary_nodes) == 11
+        strategy = CostModelClusterStrategy(call_cost=100)
+        assert strategy.cluster(boundary_nodes, pool, 5) == [(int(p03), "page")]
+
+
 def test_serialize_deserialize_entities():
     p1 = GetPageDescendantsResponseResult(
         _raw_data={
@@ -39,6 +1028,78 @@ def test_serialize_deserialize_entities():
     data = serialize_entities(entities)
     entities_1 = deserialize_entities(data)
     assert entities == entities_1
+    assert entities_1[2].parent is entities_1[1]
+
+    # ancestors outside the list are kept, but not returned
+    entities_2 = deserialize_entities(serialize_entities([e3]))
+    assert entities_2 == [e3]
+    assert entities_2[0].id_path == ["1", "2", "3"]
+
+    # blobs of the legacy gzip JSON format are still readable
+    legacy = gzip.compress(orjson.dumps(crawler._entities_to_dict(entities)))
+    assert deserialize_entities(legacy) == entities
+
+
+def test_serialize_entities_smaller_than_legacy(fake_space):
+    entities = crawl_descendants(client=None, root_id=int(fake_space.homepage_id))
+    data = serialize_entities(entities)
+    legacy = gzip.compress(orjson.dumps(crawler._entities_to_dict(entities)))
+    assert len(data) < len(legacy)
+    assert deserialize_entities(data) == entities
+
+
+
+def test_snapshot_view(fake_space, tmp_path):
+    entities = crawl_descendants(client=None, root_id=int(fake_space.homepage_id))
+    data = serialize_entities(entities)
+    include = [_to_url(fake_space, "f04-L4/**")]
+    exclude = [_to_url(fake_space, "p13-L6/**")]
+    expected = filter_entities(entities, include, exclude)
+    assert 0 < len(expected) < len(entities)
+
+    # only the selected entities and their ancestors are created
+    view = SnapshotView(data)
+    assert len(view) == len(entities)
+    assert filter_entities(view, include, exclude) == expected
+    n_ancestors = len({id for e in expected for id in e.id_path[:-1]})
+    assert len(view._entities) <= len(expected) + n_ancestors
+    assert view.id_path(5) == entities[5].id_path
+    assert list(view) == entities
+    assert view[3] is view[3]
+    assert view[3].parent is view._entity(view._columns["parents"][view._rows[3]])
+
+    # legacy blob, snapshot file, dict and disk caches
+    legacy = gzip.compress(orjson.dumps(crawler._entities_to_dict(entities)))
+    assert list(SnapshotView(legacy)) == entities
+    path = tmp_path / "space.snapshot"
+    path.write_bytes(data)
+    assert filter_entities(SnapshotView.from_file(path), include) == filter_entities(
+        entities, include
+    )
+    assert list(SnapshotView.from_cache({"space": data}, "space")) == entities
+    assert SnapshotView.from_cache({}, "space") is None
+    cache = diskcache.Cache(str(tmp_path / "cache"), disk_min_file_size=0)
+    cache.set("space", data)
+    assert list(SnapshotView.from_cache(cache, "space")) == entities
+
+
+def test_crawl_descendants_with_cache_lazy(fake_space, tmp_path):
+    cache = diskcache.Cache(str(tmp_path), disk_min_file_size=0)
+    kwargs = dict(
+        client=None,
+        root_id=int(fake_space.homepage_id),
+        root_type=crawler.DescendantTypeEnum.page,
+        cache=cache,
+        lazy=True,
+    )
+    view = crawl_descendants_with_cache(**kwargs)
+    assert isinstance(view, SnapshotView)
+    fake_space.calls.clear()
+    cached = crawl_descendants_with_cache(**kwargs)
+    assert fake_space.calls == []
+    assert isinstance(cached, SnapshotView)
+    assert list(cached) == list(view)
+    assert len(cached) == 77
 
 
 if __name__ == "__main__":
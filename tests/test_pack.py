@@ -0,0 +1,252 @@
+# -*- coding: utf-8 -*-
+
+import typing as T
+import json
+import asyncio
+import dataclasses
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import httpx
+import pytest
+from sanhe_confluence_sdk.api import Confluence
+
+from docpack_confluence import crawler
+from docpack_confluence import pack
+from docpack_confluence.cache import TTLCache
+from docpack_confluence.pack import SpaceExportConfig, ExportSpec
+from docpack_confluence.tests.fake import FakeSpace
+
+
+def _atlas_doc(text: str) -> str:
+    return json.dumps(
+        {
+            "type": "doc",
+            "version": 1,
+            "content": [
+                {"type": "paragraph", "content": [{"type": "text", "text": text}]}
+            ],
+        }
+    )
+
+
+def make_handler(
+    fake_space: FakeSpace,
+    requests: list[httpx.Request],
+    deleted: T.Container[str] = (),
+):
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        path = request.url.path
+        if path == "/wiki/api/v2/spaces":
+            space = {"id": "1", "key": "DOC", "homepageId": fake_space.homepage_id}
+            params = request.url.params
+            found = "1" in params.get_list("ids") or "DOC" in params.get_list("keys")
+            data = {"results": [space] if found else [], "_links": {}}
+        else:
+            assert path == "/wiki/api/v2/pages"
+            results = []
+            for id in request.url.params.get_list("id"):
+                if id in deleted:
+                    continue
+                title = fake_space.nodes[id]["title"]
+                results.append(
+                    {
+                        "id": id,
+                        "title": title,
+                        "body": {"atlas_doc_format": {"value": _atlas_doc(title)}},
+                        "_links": {"webui": f"/spaces/DOC/pages/{id}"},
+                    }
+                )
+            data = {"results": results, "_links": {}}
+        return httpx.Response(200, json=data)
+
+    return handler
+
+
+def read_tree(dir: Path) -> dict[str, str]:
+    return {
+        str(path.relative_to(dir)): path.read_text()
+        for path in sorted(dir.glob("**/*"))
+        if path.is_file()
+    }
+
+
+def test_aexport(monkeypatch, tmp_path):
+    fake_space = FakeSpace().install(monkeypatch, crawler)
+    requests: list[httpx.Request] = []
+    handler = make_handler(fake_space, requests)
+    n_in_flight = 0
+    max_in_flight = 0
+
+    async def async_handler(request: httpx.Request) -> httpx.Response:
+        nonlocal n_in_flight, max_in_flight
+        n_in_flight += 1
+        max_in_flight = max(max_in_flight, n_in_flight)
+        await asyncio.sleep(0.05)
+        n_in_flight -= 1
+        return handler(request)
+
+    client = Confluence(
+        url="https://example.atlassian.net",
+        username="user",
+        password="token",
+        sync_client_kwargs={"transport": httpx.MockTransport(handler)},
+        async_client_kwargs={"transport": httpx.MockTransport(async_handler)},
+    )
+    space_configs = [
+        SpaceExportConfig(client=client, space_id=1),
+        SpaceExportConfig(
+            client=client,
+            space_key="DOC",
+            include=[
+                f"https://example.atlassian.net/wiki/spaces/DOC/pages/"
+                f"{fake_space.title_to_id['p01-L1']}/**"
+            ],
+        ),
+    ]
+
+    dir_sync = tmp_path / "sync"
+    ExportSpec(space_configs=space_configs, dir_out=dir_sync).export()
+    dir_async = tmp_path / "async"
+    spec = ExportSpec(space_configs=space_configs, dir_out=dir_async)
+    asyncio.run(spec.aexport(max_concurrent_stages=4))
+
+    expected = read_tree(dir_sync)
+    assert len(expected) > 10
+    assert read_tree(dir_async) == expected
+    assert "<title>p01-L1</title>" in expected["all_in_one_knowledge_base.txt"]
+    # the body fetches of the spaces ran concurrently
+    assert max_in_flight == 2
+
+    # one stage at a time still gives the same output
+    asyncio.run(spec.aexport(max_concurrent_stages=1))
+    assert read_tree(dir_async) == expected
+
+    with pytest.raises(ValueError):
+        asyncio.run(spec.aexport(max_concurrent_stages=0))
+
+
+def test_aexport_process_pool(monkeypatch, tmp_path):
+    fake_space = FakeSpace().install(monkeypatch, crawler)
+    handler = make_handler(fake_space, [])
+
+    async def async_handler(request: httpx.Request) -> httpx.Response:
+        return handler(request)
+
+    client = Confluence(
+        url="https://example.atlassian.net",
+        username="user",
+        password="token",
+        sync_client_kwargs={"transport": httpx.MockTransport(handler)},
+        async_client_kwargs={"transport": httpx.MockTransport(async_handler)},
+    )
+    spec = ExportSpec(
+        space_configs=[SpaceExportConfig(client=client, space_id=1)],
+        dir_out=tmp_path / "sync",
+    )
+    spec.export()
+    expected = read_tree(tmp_path / "sync")
+
+    # several chunks, converted in other processes from pickled pages
+    monkeypatch.setattr(pack, "RENDER_CHUNK_SIZE", 5)
+    spec = ExportSpec(space_configs=spec.space_configs, dir_out=tmp_path / "async")
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=2, mp_context=context) as executor:
+        asyncio.run(spec.aexport(executor=executor))
+    assert read_tree(tmp_path / "async") == expected
+
+
+def test_export_reports_missing_pages(monkeypatch, tmp_path):
+    fake_space = FakeSpace().install(monkeypatch, crawler)
+    # deleted between the crawl and the body fetch
+    deleted = {fake_space.title_to_id[title] for title in ["p01-L1", "p38-L4"]}
+    handler = make_handler(fake_space, [], deleted=deleted)
+
+    async def async_handler(request: httpx.Request) -> httpx.Response:
+        return handler(request)
+
+    client = Confluence(
+        url="https://example.atlassian.net",
+        username="user",
+        password="token",
+        sync_client_kwargs={"transport": httpx.MockTransport(handler)},
+        async_client_kwargs={"transport": httpx.MockTransport(async_handler)},
+    )
+    missing: list[int] = []
+    config = SpaceExportConfig(client=client, space_id=1, on_missing=missing.append)
+    space = ExportSpec(space_configs=[config], dir_out=tmp_path).resolve_spaces()[0]
+
+    config.export(dir_out=tmp_path / "sync", space=space)
+    assert sorted(missing) == sorted(int(id) for id in deleted)
+    files = read_tree(tmp_path / "sync")
+    assert not any("<title>p01-L1</title>" in text for text in files.values())
+
+    missing.clear()
+    asyncio.run(config.aexport(dir_out=tmp_path / "async", space=space))
+    assert sorted(missing) == sorted(int(id) for id in deleted)
+    assert read_tree(tmp_path / "async") == files
+
+    # without on_missing the export fails instead of dropping pages
+    config = dataclasses.replace(config, on_missing=None)
+    with pytest.raises(KeyError):
+        config.export(dir_out=tmp_path / "strict", space=space)
+    with pytest.raises(KeyError):
+        asyncio.run(config.aexport(dir_out=tmp_path / "strict", space=space))
+
+
+def test_resolve_spaces(monkeypatch, tmp_path):
+    fake_space = FakeSpace().install(monkeypatch, crawler)
+    requests: list[httpx.Request] = []
+    client = Confluence(
+        url="https://example.atlassian.net",
+        username="user",
+        password="token",
+        sync_client_kwargs={
+            "transport": httpx.MockTransport(make_handler(fake_space, requests))
+        },
+    )
+
+    def space_requests() -> list[httpx.Request]:
+        return [r for r in requests if r.url.path == "/wiki/api/v2/spaces"]
+
+    spec = ExportSpec(
+        space_configs=[
+            SpaceExportConfig(client=client, space_id=1),
+            SpaceExportConfig(client=client, space_key="DOC"),
+            SpaceExportConfig(client=client, space_id=1, include=["x"]),
+        ],
+        dir_out=tmp_path,
+        space_cache=TTLCache(),
+    )
+    spaces = spec.resolve_spaces()
+    assert [space.id for space in spaces] == ["1", "1", "1"]
+    # one listing by IDs and one by keys for the 3 configs
+    assert len(space_requests()) == 2
+    # then served by the cache
+    spec.resolve_spaces()
+    assert len(space_requests()) == 2
+
+    spec = ExportSpec(
+        space_configs=[SpaceExportConfig(client=client, space_key="NOPE")],
+        dir_out=tmp_path,
+    )
+    with pytest.raises(ValueError):
+        spec.resolve_spaces()
+    spec = ExportSpec(
+        space_configs=[SpaceExportConfig(client=client)],
+        dir_out=tmp_path,
+    )
+    with pytest.raises(ValueError):
+        spec.resolve_spaces()
+
+
+if __name__ == "__main__":
+    from docpack_confluence.tests import run_cov_test
+
+    run_cov_test(
+        __file__,
+        "docpack_confluence.pack",
+        preview=False,
+    )
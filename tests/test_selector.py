@@ -97,6 +97,8 @@ class TestParsePattern:
         pattern = parse_pattern(url)
         assert pattern.id == "789012"
         assert pattern.mode == MatchMode.SELF
+        assert pattern.type == "folder"
+        assert parse_pattern(url.replace("folder", "pages")).type == "page"
 
     def test_http_url(self):
         url = "http://example.atlassian.net/wiki/spaces/DEMO/pages/123456/Title"
@@ -288,6 +290,34 @@ class TestSelector:
         assert ("page4", ["100", "400"]) in result
         assert ("page3", ["300"]) not in result
 
+    def test_may_select_descendants_exclude(self):
+        selector = Selector(
+            exclude=[self.page_url_100 + "/**", self.page_url_200 + "/*", self.page_url_300]
+        )
+        assert selector.may_select_descendants(["100"]) is False
+        assert selector.may_select_descendants(["100", "101"]) is False
+        assert selector.may_select_descendants(["200"]) is False
+        # only 300 itself is excluded, not its children
+        assert selector.may_select_descendants(["300"]) is True
+        assert selector.may_select_descendants(["400"]) is True
+
+    def test_may_select_descendants_include(self):
+        selector = Selector(include=[self.page_url_200 + "/*", self.page_url_300])
+        # at or below an include target
+        assert selector.may_select_descendants(["200"]) is True
+        assert selector.may_select_descendants(["200", "201"]) is True
+        # targets not located yet may be anywhere
+        assert selector.may_select_descendants(["100"]) is True
+        # SELF target on the path cannot be a descendant
+        assert selector.may_select_descendants(["300"]) is True  # 200 unknown
+
+        id_paths = {"200": ["100", "200"], "300": ["100", "200", "300"]}
+        resolve = id_paths.get
+        assert selector.may_select_descendants(["100"], resolve) is True
+        assert selector.may_select_descendants(["400"], resolve) is False
+        assert selector.may_select_descendants(["100", "300"], resolve) is False
+        assert selector.may_select_descendants(["100", "200", "300"], resolve) is True
+
 
 class TestIntegrationScenarios:
     """Integration tests matching the documentation examples."""
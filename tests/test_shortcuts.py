@@ -1,9 +1,275 @@
 # -*- coding: utf-8 -*-
 
+import time
+import threading
+
+import httpx
+import pytest
+import diskcache
+from sanhe_confluence_sdk.api import Confluence
+
 from docpack_confluence.shortcuts import (
     get_space_by_id,
     get_space_by_key,
+    search_content_by_cql,
+    get_ancestors,
+    get_pages_by_ids,
+    iter_pages_by_ids,
+    get_pages_by_ids_with_cache,
+    get_spaces_by_ids_and_keys,
+    get_spaces_by_ids_and_keys_with_cache,
 )
+from docpack_confluence.cache import TTLCache
+
+
+def test_search_content_by_cql():
+    requests: list[httpx.Request] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        if "cursor" not in request.url.params:
+            data = {
+                "results": [{"id": "1"}, {"id": "2"}],
+                "_links": {
+                    "base": "https://example.atlassian.net/wiki",
+                    "next": "/rest/api/content/search?cql=ancestor+%3D+1&cursor=abc",
+                },
+            }
+        else:
+            data = {"results": [{"id": "3"}], "_links": {}}
+        return httpx.Response(200, json=data)
+
+    client = Confluence(
+        url="https://example.atlassian.net",
+        username="user",
+        password="token",
+        sync_client_kwargs={"transport": httpx.MockTransport(handler)},
+    )
+    latencies = []
+    results = search_content_by_cql(
+        client=client,
+        cql="ancestor = 1",
+        expand=["ancestors"],
+        on_response=lambda response, latency: latencies.append(latency),
+    )
+    assert [result["id"] for result in results] == ["1", "2", "3"]
+    assert len(latencies) == 2
+    assert requests[0].url.path == "/wiki/rest/api/content/search"
+    assert requests[0].url.params["cql"] == "ancestor = 1"
+    assert requests[0].url.params["expand"] == "ancestors"
+    assert requests[1].url.params["cursor"] == "abc"
+
+
+
+def test_get_ancestors():
+    requests: list[httpx.Request] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        if "cursor" not in request.url.params:
+            data = {
+                "results": [{"id": "1", "type": "page"}],
+                "_links": {"next": "/wiki/api/v2/folders/3/ancestors?cursor=abc"},
+            }
+        else:
+            data = {"results": [{"id": "2", "type": "folder"}], "_links": {}}
+        return httpx.Response(200, json=data)
+
+    client = Confluence(
+        url="https://example.atlassian.net",
+        username="user",
+        password="token",
+        sync_client_kwargs={"transport": httpx.MockTransport(handler)},
+    )
+    ancestors = get_ancestors(client=client, node_id=3, node_type="folder")
+    assert ancestors == [{"id": "1", "type": "page"}, {"id": "2", "type": "folder"}]
+    assert requests[0].url.path == "/wiki/api/v2/folders/3/ancestors"
+    assert requests[1].url.params["cursor"] == "abc"
+
+
+
+@pytest.mark.parametrize("max_workers", [1, 4])
+def test_get_pages_by_ids(max_workers):
+    lock = threading.Lock()
+    n_in_flight = 0
+    max_in_flight = 0
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        nonlocal n_in_flight, max_in_flight
+        with lock:
+            n_in_flight += 1
+            max_in_flight = max(max_in_flight, n_in_flight)
+        time.sleep(0.05)
+        ids = request.url.params.get_list("id")
+        # results come back in any order, deleted pages are left out
+        results = [{"id": id} for id in reversed(ids) if int(id) % 100 != 7]
+        with lock:
+            n_in_flight -= 1
+        return httpx.Response(200, json={"results": results, "_links": {}})
+
+    client = Confluence(
+        url="https://example.atlassian.net",
+        username="user",
+        password="token",
+        sync_client_kwargs={"transport": httpx.MockTransport(handler)},
+    )
+    ids = list(range(1, 1001))
+    missing = []
+    results = get_pages_by_ids(
+        client=client,
+        ids=ids,
+        max_workers=max_workers,
+        on_missing=missing.append,
+    )
+    assert [int(result.id) for result in results] == [
+        id for id in ids if id % 100 != 7
+    ]
+    assert missing == [id for id in ids if id % 100 == 7]
+    assert max_in_flight <= max_workers
+    assert (max_in_flight > 1) == (max_workers > 1)
+
+    # missing IDs fail loudly unless skipping is asked for
+    with pytest.raises(KeyError):
+        get_pages_by_ids(client=client, ids=ids, max_workers=max_workers)
+
+    # streaming from a lazy iterator, stopping early
+    results = iter_pages_by_ids(
+        client=client,
+        ids=iter(ids),
+        max_workers=max_workers,
+    )
+    assert [int(next(results).id) for _ in range(3)] == [1, 2, 3]
+    results.close()
+
+    with pytest.raises(ValueError):
+        list(iter_pages_by_ids(client=client, ids=ids, max_workers=0))
+
+
+
+def test_get_pages_by_ids_with_cache(tmp_path):
+    versions = {id: 1 for id in range(1, 301)}
+    body_requests: list[list[str]] = []
+    # pages deleted right before the body pass
+    deleted_before_body: set[int] = set()
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        ids = request.url.params.get_list("id")
+        with_body = "body-format" in request.url.params
+        if with_body:
+            body_requests.append(ids)
+            for id in deleted_before_body:
+                versions.pop(id, None)
+        results = []
+        for id in ids:
+            if int(id) not in versions:
+                continue
+            result = {"id": id, "version": {"number": versions[int(id)]}}
+            if with_body:
+                result["body"] = {"atlas_doc_format": {"value": f"v{versions[int(id)]}"}}
+            results.append(result)
+        return httpx.Response(200, json={"results": results, "_links": {}})
+
+    client = Confluence(
+        url="https://example.atlassian.net",
+        username="user",
+        password="token",
+        sync_client_kwargs={"transport": httpx.MockTransport(handler)},
+    )
+    cache = diskcache.Cache(str(tmp_path))
+    ids = list(range(1, 301))
+
+    def fetch(**kwargs):
+        body_requests.clear()
+        results = get_pages_by_ids_with_cache(
+            client=client, ids=ids, cache=cache, **kwargs
+        )
+        return {int(r.id): r.raw_data["body"]["atlas_doc_format"]["value"] for r in results}
+
+    # cold cache: every body is downloaded
+    assert fetch() == {id: "v1" for id in ids}
+    assert sum(len(batch) for batch in body_requests) == 300
+
+    # nothing changed: no body download
+    assert fetch() == {id: "v1" for id in ids}
+    assert body_requests == []
+
+    # two pages edited, one deleted: only the edited bodies are downloaded
+    versions[5] = 2
+    versions[250] = 3
+    del versions[7]
+    missing = []
+    bodies = fetch(on_missing=missing.append)
+    assert body_requests == [["5", "250"]]
+    assert bodies[5] == "v2" and bodies[250] == "v3" and bodies[1] == "v1"
+    assert 7 not in bodies and missing == [7]
+    with pytest.raises(KeyError):
+        fetch()
+
+    fetch(force_refresh=True, on_missing=missing.append)
+    assert sum(len(batch) for batch in body_requests) == 299
+
+    # duplicate IDs, and a page deleted between the two passes
+    versions[9] = 2
+    deleted_before_body.add(9)
+    missing = []
+    results = get_pages_by_ids_with_cache(
+        client=client,
+        ids=[7, 9, 7, 9, 1, 1],
+        cache=cache,
+        on_missing=missing.append,
+    )
+    assert [int(r.id) for r in results] == [1, 1]
+    assert sorted(missing) == [7, 9]
+
+
+def test_get_spaces_by_ids_and_keys():
+    requests: list[httpx.Request] = []
+    spaces = [{"id": str(i), "key": f"K{i}"} for i in range(1, 151)]
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        ids = request.url.params.get_list("ids")
+        keys = request.url.params.get_list("keys")
+        assert not (ids and keys)
+        assert len(ids) + len(keys) <= 100
+        results = [s for s in spaces if s["id"] in ids or s["key"] in keys]
+        return httpx.Response(200, json={"results": results, "_links": {}})
+
+    client = Confluence(
+        url="https://example.atlassian.net",
+        username="user",
+        password="token",
+        sync_client_kwargs={"transport": httpx.MockTransport(handler)},
+    )
+    ids = [*range(1, 121), 1, 999]
+    keys = ["K130", "K1", "NOPE"]
+    spaces_by_id, spaces_by_key = get_spaces_by_ids_and_keys(client, ids, keys)
+    assert list(spaces_by_id) == list(range(1, 121))
+    assert spaces_by_key["K130"].id == "130"
+    assert list(spaces_by_key) == ["K130", "K1"]
+    # 2 batches of IDs, 1 of keys
+    assert len(requests) == 3
+
+    cache = TTLCache()
+    requests.clear()
+    spaces_by_id, spaces_by_key = get_spaces_by_ids_and_keys_with_cache(
+        client, ids=[1, 2], keys=[], cache=cache
+    )
+    assert list(spaces_by_id) == [1, 2]
+    assert len(requests) == 1
+    # cached under their keys too, only K3 is fetched
+    spaces_by_id, spaces_by_key = get_spaces_by_ids_and_keys_with_cache(
+        client, ids=[2], keys=["K1", "K3"], cache=cache
+    )
+    assert spaces_by_id[2].id == "2"
+    assert {k: s.id for k, s in spaces_by_key.items()} == {"K1": "1", "K3": "3"}
+    assert len(requests) == 2
+    assert requests[-1].url.params.get_list("keys") == ["K3"]
+
+    get_spaces_by_ids_and_keys_with_cache(
+        client, ids=[1], keys=[], cache=cache, force_refresh=True
+    )
+    assert len(requests) == 3
 
 
 if __name__ == "__main__":
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+
+from docpack_confluence.constants import SnapshotCodecEnum
+from docpack_confluence.snapshot import (
+    MAGIC,
+    is_snapshot,
+    encode_columns,
+    decode_columns,
+    dump_snapshot,
+    load_snapshot,
+)
+
+NODES = [
+    {
+        "id": "1",
+        "status": "current",
+        "title": "p1",
+        "type": "page",
+        "parentId": "0",
+        "childPosition": 0,
+        "depth": 1,
+    },
+    {
+        "id": "2",
+        "status": "current",
+        "title": "f2",
+        "type": "folder",
+        "parentId": "1",
+        "childPosition": 3,
+    },
+    {"id": "3", "title": "p1", "parentId": "2"},
+    {"id": "4", "title": None, "parentId": "9"},
+]
+
+
+def test_encode_decode_columns():
+    columns = encode_columns(NODES, hidden=[1])
+    assert columns["ids"] == ["1", "2", "3", "4"]
+    assert columns["parents"] == [-1, 0, 1, -2]
+    assert columns["external_parent_ids"] == ["0", "9"]
+    # repeated titles are stored once
+    assert columns["strings"].count("p1") == 1
+    nodes, parents, hidden = decode_columns(columns)
+    assert nodes == NODES
+    assert parents == [-1, 0, 1, -2]
+    assert hidden == {1}
+
+
+@pytest.mark.parametrize("codec", list(SnapshotCodecEnum))
+def test_dump_load_snapshot(codec):
+    if codec == SnapshotCodecEnum.zstd:
+        pytest.importorskip("zstandard")
+    elif codec == SnapshotCodecEnum.lz4:
+        pytest.importorskip("lz4")
+    columns = encode_columns(NODES)
+    b = dump_snapshot(columns, codec=codec)
+    assert is_snapshot(b)
+    assert load_snapshot(b) == columns
+
+
+def test_load_snapshot_error():
+    with pytest.raises(ValueError):
+        load_snapshot(b"\x1f\x8b not a snapshot")
+    b = dump_snapshot(encode_columns(NODES))
+    with pytest.raises(ValueError):
+        load_snapshot(MAGIC + b"\xff" + b[len(MAGIC) + 1 :])
+    with pytest.raises(ValueError):
+        load_snapshot(MAGIC + b"\x01\xff" + b[len(MAGIC) + 2 :])
+
+
+if __name__ == "__main__":
+    from docpack_confluence.tests import run_cov_test
+
+    run_cov_test(
+        __file__,
+        "docpack_confluence.snapshot",
+        preview=False,
+    )
@@ -0,0 +1,227 @@
+# -*- coding: utf-8 -*-
+
+import time
+import asyncio
+import email.utils
+
+import httpx
+import pytest
+from sanhe_confluence_sdk.api import Confluence
+
+from docpack_confluence.shortcuts import get_space_by_id
+from docpack_confluence.async_shortcuts import aget_space_by_id
+from docpack_confluence.throttle import (
+    TokenBucket,
+    AdaptiveConcurrency,
+    Throttle,
+    ThrottledTransport,
+    AsyncThrottledTransport,
+    parse_retry_after,
+    install_throttle,
+)
+
+
+def test_parse_retry_after():
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("") is None
+    assert parse_retry_after("not a date") is None
+    assert parse_retry_after("3") == 3.0
+    assert parse_retry_after("-1") == 0.0
+    retry_at = email.utils.formatdate(time.time() + 30, usegmt=True)
+    assert 28 <= parse_retry_after(retry_at) <= 30
+
+
+def test_token_bucket():
+    bucket = TokenBucket(rate=None)
+    for _ in range(100):
+        bucket.acquire()
+
+    bucket = TokenBucket(rate=50, burst=2)
+    start = time.monotonic()
+    for _ in range(4):
+        bucket.acquire()
+    # 2 tokens of burst, then 2 tokens at 50 per second
+    assert time.monotonic() - start >= 0.03
+
+    bucket.pause(0.05)
+    start = time.monotonic()
+    bucket.acquire()
+    assert time.monotonic() - start >= 0.04
+
+
+def test_adaptive_concurrency():
+    concurrency = AdaptiveConcurrency(initial=4, minimum=1, maximum=5)
+    for _ in range(4):
+        concurrency.acquire()
+    assert concurrency.in_flight == 4
+    for _ in range(4):
+        concurrency.release()
+    assert concurrency.limit == 4
+    # one slot more after a full window of successes
+    concurrency.acquire()
+    concurrency.release()
+    assert concurrency.limit == 5
+    for _ in range(20):
+        concurrency.acquire()
+        concurrency.release()
+    assert concurrency.limit == 5
+
+    concurrency.acquire()
+    concurrency.release(throttled=True)
+    assert concurrency.limit == 2
+    for _ in range(3):
+        concurrency.acquire()
+        concurrency.release(throttled=True)
+    assert concurrency.limit == 1
+
+
+def test_async_acquire():
+    async def main():
+        bucket = TokenBucket(rate=50, burst=2)
+        start = time.monotonic()
+        for _ in range(4):
+            await bucket.aacquire()
+        assert time.monotonic() - start >= 0.03
+
+        concurrency = AdaptiveConcurrency(initial=1, maximum=1, poll_interval=0.001)
+        await concurrency.aacquire()
+        waiter = asyncio.ensure_future(concurrency.aacquire())
+        await asyncio.sleep(0.01)
+        assert not waiter.done()
+        concurrency.release()
+        await waiter
+        assert concurrency.in_flight == 1
+
+    asyncio.run(main())
+
+
+def _make_client(handler) -> Confluence:
+    return Confluence(
+        url="https://example.atlassian.net",
+        username="user",
+        password="token",
+        sync_client_kwargs={"transport": httpx.MockTransport(handler)},
+        async_client_kwargs={"transport": httpx.MockTransport(handler)},
+    )
+
+
+def test_install_throttle():
+    statuses = [429, 503, 200]
+    requests: list[httpx.Request] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        status = statuses[len(requests) - 1]
+        if status == 200:
+            return httpx.Response(200, json={"id": "1", "homepageId": "100"})
+        return httpx.Response(status, headers={"Retry-After": "0"})
+
+    client = _make_client(handler)
+    _ = client.sync_client
+    throttle = install_throttle(
+        client,
+        Throttle(concurrency=AdaptiveConcurrency(initial=8), backoff=0.0),
+    )
+    space = get_space_by_id(client=client, space_id=1)
+    assert space.homepageId == "100"
+    assert len(requests) == 3
+    assert throttle.concurrency.limit == 2
+
+    # installing again replaces the throttle instead of stacking transports
+    throttle = install_throttle(client)
+    transport = client.sync_client_kwargs["transport"]
+    assert isinstance(transport, ThrottledTransport)
+    assert isinstance(transport.transport, httpx.MockTransport)
+    assert transport.throttle is throttle
+    transport = client.async_client_kwargs["transport"]
+    assert isinstance(transport, AsyncThrottledTransport)
+    assert isinstance(transport.transport, httpx.MockTransport)
+    assert transport.throttle is throttle
+
+
+def test_install_throttle_async():
+    statuses = [429, 429, 200]
+    requests: list[httpx.Request] = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        status = statuses[len(requests) - 1]
+        if status == 200:
+            return httpx.Response(200, json={"id": "1", "homepageId": "100"})
+        return httpx.Response(status, headers={"Retry-After": "0"})
+
+    client = _make_client(handler)
+    _ = client.async_client
+    throttle = install_throttle(
+        client,
+        Throttle(concurrency=AdaptiveConcurrency(initial=8), backoff=0.0),
+    )
+    space = asyncio.run(aget_space_by_id(client=client, space_id=1))
+    assert space.homepageId == "100"
+    assert len(requests) == 3
+    # the async requests adapt the limit shared with the sync client
+    assert throttle.concurrency.limit == 2
+    assert throttle.concurrency.in_flight == 0
+
+
+def test_install_throttle_retries_exhausted():
+    requests: list[httpx.Request] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return httpx.Response(429)
+
+    client = _make_client(handler)
+    install_throttle(client, Throttle(max_retries=2, backoff=0.0))
+    with pytest.raises(httpx.HTTPStatusError):
+        get_space_by_id(client=client, space_id=1)
+    assert len(requests) == 3
+
+
+
+@pytest.mark.parametrize(
+    "method,status,headers,n_requests",
+    [
+        ("GET", 503, {}, 3),
+        ("PUT", 503, {}, 3),
+        # a 503 does not prove the POST was not processed
+        ("POST", 503, {}, 1),
+        ("POST", 429, {}, 1),
+        # rejected before it was processed
+        ("POST", 429, {"Retry-After": "0"}, 3),
+    ],
+)
+def test_throttle_retry_methods(method, status, headers, n_requests):
+    requests: list[httpx.Request] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return httpx.Response(status, headers=headers)
+
+    throttle = Throttle(max_retries=2, backoff=0.0)
+    transport = ThrottledTransport(throttle, httpx.MockTransport(handler))
+    with httpx.Client(transport=transport) as http:
+        assert http.request(method, "https://example.com").status_code == status
+    assert len(requests) == n_requests
+
+    # opt in to retrying every method
+    requests.clear()
+    throttle = Throttle(max_retries=2, backoff=0.0, retry_methods=None)
+
+    async def main():
+        transport = AsyncThrottledTransport(throttle, httpx.MockTransport(handler))
+        async with httpx.AsyncClient(transport=transport) as http:
+            return await http.request(method, "https://example.com")
+
+    assert asyncio.run(main()).status_code == status
+    assert len(requests) == 3
+
+
+if __name__ == "__main__":
+    from docpack_confluence.tests import run_cov_test
+
+    run_cov_test(
+        __file__,
+        "docpack_confluence.throttle",
+        preview=False,
+    )